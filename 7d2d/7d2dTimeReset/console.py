@@ -0,0 +1,137 @@
+"""
+7d2d telnet console protocol and time reset settings, shared by main.py (one-shot) and daemon.py (resident).
+
+Commands are framed by the server's echo of the command and the command's last
+line (TERMINATORS), see telnet_outputs.txt for recorded answers.
+"""
+import asyncio
+import logging
+import re
+from collections import namedtuple
+
+logger = logging.getLogger("7D2D-TimeReset")
+
+# [1-MAX_PLAYERS] will reset time
+MAX_PLAYERS = 3
+# Zero leading military time
+RESET_TRIGGER_HOUR=21
+RESET_HOUR=6
+RESET_MINUTE=0
+
+# Seconds to wait for a command's full response
+COMMAND_TIMEOUT = 5
+# Last line of each command's response, see telnet_outputs.txt
+TERMINATORS = {
+    # Total of 1 in the game
+    "listplayers": re.compile(r"Total of \d+ in the game"),
+    "lp": re.compile(r"Total of \d+ in the game"),
+    # Day 13, 06:18
+    "gettime": re.compile(r"Day \d+, \d+:\d+"),
+    "gt": re.compile(r"Day \d+, \d+:\d+"),
+    # Set time to 294000
+    "settime": re.compile(r"Set time to \d+"),
+    "st": re.compile(r"Set time to \d+"),
+    # INF Chat (from '-non-player-', entity id '-1', to 'Global'): hello everyone
+    "say": re.compile(r"Chat .from.*\): "),
+}
+
+def echo_of(command):
+    # 2026-03-14T22:02:06 1750.729 INF Executing command 'help' by Telnet from 127.0.0.1:33434
+    return f"Executing command '{command}' by Telnet"
+
+def terminator_of(command):
+    return TERMINATORS.get(command.split()[0].lower())
+
+async def read_until(reader, pattern, lines):
+    """Appends lines to `lines` until one matches pattern."""
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise EOFError("Connection closed by server")
+        lines.append(line)
+        if pattern.search(line):
+            return
+
+async def login(writer, reader, password, timeout=COMMAND_TIMEOUT):
+    """Sends the password, returns the server's answer (successful or incorrect)."""
+    writer.write(password + "\n")
+    await writer.drain()
+    lines = []
+    await asyncio.wait_for(read_until(reader, re.compile(r"Logon successful|Password incorrect"), lines), timeout)
+    return "".join(lines)
+
+async def send_command(writer, reader, command, timeout=COMMAND_TIMEOUT):
+    """
+    Runs a command and returns its output, from the server's echo of the command
+    up to the command's last line (TERMINATORS). Commands without a known
+    terminator (exit) don't wait for anything. Raises TimeoutError after timeout seconds.
+    """
+    writer.write(command + "\n")
+    await writer.drain()
+    terminator = terminator_of(command)
+    if terminator is None:
+        return ""
+
+    async def response():
+        # The console also streams the server log, skip whatever comes before our echo
+        skipped = []
+        await read_until(reader, re.compile(re.escape(echo_of(command))), skipped)
+        lines = skipped[-1:]
+        await read_until(reader, terminator, lines)
+        return "".join(lines)
+
+    return await asyncio.wait_for(response(), timeout)
+
+def count_players(output):
+    # Total of 1 in the game
+    # Total of 0 in the game
+    logger.debug(f"count_players output: {output}")
+    match = re.search(r"Total of (\d+) in the game", output, re.MULTILINE)
+    if match:
+        return int(match.group(1))
+    return 0
+
+# 0. id=171, Lost, pos=(342.4, 49.0, -541.9), rot=(0.0, 194.1, 0.0), remote=True, health=112, deaths=10, zombies=225, players=3, score=175, level=12, pltfmid=Steam_76561198025499751, crossid=EOS_000200a5aac44b81aa8521f6cf48f412, ip=94.226.230.80, ping=13
+PLAYER_PATTERN = re.compile(
+    r"^\d+\. id=(-?\d+), (.*), pos=\((\S+), (\S+), (\S+)\), rot=\((\S+), (\S+), (\S+)\), remote=(\w+), "
+    r"health=(-?\d+), deaths=(\d+), zombies=(\d+), players=(\d+), score=(-?\d+), level=(\d+), "
+    r"pltfmid=([^,]*), crossid=([^,]*), ip=([^,]*), ping=(-?\d+)", re.MULTILINE)
+Player = namedtuple("Player", ["id", "name", "x", "y", "z", "rot_x", "rot_y", "rot_z", "remote", "health", "deaths",
+                               "zombies", "players", "score", "level", "platform_id", "cross_id", "ip", "ping"])
+
+def parse_players(output):
+    """Every player line of a listplayers output as a Player."""
+    players = []
+    for m in PLAYER_PATTERN.finditer(output):
+        players.append(Player(
+            int(m.group(1)), m.group(2),
+            float(m.group(3)), float(m.group(4)), float(m.group(5)),
+            float(m.group(6)), float(m.group(7)), float(m.group(8)),
+            m.group(9) == "True",
+            *(int(m.group(i)) for i in range(10, 16)),
+            m.group(16), m.group(17), m.group(18), int(m.group(19))))
+    return players
+
+def get_datetime(output):
+    logger.debug(f"get_datetime output: {output}")
+    # Day 13, 06:18
+    match = re.search(r"Day (\d+), (\d+):(\d+)", output)
+    if match:
+        return int(match.group(1)),int(match.group(2)),int(match.group(3))
+    return None, None, None
+
+def check_settime(output):
+    # Set time to 294000
+    logger.debug(f"check_settime output: {output}")
+    match = re.search(r"Set time to (\d+)", output)
+    if match:
+        return int(match.group(1))
+    return None
+
+def check_say(output):
+    # INF Chat (from '-non-player-', entity id '-1', to 'Global'): hello everyone
+    logger.debug(f"check_say output: {output}")
+    match = re.search(r"Chat .from.*\): (.*)", output)
+    if match:
+        return match.group(1).strip()
+    return None
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Resident telnet admin daemon: one authenticated console connection per server.
+
+Each connection reconnects with backoff and runs its commands one at a time from
+a queue. The time reset that main.py does per systemd timer tick runs here as a
+task every RESET_INTERVAL seconds on the servers that have it enabled. With
+SAMPLE_INTERVAL set, listplayers is sampled into telemetry.py time series.
+
+Other tools can use the same connections through a JSON-lines port on localhost:
+    -> {"server": "run3", "command": "lp", "token": "..."}
+    <- {"ok": true, "output": "..."}
+Every request carries ADMIN_TOKEN (the telnet password TNP when unset), anything
+else on the host could otherwise kick, ban or shut down through our console sessions.
+
+Usage:
+    python daemon.py                       run the daemon
+    python daemon.py ask <server> <command...>
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+import telnetlib3 # type: ignore
+from console import COMMAND_TIMEOUT, echo_of, terminator_of, login
+from console import count_players, get_datetime, check_settime, check_say, parse_players
+from console import MAX_PLAYERS, RESET_TRIGGER_HOUR, RESET_HOUR, RESET_MINUTE
+from telemetry import SeriesWriter
+
+HOST = os.getenv("TELNET_HOST", "127.0.0.1")
+# (name, telnet port, server log folder, time reset on/off)
+# The TimeReset log goes into the server's log folder, Alloy picks it up from there
+SERVERS = [
+    ("run1", 8081, "/7d2d/7DaysToDieServer_Data", False),
+    ("run2", 8091, "/7d2d_run2/7DaysToDieServer_Data", False),
+    ("run3", 8101, "/7d2d_run3_purge/7DaysToDieServer_Data", True),
+]
+ADMIN_PORT = int(os.getenv("ADMIN_PORT", "8100"))
+# Seconds between time reset checks, aligned to the clock like the old timer (every minute at :00)
+RESET_INTERVAL = 60
+MAX_BACKOFF = 300
+# Commands without a known last line (TERMINATORS) take what arrives this long after their echo
+UNFRAMED_WAIT = 0.5
+# Seconds between listplayers samples written to TELEMETRY_DIR/<server>/, 0 turns sampling off
+SAMPLE_INTERVAL = float(os.getenv("SAMPLE_INTERVAL", "0"))
+TELEMETRY_DIR = os.getenv("TELEMETRY_DIR", "telemetry")
+
+logger = logging.getLogger("7D2D-TimeReset")
+logger.setLevel(logging.INFO)
+FORMAT = '%(asctime)s %(levelname)s %(message)s'
+# 2026-03-14T21:52:08
+formatter_loki = logging.Formatter(FORMAT, "%Y-%m-%dT%H:%M:%S")
+
+def run_logger(name, log_folder):
+    """Child of the main logger that also writes output_log__TimeReset__Rebirth_run_N.txt."""
+    run_log = logger.getChild(name)
+    if os.path.isdir(log_folder):
+        file_handler = logging.FileHandler(f"{log_folder}/output_log__TimeReset__Rebirth_run_{name[3:]}.txt")
+        file_handler.setFormatter(formatter_loki)
+        run_log.addHandler(file_handler)
+    return run_log
+
+class Response:
+    """Output of one command, fed line by line by the connection's reader."""
+    def __init__(self, command):
+        loop = asyncio.get_running_loop()
+        self.echo = echo_of(command)
+        self.terminator = terminator_of(command)
+        self.lines = None
+        self.echoed = loop.create_future()
+        self.done = loop.create_future()
+
+    def feed(self, line):
+        """True if the line belongs to this response."""
+        if self.done.done():
+            return False
+        if self.lines is None:
+            if self.echo not in line:
+                return False
+            self.lines = []
+            self.echoed.set_result(None)
+        self.lines.append(line)
+        if self.terminator is not None and self.terminator.search(line):
+            self.done.set_result("".join(self.lines))
+        return True
+
+    async def wait(self):
+        if self.terminator is None:
+            await self.echoed
+            await asyncio.sleep(UNFRAMED_WAIT)
+            self.done.set_result("".join(self.lines))
+        return await self.done
+
+class ConsoleConnection:
+    """
+    Keeps one console session to a server open.
+
+    A single reader task owns the socket: lines that belong to the running command
+    complete it, everything else (the server log the console streams) goes to the
+    listeners as listener(server name, line).
+    """
+    def __init__(self, name, host, port, password, timeout=COMMAND_TIMEOUT, log=logger):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.log = log
+        self.listeners = []
+        self.connected = asyncio.Event()
+        self.queue = asyncio.Queue()
+        self.commands = 0
+        self.reconnects = 0
+        self._pending = None
+        self._writer = None
+
+    async def command(self, command, timeout=None):
+        """Runs a command on this server and returns its output. Raises ConnectionError while disconnected."""
+        if command.split()[0].lower() == "exit":
+            raise ValueError("exit would close the shared connection")
+        if not self.connected.is_set():
+            raise ConnectionError(f"{self.name} is not connected")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((command, timeout or self.timeout, future))
+        return await future
+
+    async def run(self):
+        backoff = 1
+        while True:
+            try:
+                reader, self._writer = await asyncio.wait_for(telnetlib3.open_connection(self.host, self.port), self.timeout)
+                await asyncio.wait_for(reader.readuntil(b"Please enter password:"), self.timeout)
+                auth_output = await login(self._writer, reader, self.password, self.timeout)
+                if "Password incorrect" in auth_output:
+                    raise PermissionError("Telnet authentication failed")
+                self.log.info(f"Connected to telnet server {self.host}:{self.port}")
+                if backoff > 1:
+                    self.reconnects += 1
+                backoff = 1
+                self.connected.set()
+                await self._serve(reader)
+            except asyncio.CancelledError:
+                self._disconnect(ConnectionError(f"{self.name} is shutting down"))
+                raise
+            except Exception as e:
+                # The first failure is a warning, the retries while the server stays down are not
+                if backoff == 1:
+                    self.log.warning(f"Telnet connection to {self.host}:{self.port} lost: {e!r}")
+                else:
+                    self.log.debug(f"Telnet connection to {self.host}:{self.port} failed: {e!r}")
+                self._disconnect(ConnectionError(f"{self.name} disconnected"))
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+
+    def _disconnect(self, error):
+        self.connected.clear()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        while not self.queue.empty():
+            command, timeout, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(error)
+
+    async def _serve(self, reader):
+        worker = asyncio.create_task(self._work())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise EOFError("Connection closed by server")
+                if self._pending is not None and self._pending.feed(line):
+                    continue
+                for listener in self.listeners:
+                    listener(self.name, line)
+        finally:
+            worker.cancel()
+
+    async def _work(self):
+        while True:
+            command, timeout, future = await self.queue.get()
+            if future.done():
+                # Caller gave up while it was queued
+                continue
+            self._pending = response = Response(command)
+            try:
+                self._writer.write(command + "\n")
+                await self._writer.drain()
+                output = await asyncio.wait_for(response.wait(), timeout)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.set_exception(ConnectionError(f"{self.name} disconnected"))
+                raise
+            except asyncio.TimeoutError:
+                # Half-open socket or a console stuck on something, start over with a new session
+                if not future.done():
+                    future.set_exception(TimeoutError(f"{command!r} on {self.name} timed out after {timeout}s"))
+                self._writer.close()
+                continue
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            finally:
+                self._pending = None
+            self.commands += 1
+            if not future.done():
+                future.set_result(output)
+
+async def time_reset(conn, log):
+    """One tick of main.py: with 1-MAX_PLAYERS online at RESET_TRIGGER_HOUR, set the clock back."""
+    players = count_players(await conn.command("listplayers"))
+    if players == 0:
+        log.debug("No players online")
+        return
+    log.info(f"There are {players} players online")
+    if players > MAX_PLAYERS:
+        log.debug(f"More then {MAX_PLAYERS} players online")
+        return
+    day, hour, min = get_datetime(await conn.command("gettime"))
+    if day is None:
+        log.warning("Could not read the server time")
+        return
+    log.info(f"Detected day {day}, hour {hour}, minute {min}")
+    if hour != RESET_TRIGGER_HOUR:
+        return
+    log.info(f"{players} players online, resetting day {day} time {hour}:{min} to day {day} time {RESET_HOUR}:{RESET_MINUTE}")
+    settime_output = await conn.command(f"settime {day} {RESET_HOUR} {RESET_MINUTE}")
+    res_settime = check_settime(settime_output)
+    if res_settime:
+        log.info(f"Set time to {res_settime}")
+    else:
+        log.warning(f"Failed to set time: {settime_output}")
+    say_output = await conn.command(f"say \"Resetting time to {RESET_HOUR:02}:{RESET_MINUTE:02}\"")
+    res_say = check_say(say_output)
+    if res_say:
+        log.info(f"Sent message: {res_say}")
+    else:
+        log.warning(f"Failed to send message: {say_output}")
+
+async def schedule_time_reset(conn, log, interval=RESET_INTERVAL):
+    while True:
+        await asyncio.sleep(interval - time.time() % interval)
+        if not conn.connected.is_set():
+            continue
+        try:
+            await time_reset(conn, log)
+        except Exception as e:
+            log.critical(f"Time reset failed: {e!r}")
+
+async def sample_players(conn, series, log, interval=SAMPLE_INTERVAL):
+    try:
+        while True:
+            await asyncio.sleep(interval - time.time() % interval)
+            if not conn.connected.is_set():
+                continue
+            try:
+                series.add(time.time(), parse_players(await conn.command("listplayers")))
+            except Exception as e:
+                log.warning(f"Sampling players failed: {e!r}")
+    finally:
+        series.flush()
+
+def admin_token():
+    """ADMIN_TOKEN, or TNP when it isn't set: whoever may use the console may use the admin port."""
+    from dotenv import load_dotenv # type: ignore
+    load_dotenv()
+    return os.getenv("ADMIN_TOKEN") or os.getenv("TNP")
+
+def authorized(request, token):
+    given = request.get("token") if isinstance(request, dict) else None
+    return isinstance(given, str) and hmac.compare_digest(given.encode(), token.encode())
+
+async def handle_client(connections, token, reader, writer):
+    """JSON-lines requests from local tools, answered in order. A request without the token ends the connection."""
+    try:
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+            except ValueError:
+                request = None
+            if not authorized(request, token):
+                logger.warning("Admin port request without a valid token, closing the connection")
+                writer.write((json.dumps({"ok": False, "error": "unauthorized"}) + "\n").encode())
+                await writer.drain()
+                break
+            try:
+                conn = connections[request["server"]]
+                reply = {"ok": True, "output": await conn.command(request["command"], request.get("timeout"))}
+            except Exception as e:
+                reply = {"ok": False, "error": repr(e)}
+            writer.write((json.dumps(reply) + "\n").encode())
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+def ask(server, command, port=ADMIN_PORT, timeout=COMMAND_TIMEOUT + 5, token=None):
+    """Client side: runs a command through the daemon's connection, returns its output."""
+    token = token or admin_token()
+    if not token:
+        raise RuntimeError("ADMIN_TOKEN or TNP must be set to use the admin port")
+    with socket.create_connection(("127.0.0.1", port), timeout) as sock:
+        sock.sendall((json.dumps({"server": server, "command": command, "token": token}) + "\n").encode())
+        reply = json.loads(sock.makefile("r").readline())
+    if not reply["ok"]:
+        raise RuntimeError(reply["error"])
+    return reply["output"]
+
+async def main(servers=SERVERS, host=HOST, admin_port=ADMIN_PORT):
+    # systemctl stop: cancel everything so buffered samples get flushed
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler.setFormatter(logging.Formatter(FORMAT))
+    logger.addHandler(stdout_handler)
+
+    from dotenv import load_dotenv # type: ignore
+    load_dotenv()
+    password = os.getenv("TNP")
+    if password is None:
+        logger.critical("TNP (telnet password) is not set")
+        sys.exit(1)
+
+    connections = {}
+    tasks = []
+    for name, port, log_folder, reset in servers:
+        log = run_logger(name, log_folder)
+        conn = connections[name] = ConsoleConnection(name, host, port, os.getenv(f"TNP_{name}", password), log=log)
+        tasks.append(asyncio.create_task(conn.run()))
+        if reset:
+            tasks.append(asyncio.create_task(schedule_time_reset(conn, log)))
+        if SAMPLE_INTERVAL > 0:
+            series = SeriesWriter(os.path.join(TELEMETRY_DIR, name))
+            tasks.append(asyncio.create_task(sample_players(conn, series, log)))
+    token = admin_token()
+    server = await asyncio.start_server(lambda r, w: handle_client(connections, token, r, w), "127.0.0.1", admin_port)
+    logger.info(f"Serving {', '.join(connections)} on 127.0.0.1:{admin_port}")
+    async with server:
+        await asyncio.gather(server.serve_forever(), *tasks)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3 and sys.argv[1] == "ask":
+        print(ask(sys.argv[2], " ".join(sys.argv[3:])), end="")
+    elif len(sys.argv) == 1:
+        try:
+            asyncio.run(main())
+        except asyncio.CancelledError:
+            pass
+    else:
+        print(__doc__)
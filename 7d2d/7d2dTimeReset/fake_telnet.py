@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Fake 7d2d telnet console for trying main.py without a game server.
+
+Answers with the recorded responses in telnet_outputs.txt (played in order, the
+last one repeats), settime and say are answered like the server does.
+Any password is accepted except "wrong".
+
+Usage: python fake_telnet.py [port] [log file]
+then:  TELNET_PORT=<port> TNP=secret python main.py
+The lines of the log file are streamed to every client after login, like the
+server streams its log (try it with log_watcher's LOG_SOURCE=telnet).
+test_console.py (and log_watcher's test_watch.py) run against serve(0).
+"""
+import asyncio
+import os
+import re
+import sys
+from datetime import datetime
+
+RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "telnet_outputs.txt")
+ECHO = re.compile(r"Executing command '(.+?)' by Telnet")
+# Long command name -> short one used in the recording
+ALIASES = {"listplayers": "lp", "gt": "gettime"}
+
+def load_responses(path=RECORDING):
+    """{command name: [response lines, ...]} from a recorded session."""
+    with open(path, "r") as f:
+        lines = f.read().splitlines()
+    responses = {}
+    i = 0
+    while i < len(lines) - 1:
+        if not ECHO.search(lines[i + 1]):
+            i += 1
+            continue
+        name = lines[i].split()[0].lower()
+        end = i + 2
+        while end < len(lines) and lines[end]:
+            end += 1
+        responses.setdefault(name, []).append(lines[i + 2:end])
+        i = end
+    return responses
+
+class FakeConsole:
+    def __init__(self, responses=None, log_lines=()):
+        self.responses = responses or load_responses()
+        self.log_lines = list(log_lines)
+        self.played = {}
+
+    def answer(self, command):
+        name = command.split()[0].lower()
+        if name in ("settime", "st"):
+            day, hour, minute = (int(part) for part in command.split()[1:4])
+            return [f"Set time to {((day - 1) * 24 + hour) * 1000 + minute * 1000 // 60}"]
+        if name == "say":
+            text = command.split(" ", 1)[1].strip('"')
+            return [f"{self.stamp()} INF Chat (from '-non-player-', entity id '-1', to 'Global'): {text}"]
+        name = ALIASES.get(name, name)
+        recorded = self.responses.get(name)
+        if not recorded:
+            return [f"*** ERROR: unknown command '{name}'"]
+        count = self.played.get(name, 0)
+        self.played[name] = count + 1
+        return recorded[min(count, len(recorded) - 1)]
+
+    @staticmethod
+    def stamp():
+        return f"{datetime.now():%Y-%m-%dT%H:%M:%S} 1.000"
+
+    async def handle(self, reader, writer):
+        def send(*lines):
+            writer.write("".join(f"{line}\r\n" for line in lines).encode())
+
+        send("Please enter password:")
+        password = (await reader.readline()).decode().strip()
+        if password == "wrong":
+            send("Password incorrect, please enter password:")
+            writer.close()
+            return
+        send("Logon successful.", "", "Press 'help' to get a list of all commands. Press 'exit' to end session.", "")
+        for line in self.log_lines:
+            send(line)
+        try:
+            while True:
+                raw = await reader.readline()
+                command = raw.decode(errors="ignore").strip()
+                if not raw or command == "exit":
+                    break
+                if not command:
+                    continue
+                send(f"{self.stamp()} INF Executing command '{command}' by Telnet from 127.0.0.1:46610", *self.answer(command))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # Client dropped or the server is shutting down
+            pass
+        writer.close()
+
+async def serve(port=0, console=None):
+    """Starts the fake console, returns the asyncio server (port 0 picks a free one)."""
+    console = console or FakeConsole()
+    return await asyncio.start_server(console.handle, "127.0.0.1", port)
+
+async def main(port, log_file=None):
+    log_lines = []
+    if log_file:
+        with open(log_file, "r", errors="ignore") as f:
+            log_lines = f.read().splitlines()
+    server = await serve(port, FakeConsole(log_lines=log_lines))
+    print(f"Fake 7d2d telnet on 127.0.0.1:{server.sockets[0].getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 8101, sys.argv[2] if len(sys.argv) > 2 else None))
@@ -1,18 +1,20 @@
 #!/usr/bin/env python3
 
 import asyncio
-import telnetlib3 # type: ignore
 import logging
-import re
 import sys
 import os
-from dotenv import load_dotenv # type: ignore
-load_dotenv()
+from console import login, send_command, count_players, get_datetime, check_settime, check_say
+from console import MAX_PLAYERS, RESET_TRIGGER_HOUR, RESET_HOUR, RESET_MINUTE
+# Started from scratch on every timer tick, only .env is read when the environment doesn't have the password already
+if "TNP" not in os.environ:
+    from dotenv import load_dotenv # type: ignore
+    load_dotenv()
 
 REBIRTH_RUN="3"
 LOG_FOLDER="/7d2d_run3_purge/7DaysToDieServer_Data"
-HOST = "127.0.0.1"
-PORT = 8101
+HOST = os.getenv("TELNET_HOST", "127.0.0.1")
+PORT = int(os.getenv("TELNET_PORT", "8101"))
 
 logger = logging.getLogger("7D2D-TimeReset")
 logger.setLevel(logging.INFO)
@@ -27,7 +29,8 @@ stdout_handler.setFormatter(formatter)
 
 # file handler
 # Alloy extracts the run number from the filename for use as tag in Loki queries for the Grafana dashboard
-file_handler = logging.FileHandler(f'{LOG_FOLDER}/output_log__TimeReset__Rebirth_run_{REBIRTH_RUN}.txt')
+# Opened on the first record, not at import
+file_handler = logging.FileHandler(f'{LOG_FOLDER}/output_log__TimeReset__Rebirth_run_{REBIRTH_RUN}.txt', delay=True)
 
 file_handler.setFormatter(formatter_loki)
 
@@ -35,53 +38,9 @@ logger.addHandler(stdout_handler)
 logger.addHandler(file_handler)
 
 PASSWORD = os.getenv("TNP")
-# [1-MAX_PLAYERS] will reset time
-MAX_PLAYERS = 3
-# Zero leading military time
-RESET_TRIGGER_HOUR=21
-RESET_HOUR=6
-RESET_MINUTE=0
-
-async def send_command(writer, reader, command):
-    writer.write(command + "\n")
-    await writer.drain()
-    await asyncio.sleep(1)
-    return await reader.read(40960)
-
-def count_players(output):
-    # Total of 1 in the game
-    # Total of 0 in the game
-    logger.debug(f"count_players output: {output}")
-    match = re.search(r"Total of (\d+) in the game", output, re.MULTILINE)
-    if match:
-        return int(match.group(1))
-    return 0
-
-def get_datetime(output):
-    logger.debug(f"get_datetime output: {output}")
-    # Day 13, 06:18
-    match = re.search(r"Day (\d+), (\d+):(\d+)", output)
-    if match:
-        return int(match.group(1)),int(match.group(2)),int(match.group(3))
-    return None, None, None
-
-def check_settime(output):
-    # Set time to 294000
-    logger.debug(f"check_settime output: {output}")
-    match = re.search(r"Set time to (\d+)", output)
-    if match:
-        return int(match.group(1))
-    return None
-
-def check_say(output):
-    # INF Chat (from '-non-player-', entity id '-1', to 'Global'): hello everyone
-    logger.debug(f"check_say output: {output}")
-    match = re.search(r"Chat .from.*\): (.*)", output)
-    if match:
-        return int(match.group(1))
-    return None
 
 async def main():
+    import telnetlib3 # type: ignore
     ## Connecting
     logger.debug(f"Attempting telnet connection to {HOST}:{PORT}...")
     try:
@@ -96,7 +55,7 @@ async def main():
     try:
         await reader.readuntil(b"Please enter password:")
         assert PASSWORD is not None
-        auth_output = await send_command(writer, reader, PASSWORD)
+        auth_output = await login(writer, reader, PASSWORD)
         logger.debug(f"auth_output: {auth_output}")
         if "Password incorrect" in auth_output:
             logger.critical("Telnet authentication failed")
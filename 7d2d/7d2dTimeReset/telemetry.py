@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Fixed-record time series of listplayers samples, one directory per server.
+
+<dir>/YYYY-MM-DD.bin  one RECORD per online player per sample, local day of the sample
+<dir>/players.json    player table, index -> [crossid, last seen name]
+
+40 bytes per player per sample, appended in buffered writes, so sampling every
+few seconds on every world costs a write a minute. Reading is struct.iter_unpack
+over whole files.
+
+Usage:
+    python telemetry.py pings <dir> [threshold] [first_day] [last_day]
+    python telemetry.py deaths <dir> [first_day] [last_day]
+    python telemetry.py heatmap <dir> [cell_size] [player] [first_day] [last_day]
+"""
+import json
+import os
+import struct
+import sys
+import time
+from collections import Counter, namedtuple
+from datetime import date
+
+# ts, player, x, y, z, rot_y, health, deaths, zombies, players, score, level, ping
+RECORD = struct.Struct("<IHffffhHIHiHh")
+Sample = namedtuple("Sample", ["ts", "player", "x", "y", "z", "rot_y", "health", "deaths", "zombies",
+                               "players", "score", "level", "ping"])
+# The player column is a uint16, a full player table takes no one new
+MAX_PLAYERS = 0x10000
+# Seconds between two samples of a player that still count as one stretch of playtime
+MAX_GAP = 300
+
+def _load_players(directory):
+    try:
+        with open(os.path.join(directory, "players.json"), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+class SeriesWriter:
+    """Buffers samples and appends them to the day's file every flush_interval seconds."""
+    def __init__(self, directory, flush_interval=60, max_buffer=1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer * RECORD.size
+        self.players = _load_players(directory)
+        self.ids = {cross_id: i for i, (cross_id, name) in enumerate(self.players)}
+        self.players_dirty = False
+        # Samples of players that got no index, the table was full
+        self.refused = 0
+        self.buffer = bytearray()
+        self.day = None
+        self.checked = set()
+        self.last_flush = time.monotonic()
+
+    def _player(self, player):
+        i = self.ids.get(player.cross_id)
+        if i is None:
+            if len(self.players) >= MAX_PLAYERS:
+                if not self.refused:
+                    print(f"Player table of {self.directory} is full ({MAX_PLAYERS}), new players are not recorded")
+                self.refused += 1
+                return None
+            i = self.ids[player.cross_id] = len(self.players)
+            self.players.append([player.cross_id, player.name])
+            self.players_dirty = True
+        elif self.players[i][1] != player.name:
+            self.players[i][1] = player.name
+            self.players_dirty = True
+        return i
+
+    def add(self, ts, players):
+        """Records one listplayers sample (console.parse_players) taken at epoch ts."""
+        day = date.fromtimestamp(ts).isoformat()
+        if day != self.day:
+            self.flush()
+            self.day = day
+        for p in players:
+            i = self._player(p)
+            if i is None:
+                continue
+            self.buffer += RECORD.pack(int(ts), i, p.x, p.y, p.z, p.rot_y,
+                                       max(-32768, min(p.health, 32767)), min(p.deaths, 65535), p.zombies,
+                                       min(p.players, 65535), p.score, min(p.level, 65535),
+                                       max(-32768, min(p.ping, 32767)))
+        if len(self.buffer) >= self.max_buffer or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        # Player table first, every record on disk must resolve to a name
+        if self.players_dirty:
+            tmp = os.path.join(self.directory, "players.json.tmp")
+            with open(tmp, "w") as f:
+                json.dump(self.players, f)
+            os.replace(tmp, os.path.join(self.directory, "players.json"))
+            self.players_dirty = False
+        if not self.buffer:
+            return
+        with open(os.path.join(self.directory, f"{self.day}.bin"), "ab") as f:
+            if self.day not in self.checked:
+                # A crash in the middle of a write leaves part of a record, cut it off
+                f.truncate(f.seek(0, os.SEEK_END) // RECORD.size * RECORD.size)
+                self.checked.add(self.day)
+            f.write(self.buffer)
+        self.buffer.clear()
+
+def read_samples(directory, first_day=None, last_day=None):
+    """Yields Samples oldest first, optionally only from first_day to last_day (YYYY-MM-DD, inclusive)."""
+    days = sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".bin"))
+    for day in days:
+        if (first_day and day < first_day) or (last_day and day > last_day):
+            continue
+        with open(os.path.join(directory, f"{day}.bin"), "rb") as f:
+            data = f.read()
+        for record in RECORD.iter_unpack(memoryview(data)[:len(data) - len(data) % RECORD.size]):
+            yield Sample._make(record)
+
+def player_names(directory):
+    return [name for cross_id, name in _load_players(directory)]
+
+def ping_spikes(samples, threshold=250):
+    """(ts, player, ping) of every sample at or above threshold ms."""
+    return [(s.ts, s.player, s.ping) for s in samples if s.ping >= threshold]
+
+def death_rates(samples):
+    """{player: (deaths, hours online)} from the deaths counter, only counting what happened between samples."""
+    last = {}
+    rates = {}
+    for s in samples:
+        deaths, hours = rates.get(s.player, (0, 0.0))
+        previous = last.get(s.player)
+        if previous is not None and s.ts - previous.ts <= MAX_GAP:
+            hours += (s.ts - previous.ts) / 3600
+            # The counter goes back to 0 on a new character
+            if s.deaths > previous.deaths:
+                deaths += s.deaths - previous.deaths
+        rates[s.player] = (deaths, hours)
+        last[s.player] = s
+    return rates
+
+def heatmap(samples, cell=100, player=None):
+    """Counter of samples per (x, z) cell of cell x cell meters."""
+    return Counter((int(s.x // cell), int(s.z // cell)) for s in samples if player is None or s.player == player)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    command, directory, args = sys.argv[1], sys.argv[2], sys.argv[3:]
+    names = player_names(directory)
+    if command == "pings":
+        threshold = int(args[0]) if args else 250
+        for ts, player, ping in ping_spikes(read_samples(directory, *args[1:3]), threshold):
+            print(f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts))} {names[player]}: {ping}ms")
+    elif command == "deaths":
+        rates = death_rates(read_samples(directory, *args[0:2]))
+        for player, (deaths, hours) in sorted(rates.items(), key=lambda item: item[1][0], reverse=True):
+            print(f"{names[player]}: {deaths} deaths in {hours:.1f}h ({deaths / hours if hours else 0:.2f}/h)")
+    elif command == "heatmap":
+        cell = int(args[0]) if args else 100
+        player = None
+        if len(args) > 1 and args[1]:
+            if args[1] not in names:
+                print(f"No samples of {args[1]} in {directory}")
+                sys.exit(1)
+            player = names.index(args[1])
+        for (x, z), count in heatmap(read_samples(directory, *args[2:4]), cell, player).most_common():
+            print(f"x {x * cell:>6} z {z * cell:>6}: {count}")
+    else:
+        print(__doc__)
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+import telnetlib3 # type: ignore
+from fake_telnet import FakeConsole, load_responses, serve
+from console import login, send_command, count_players, get_datetime, check_settime, check_say, parse_players
+
+async def connect(console=None, password="secret"):
+    """A fake console on a free port and a logged-in telnetlib3 client, like main.py and daemon.py open them."""
+    server = await serve(0, console)
+    reader, writer = await telnetlib3.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+    await reader.readuntil(b"Please enter password:")
+    auth_output = await login(writer, reader, password)
+    return server, reader, writer, auth_output
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+def session(commands, console=None):
+    """Outputs of send_command for each command, in one session."""
+    async def go():
+        server, reader, writer, auth_output = await connect(console)
+        assert "Logon successful" in auth_output
+        outputs = [await send_command(writer, reader, command) for command in commands]
+        writer.close()
+        server.close()
+        return outputs
+    return run(go())
+
+def test_recorded_responses_loaded():
+    responses = load_responses()
+    assert {"lp", "gettime"} <= set(responses)
+    assert responses["lp"][0] == ["Total of 0 in the game"]
+
+def test_lp_framing():
+    # The recording has an empty server first, then one player, the last one repeats
+    empty, one, again = session(["lp", "listplayers", "lp"])
+    assert empty.splitlines()[-1].strip() == "Total of 0 in the game"
+    assert "Executing command 'lp' by Telnet" in empty.splitlines()[0]
+    assert count_players(empty) == 0
+    assert count_players(one) == 1 and count_players(again) == 1
+    assert "Executing command 'listplayers' by Telnet" in one
+    player, = parse_players(one)
+    assert (player.name, player.deaths, player.ping) == ("Lost", 10, 13)
+
+def test_gettime_settime_say_framing():
+    gettime, settime, say = session(["gettime", "settime 13 6 0", 'say "Resetting time to 06:00"'])
+    assert get_datetime(gettime) == (12, 19, 53)
+    assert check_settime(settime) == 294000
+    assert check_say(say) == "Resetting time to 06:00"
+    # Nothing of one command's response is left over for the next one
+    assert "Set time" not in gettime and "Chat" not in settime
+
+def test_log_lines_before_echo_are_skipped():
+    # The console streams the server log too, including lines that look like a terminator
+    log_lines = ["2026-03-14T19:43:16 394.479 INF Total of 5 in the game",
+                 "2026-03-14T19:43:17 395.000 INF GMSG: Player 'Lost' died",
+                 "2026-03-14T19:43:18 396.000 INF Day 99, 23:59"]
+    lp, gettime = session(["lp", "gettime"], FakeConsole(log_lines=log_lines))
+    assert count_players(lp) == 0
+    assert "GMSG" not in lp
+    assert get_datetime(gettime) == (12, 19, 53)
+
+def test_commands_without_terminator_return_right_away():
+    assert session(["exit"]) == [""]
+
+def test_wrong_password():
+    async def go():
+        server, reader, writer, auth_output = await connect(password="wrong")
+        writer.close()
+        server.close()
+        return auth_output
+    assert "Password incorrect" in run(go())
+
+def test_command_timeout():
+    # A gettime answer without its "Day N, HH:MM" line never completes
+    responses = load_responses()
+    responses["gettime"] = [["Something else entirely"]]
+
+    async def go():
+        server, reader, writer, _ = await connect(FakeConsole(responses))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(TimeoutError):
+            await send_command(writer, reader, "gettime", timeout=0.3)
+        elapsed = loop.time() - start
+        writer.close()
+        server.close()
+        return elapsed
+    assert 0.3 <= run(go()) < 2
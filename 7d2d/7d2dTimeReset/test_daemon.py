@@ -0,0 +1,70 @@
+import asyncio
+import json
+import pytest
+import daemon
+from daemon import handle_client, ask
+
+class FakeConnection:
+    """Stands in for ConsoleConnection, records the commands that got through."""
+    def __init__(self):
+        self.commands = []
+
+    async def command(self, command, timeout=None):
+        self.commands.append(command)
+        return f"output of {command}"
+
+async def admin_port(requests, token="s3cret"):
+    """Sends the JSON-lines requests (str or dict) to handle_client, returns the replies until it hangs up."""
+    conn = FakeConnection()
+    server = await asyncio.start_server(lambda r, w: handle_client({"run3": conn}, token, r, w), "127.0.0.1", 0)
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+    for request in requests:
+        writer.write(((request if isinstance(request, str) else json.dumps(request)) + "\n").encode())
+    await writer.drain()
+    writer.write_eof()
+    replies = [json.loads(line) async for line in reader]
+    writer.close()
+    server.close()
+    return replies, conn.commands
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+def test_valid_token():
+    replies, commands = run(admin_port([{"server": "run3", "command": "lp", "token": "s3cret"},
+                                        {"server": "nope", "command": "lp", "token": "s3cret"}], token="s3cret"))
+    assert replies[0] == {"ok": True, "output": "output of lp"}
+    assert replies[1]["ok"] is False and "nope" in replies[1]["error"]
+    assert commands == ["lp"]
+
+@pytest.mark.parametrize("request_line", [
+    {"server": "run3", "command": "shutdown"},
+    {"server": "run3", "command": "shutdown", "token": "wrong"},
+    {"server": "run3", "command": "shutdown", "token": 1234},
+    '"just a string"',
+    "not json",
+])
+def test_without_valid_token_nothing_runs(request_line):
+    replies, commands = run(admin_port([request_line, {"server": "run3", "command": "lp", "token": "s3cret"}]))
+    # The connection is closed after the first bad request, the valid one after it isn't read
+    assert replies == [{"ok": False, "error": "unauthorized"}]
+    assert commands == []
+
+def test_ask_sends_the_token(monkeypatch):
+    async def go():
+        conn = FakeConnection()
+        server = await asyncio.start_server(lambda r, w: handle_client({"run3": conn}, "s3cret", r, w), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            ok = await asyncio.to_thread(ask, "run3", "gettime", port)
+            with pytest.raises(RuntimeError, match="unauthorized"):
+                await asyncio.to_thread(ask, "run3", "gettime", port, token="wrong")
+        return ok, conn.commands
+
+    monkeypatch.setattr(daemon, "admin_token", lambda: "s3cret")
+    assert run(go()) == ("output of gettime", ["gettime"])
+
+def test_ask_without_token(monkeypatch):
+    monkeypatch.setattr(daemon, "admin_token", lambda: None)
+    with pytest.raises(RuntimeError, match="ADMIN_TOKEN or TNP"):
+        ask("run3", "lp", port=9)
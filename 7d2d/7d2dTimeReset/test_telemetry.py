@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+from datetime import datetime
+import telemetry
+from console import Player
+from telemetry import SeriesWriter, Sample, read_samples, player_names, ping_spikes, death_rates, heatmap
+
+def player(name, cross_id, x=0.0, z=0.0, deaths=0, ping=20):
+    return Player(171, name, x, 49.0, z, 0.0, 90.0, 0.0, True, 100, deaths, 3, 1, 40, 12,
+                  f"Steam_{cross_id}", f"EOS_{cross_id}", "10.0.0.2", ping)
+
+def at(stamp):
+    return int(datetime.fromisoformat(stamp).timestamp())
+
+def write(directory):
+    series = SeriesWriter(str(directory), flush_interval=3600)
+    series.add(at("2026-03-14T23:58:00"), [player("Lost", 1, 120.0, -30.0), player("Ana", 2, 510.0, 20.0)])
+    series.add(at("2026-03-14T23:59:00"), [player("Lost", 1, 130.0, -40.0, deaths=1, ping=300)])
+    # Next local day: another file, and Ana is now called Anna
+    series.add(at("2026-03-15T00:01:00"), [player("Lost", 1, 140.0, -50.0, deaths=3),
+                                           player("Anna", 2, 520.0, 30.0, ping=260)])
+    series.flush()
+    return series
+
+def test_round_trip(tmp_path):
+    write(tmp_path)
+    assert sorted(os.listdir(tmp_path)) == ["2026-03-14.bin", "2026-03-15.bin", "players.json"]
+    samples = list(read_samples(str(tmp_path)))
+    assert [(s.ts, s.player, s.x, s.z, s.deaths, s.ping) for s in samples] == [
+        (at("2026-03-14T23:58:00"), 0, 120.0, -30.0, 0, 20),
+        (at("2026-03-14T23:58:00"), 1, 510.0, 20.0, 0, 20),
+        (at("2026-03-14T23:59:00"), 0, 130.0, -40.0, 1, 300),
+        (at("2026-03-15T00:01:00"), 0, 140.0, -50.0, 3, 20),
+        (at("2026-03-15T00:01:00"), 1, 520.0, 30.0, 0, 260),
+    ]
+    assert samples[0] == Sample(at("2026-03-14T23:58:00"), 0, 120.0, 49.0, -30.0, 90.0, 100, 0, 3, 1, 40, 12, 20)
+    assert player_names(str(tmp_path)) == ["Lost", "Anna"]
+    assert len(list(read_samples(str(tmp_path), "2026-03-15"))) == 2
+    assert len(list(read_samples(str(tmp_path), None, "2026-03-14"))) == 3
+
+def test_readers(tmp_path):
+    write(tmp_path)
+    assert ping_spikes(read_samples(str(tmp_path))) == [(at("2026-03-14T23:59:00"), 0, 300),
+                                                        (at("2026-03-15T00:01:00"), 1, 260)]
+    # Lost died 3 times in 3 minutes of samples, Ana's two samples are 3 minutes apart too
+    assert death_rates(read_samples(str(tmp_path))) == {0: (3, 3 / 60), 1: (0, 3 / 60)}
+    assert heatmap(read_samples(str(tmp_path))) == {(1, -1): 3, (5, 0): 2}
+    assert heatmap(read_samples(str(tmp_path)), cell=10, player=1) == {(51, 2): 1, (52, 3): 1}
+
+def test_partial_record_cut_off(tmp_path):
+    write(tmp_path)
+    with open(tmp_path / "2026-03-15.bin", "ab") as f:
+        f.write(b"\x01\x02\x03")
+    # Readers skip it, the next writer cuts it off before appending
+    assert len(list(read_samples(str(tmp_path)))) == 5
+    series = SeriesWriter(str(tmp_path))
+    series.add(at("2026-03-15T00:02:00"), [player("Lost", 1)])
+    series.flush()
+    assert os.path.getsize(tmp_path / "2026-03-15.bin") == 3 * telemetry.RECORD.size
+    assert [s.player for s in read_samples(str(tmp_path), "2026-03-15")] == [0, 1, 0]
+
+def test_full_player_table(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(telemetry, "MAX_PLAYERS", 2)
+    series = SeriesWriter(str(tmp_path))
+    for _ in range(2):
+        series.add(at("2026-03-14T20:00:00"), [player("Lost", 1), player("Ana", 2), player("Bo", 3)])
+    series.flush()
+    assert series.refused == 2
+    assert player_names(str(tmp_path)) == ["Lost", "Ana"]
+    assert [s.player for s in read_samples(str(tmp_path))] == [0, 1, 0, 1]
+    # Said once, not per sample
+    assert capsys.readouterr().out.count("is full") == 1
+
+def test_cli(tmp_path):
+    write(tmp_path)
+
+    def cli(command, *args):
+        return subprocess.run([sys.executable, "telemetry.py", command, str(tmp_path), *args],
+                              cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+
+    pings = cli("pings")
+    assert pings.stdout.splitlines() == ["2026-03-14T23:59:00 Lost: 300ms", "2026-03-15T00:01:00 Anna: 260ms"]
+    unknown = cli("heatmap", "100", "Nobody")
+    assert unknown.returncode == 1
+    assert unknown.stdout.startswith("No samples of Nobody in ")
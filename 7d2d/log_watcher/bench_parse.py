@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Lines/sec of the rule table vs the old if-chain parse_line.
+
+Nothing is sent to discord, messages are collected in a list.
+bench/suite.py at the root of the repo covers every parser.
+Usage: python bench_parse.py [number_of_lines]
+"""
+import os
+import re
+import sys
+import time
+from rules import RuleSet
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from loggen import seven_days_lines
+
+
+class Watcher:
+    def __init__(self, sent):
+        self.send_msg = sent.append
+        self.send_sys_msg = sent.append
+
+    def player_login(self, name, ts):
+        return True
+
+    def player_logout(self, name, ts):
+        self.send_msg(f"Player {name} logged out")
+
+    def randomDied(self, player_name):
+        return f"Player {player_name} died!"
+
+
+def legacy_parse_line(watcher, line, send_msg, send_sys_msg):
+    """parse_line as it was before the rule table, kept for comparison."""
+    if "PlayerSpawnedInWorld (reason: JoinMultiplayer" in line \
+    or "PlayerSpawnedInWorld (reason: EnterMultiplayer" in line:
+        match = re.search(r"PlayerName='(.*?)'", line)
+        if match:
+            send_msg(f"Player {match.group(1)} logged in")
+    if "disconnected after" in line:
+        match = re.search(r"Player (.*?) disconnected after", line)
+        if match:
+            send_msg(f"Player {match.group(1)} logged out")
+    if 'GMSG: Player' in line \
+    and 'died' in line:
+        match = re.search(r"Player '(.+)' died", line)
+        if match:
+            send_msg(watcher.randomDied(match.group(1)))
+    if '[EOS] Server registered, session:' in line:
+        send_sys_msg("Server registered, it should be ready now")
+
+
+def make_lines(count, event_ratio=0.01, seed=7):
+    return list(seven_days_lines(count, event_ratio, seed=seed))
+
+
+def run(name, parse, lines):
+    start = time.perf_counter()
+    for line in lines:
+        parse(line)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {len(lines) / elapsed:>14,.0f} lines/sec")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    sent = []
+    watcher = Watcher(sent)
+    ruleset = RuleSet()
+
+    for ratio in (0.0, 0.01, 0.1):
+        lines = make_lines(count, event_ratio=ratio)
+        print(f"{count:,} lines, {ratio:.0%} events")
+        run("legacy", lambda line: legacy_parse_line(watcher, line, sent.append, sent.append), lines)
+        run("rules", lambda line: ruleset.dispatch(line, watcher), lines)
+        sent.clear()
+
+
+if __name__ == "__main__":
+    main()
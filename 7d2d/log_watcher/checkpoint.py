@@ -0,0 +1,49 @@
+import json
+import os
+import time
+
+class Checkpoint:
+    """
+    Remembers how far into which log file we got, so a restart resumes where it stopped.
+
+    Writes are atomic (temp file + rename) and at most once per interval seconds,
+    unless forced.
+    """
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        # Not 0, monotonic() can be smaller than interval on a freshly booted host
+        self._last_write = float("-inf")
+        self._last_saved = None
+
+    def load(self):
+        """Returns the saved {path, inode, size, offset} or None."""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            return {key: data[key] for key in ("path", "inode", "size", "offset")}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+
+    def save(self, tailer, force=False):
+        if tailer is None or tailer.inode is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_write < self.interval:
+            return
+        # Everything up to offset is read, which is the file size at that moment
+        data = {"path": tailer.path, "inode": tailer.inode, "size": tailer.offset, "offset": tailer.position}
+        self._last_write = now
+        if data == self._last_saved:
+            return
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            self._last_saved = data
+        except OSError as e:
+            print(f"Failed to write checkpoint {self.path}: {e}")
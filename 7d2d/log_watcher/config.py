@@ -5,11 +5,33 @@ load_dotenv()
 discord_user_webhook = os.getenv("DISCORD_USER_WEBHOOK")
 discord_system_webhook = os.getenv("DISCORD_SYSTEM_WEBHOOK")
 
-#LOG_DIR = "/7d2d/7DaysToDieServer_Data"
-# LOG_DIR = "/7d2d_run2/7DaysToDieServer_Data"
-LOG_DIR = "/7d2d_run3_purge/7DaysToDieServer_Data"
-# LOG_MATCH = "output_log__20*_Rebirth_run_2.txt"
-LOG_MATCH = "output_log__20*_Rebirth_run_3.txt"
+# One entry per world: (log directory, log file glob, run label, user webhook)
+# All of them are served by the same process, the label is prefixed to every notification
+TARGETS = [
+    # ("/7d2d/7DaysToDieServer_Data", "output_log__20*_Rebirth_run_1.txt", "run1", discord_user_webhook),
+    # ("/7d2d_run2/7DaysToDieServer_Data", "output_log__20*_Rebirth_run_2.txt", "run2", discord_user_webhook),
+    ("/7d2d_run3_purge/7DaysToDieServer_Data", "output_log__20*_Rebirth_run_3.txt", "run3", discord_user_webhook),
+]
+# Where lines come from: "file" tails the newest log file of every target,
+# "telnet" reads the live log stream of the target's telnet console (TELNET_PORTS by run label)
+LOG_SOURCE = os.getenv("LOG_SOURCE", "file")
+TELNET_HOST = os.getenv("TELNET_HOST", "127.0.0.1")
+TELNET_PORTS = {"run1": 8081, "run2": 8091, "run3": 8101}
+TELNET_PASSWORD = os.getenv("TNP")
+# Serve /metrics (Prometheus text format) on this port, 0 turns it off
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# SQLite file the login/logout/death/restart events are stored in, for eventstore.py queries, unset turns it off
+EVENT_STORE = os.getenv("EVENT_STORE")
+# A logout is only announced once the player stayed away this many seconds, reconnecting
+# within it announces neither the logout nor the login, 0 announces logouts right away
+PRESENCE_GRACE = float(os.getenv("PRESENCE_GRACE", "60"))
+# Where the read position is kept between restarts, relative to WorkingDirectory
+CHECKPOINT_FILE = os.getenv("CHECKPOINT_FILE", "checkpoint_{run}.json")
+# Modification events within this many seconds are merged into one read,
+# a read never waits longer than DEBOUNCE_MAX_LATENCY after the first event
+DEBOUNCE_WINDOW = float(os.getenv("DEBOUNCE_WINDOW", "0.1"))
+DEBOUNCE_MAX_LATENCY = float(os.getenv("DEBOUNCE_MAX_LATENCY", "0.5"))
 
 DEATH_MESSAGES=[
     "Player {player} died!",
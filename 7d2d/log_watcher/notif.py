@@ -1,19 +1,127 @@
-from apprise import Apprise
+import queue
+import threading
+import time
 from config import discord_user_webhook, discord_system_webhook
+from discord_notify import client
+
+# Discord refuses messages longer than this
+MAX_MESSAGE_LENGTH = 2000
+
+class Dispatcher:
+    """
+    Sends notifications from a background thread so log parsing never waits on discord.
+
+    Messages arriving within coalesce_window of each other are merged into one
+    multi-line message per webhook. When the queue is full new messages are dropped.
+    latency, when set, gets observe(seconds) for every message sent (a metrics.Histogram).
+    """
+    def __init__(self, maxsize=1000, coalesce_window=0.5, max_batch=50, latency=None):
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.latency = latency
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self._clients = {}
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._worker = threading.Thread(target=self._run, name="notif", daemon=True)
+        self._worker.start()
+
+    def submit(self, webhook, msg):
+        """Queue a message, never blocks."""
+        try:
+            self._queue.put_nowait((webhook, msg))
+        except queue.Full:
+            self.dropped += 1
+            print(f"Notification queue full, dropping: {msg}")
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    @property
+    def rate_limited(self):
+        """429s the Discord webhooks got, Apprise clients don't tell."""
+        return sum(getattr(notifier, "rate_limited", 0) for notifier in list(self._clients.values()))
+
+    def stop(self, timeout=10):
+        """Flush what is queued and stop the worker."""
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    def _client(self, webhook):
+        notifier = self._clients.get(webhook)
+        if notifier is None:
+            notifier = self._clients[webhook] = client(webhook)
+        return notifier
+
+    def _run(self):
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.coalesce_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            self._send(batch)
+
+    def _send(self, batch):
+        by_webhook = {}
+        for webhook, msg in batch:
+            by_webhook.setdefault(webhook, []).append(msg)
+        for webhook, msgs in by_webhook.items():
+            for body in _join_messages(msgs):
+                start = time.monotonic()
+                try:
+                    ok = self._client(webhook).notify(body=body)
+                except Exception as e:
+                    ok = False
+                    print(f"Failed to send notification: {e}")
+                if self.latency is not None:
+                    self.latency.observe(time.monotonic() - start)
+                if ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+
+def _join_messages(msgs):
+    """Join messages with newlines, split so no body exceeds MAX_MESSAGE_LENGTH."""
+    body = ""
+    for msg in msgs:
+        msg = msg[:MAX_MESSAGE_LENGTH]
+        if body and len(body) + 1 + len(msg) > MAX_MESSAGE_LENGTH:
+            yield body
+            body = ""
+        body = f"{body}\n{msg}" if body else msg
+    if body:
+        yield body
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = Dispatcher()
+        return _dispatcher
+
+def send_msg(msg, webhook=None):
+    webhook = webhook or discord_user_webhook
+    assert webhook is not None
+    get_dispatcher().submit(webhook, msg)
 
-def send_msg(msg):
-    assert discord_user_webhook is not None
-    apobj = Apprise()
-    apobj.add(discord_user_webhook)
-    apobj.notify(
-        body=msg,
-        # title="7 Days to Die",
-    )
 def send_sys_msg(msg):
     assert discord_system_webhook is not None
-    apobj = Apprise()
-    apobj.add(discord_system_webhook)
-    apobj.notify(
-        body=msg,
-        # title="7 Days to Die",
-    )
\ No newline at end of file
+    get_dispatcher().submit(discord_system_webhook, msg)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Builds a session index from 7d2d server logs and answers playtime/concurrency questions from it.
+
+Logins and logouts are found with the same rules as watch.py. Every log file is
+one server run, whoever is still online at its last line is logged out there.
+
+Usage:
+    python playtime.py build <index_file> output_log__*.txt
+    python playtime.py report <index_file> [YYYY-MM-DDTHH:MM:SS]
+"""
+import os
+import sys
+from datetime import datetime
+from rules import RULES, RuleSet
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from sessions import JOIN, LEAVE, RESTART, SessionIndex, pair_sessions
+
+def _timestamp(line):
+    # "2026-03-14T19:43:16 394.479 INF ..."
+    try:
+        return datetime.fromisoformat(line[:19]).timestamp()
+    except ValueError:
+        return None
+
+class EventCollector:
+    """Stands in for LogEventHandler, the session rules record events instead of notifying."""
+    def __init__(self):
+        self.events = []
+        self.line = ""
+
+    def add(self, kind, name):
+        ts = _timestamp(self.line)
+        if ts is not None:
+            self.events.append((ts, name, kind))
+
+    def read_file(self, path, rules):
+        last = None
+        with open(path, "r", encoding="utf-8", errors="ignore") as file:
+            for line in file:
+                if line[:2] == "20":
+                    last = line
+                self.line = line
+                rules.dispatch(line, self)
+        if last is not None and _timestamp(last) is not None:
+            self.events.append((_timestamp(last), None, RESTART))
+
+RULES_BY_NAME = {rule.name: rule for rule in RULES}
+SESSION_RULES = RuleSet([
+    RULES_BY_NAME["login"]._replace(handler=lambda collector, match: collector.add(JOIN, match.group(1))),
+    RULES_BY_NAME["logout"]._replace(handler=lambda collector, match: collector.add(LEAVE, match.group(1))),
+])
+
+def build_index(paths):
+    collector = EventCollector()
+    # Log names start with the date, so this is oldest first
+    for path in sorted(paths):
+        collector.read_file(path, SESSION_RULES)
+    return SessionIndex(pair_sessions(collector.events))
+
+def report(index, at=None):
+    message = "Playtime:\n"
+    for name, seconds in sorted(index.playtime.items(), key=lambda item: item[1], reverse=True):
+        message += f"{name}: {seconds / 3600:.1f}h\n"
+    message += "\nPeak players per day:\n"
+    for day, peak in sorted(index.peak_per_day().items()):
+        message += f"{day}: {peak}\n"
+    if at is not None:
+        message += f"\nOnline at {at}: {index.concurrency_at(datetime.fromisoformat(at).timestamp())}\n"
+    return message
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3 and sys.argv[1] == "build":
+        index = build_index(sys.argv[3:])
+        index.save(sys.argv[2])
+        print(f"{len(index)} sessions of {len(index.names)} players")
+    elif len(sys.argv) > 2 and sys.argv[1] == "report":
+        print(report(SessionIndex.load(sys.argv[2]), sys.argv[3] if len(sys.argv) > 3 else None))
+    else:
+        print(__doc__)
@@ -0,0 +1,78 @@
+import re
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# prefilter: plain substring that must be in the line before the regex runs
+# regex:     precompiled pattern, its match object is handed to the handler
+# handler:   handler(watcher, match), watcher is the LogEventHandler
+Rule = namedtuple("Rule", ["name", "prefilter", "regex", "handler"])
+
+
+def line_time(match):
+    """Epoch seconds of the matched log line, now for lines without a timestamp."""
+    try:
+        # "2026-03-14T19:43:16 394.479 INF ...", replays and catch-ups get the time it happened
+        return datetime.fromisoformat(match.string[:19]).timestamp()
+    except ValueError:
+        return time.time()
+
+def on_login(watcher, match):
+    # False for a reconnect within the grace period or a second spawn of someone online
+    if watcher.player_login(match.group(1), line_time(match)):
+        watcher.send_msg(f"Player {match.group(1)} logged in")
+
+def on_logout(watcher, match):
+    # The watcher announces it once the grace period is over without the player coming back
+    watcher.player_logout(match.group(1), line_time(match))
+
+def on_death(watcher, match):
+    watcher.send_msg(watcher.randomDied(match.group(1)))
+
+def on_server_registered(watcher, match):
+    watcher.send_sys_msg("Server registered, it should be ready now")
+
+
+# Adding an event (airdrop, blood moon, trader, ...) is just adding a line here
+RULES = (
+    Rule("login", "PlayerSpawnedInWorld (reason: ",
+         re.compile(r"reason: (?:JoinMultiplayer|EnterMultiplayer).*?PlayerName='(.*?)'"), on_login),
+    Rule("logout", "disconnected after",
+         re.compile(r"Player (.*?) disconnected after"), on_logout),
+    Rule("death", "GMSG: Player",
+         re.compile(r"Player '(.+)' died"), on_death),
+    Rule("server_registered", "[EOS] Server registered, session:",
+         re.compile(r"\[EOS\] Server registered, session:"), on_server_registered),
+)
+
+
+class RuleSet:
+    def __init__(self, rules=RULES, on_match=None):
+        self.rules = tuple(rules)
+        # on_match(watcher, rule_name, match), called after the handler of every rule that fired
+        self.on_match = on_match
+        # (literal, rules with that prefilter): every line is scanned once per distinct literal,
+        # the rules behind a literal that is found run without scanning for it again
+        by_literal = {}
+        for rule in self.rules:
+            by_literal.setdefault(rule.prefilter, []).append(rule)
+        self._dispatch = tuple((literal, tuple(rules)) for literal, rules in by_literal.items())
+        # Times each rule fired, by rule name
+        self.matches = dict.fromkeys((rule.name for rule in self.rules), 0)
+
+    def dispatch(self, line, watcher):
+        """Runs every matching rule on the line, returns how many fired."""
+        fired = 0
+        # Nearly all lines match nothing, they cost one substring search per literal and no regex
+        for literal, rules in self._dispatch:
+            if literal not in line:
+                continue
+            for rule in rules:
+                match = rule.regex.search(line)
+                if match:
+                    rule.handler(watcher, match)
+                    if self.on_match is not None:
+                        self.on_match(watcher, rule.name, match)
+                    self.matches[rule.name] += 1
+                    fired += 1
+        return fired
@@ -0,0 +1,114 @@
+import json
+import os
+import pytest
+import watch
+from checkpoint import Checkpoint
+from watch import LogEventHandler
+
+LOG_MATCH = "output_log__20*_Rebirth_run_3.txt"
+OLD = "output_log__2026-03-14__19-40-00_Rebirth_run_3.txt"
+NEW = "output_log__2026-03-15__08-00-00_Rebirth_run_3.txt"
+
+def died(name):
+    return f"2026-03-14T19:50:00 814.002 INF GMSG: Player '{name}' died\n".encode()
+
+class RecordingHandler(LogEventHandler):
+    """Keeps the names of who died instead of sending anything to discord."""
+    def __init__(self, log_dir):
+        self.sent = []
+        LogEventHandler.__init__(self, str(log_dir), LOG_MATCH, "run3")
+
+    def send_msg(self, msg):
+        self.sent.append(msg)
+
+    def send_sys_msg(self, msg):
+        pass
+
+    def randomDied(self, player_name):
+        return player_name
+
+def append(path, data, mtime=None):
+    with open(path, "ab") as f:
+        f.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+@pytest.fixture
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch, "CHECKPOINT_FILE", str(tmp_path / "checkpoint_{run}.json"))
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    append(log_dir / OLD, died("Before") + b"noise\n", mtime=1_000_000)
+    return log_dir
+
+def stopped(handler):
+    """What a clean shutdown does: read what is there and force the checkpoint out."""
+    handler.process_lines()
+    handler.checkpoint.save(handler.tailer, force=True)
+    handler.tailer.close()
+    return handler.sent
+
+def test_first_start_begins_at_the_end(log_dir):
+    handler = RecordingHandler(log_dir)
+    append(log_dir / OLD, died("Ana"))
+    assert stopped(handler) == ["Ana"]
+
+def test_resumes_at_the_saved_offset(log_dir):
+    handler = RecordingHandler(log_dir)
+    append(log_dir / OLD, died("Ana") + died("Bo"))
+    assert stopped(handler) == ["Ana", "Bo"]
+    # Written while the watcher was down, the last line still incomplete
+    append(log_dir / OLD, died("Cy") + died("Dee")[:20])
+    restarted = RecordingHandler(log_dir)
+    restarted.process_lines()
+    append(log_dir / OLD, died("Dee")[20:])
+    assert stopped(restarted) == ["Cy", "Dee"]
+
+def test_stale_checkpoint_starts_at_the_end(log_dir):
+    stopped(RecordingHandler(log_dir))
+    checkpoint = json.loads((log_dir.parent / "checkpoint_run3.json").read_text())
+    # Same path, but the checkpoint was taken of another file
+    checkpoint["inode"] += 1
+    (log_dir.parent / "checkpoint_run3.json").write_text(json.dumps(checkpoint))
+    append(log_dir / OLD, died("Missed"))
+    handler = RecordingHandler(log_dir)
+    append(log_dir / OLD, died("Ana"))
+    assert stopped(handler) == ["Ana"]
+
+def test_truncated_file_starts_at_the_end(log_dir):
+    handler = RecordingHandler(log_dir)
+    append(log_dir / OLD, died("Ana") * 10)
+    stopped(handler)
+    # Smaller than when the checkpoint was saved: not the content it was taken of
+    (log_dir / OLD).write_bytes(died("Missed"))
+    restarted = RecordingHandler(log_dir)
+    append(log_dir / OLD, died("Bo"))
+    assert stopped(restarted) == ["Bo"]
+
+def test_catches_up_on_the_old_file_when_a_new_one_appeared(log_dir):
+    stopped(RecordingHandler(log_dir))
+    # The server wrote more to the old file, then restarted into a new one
+    append(log_dir / OLD, died("Ana"), mtime=1_000_100)
+    append(log_dir / NEW, died("Bo"), mtime=1_000_200)
+    handler = RecordingHandler(log_dir)
+    assert handler.current_file == str(log_dir / NEW)
+    append(log_dir / NEW, died("Cy"))
+    assert stopped(handler) == ["Ana", "Bo", "Cy"]
+    # The checkpoint follows the new file
+    assert Checkpoint(watch.CHECKPOINT_FILE.format(run="run3")).load()["path"] == str(log_dir / NEW)
+
+def test_saves_at_most_once_per_interval(tmp_path, monkeypatch):
+    path = tmp_path / "server.log"
+    append(path, died("Ana"))
+    tailer = watch.LogTailer(str(path), offset=0)
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"), interval=60)
+    # Whatever the monotonic clock reads, the first save is written
+    monkeypatch.setattr("checkpoint.time.monotonic", lambda: 1.0)
+    checkpoint.save(tailer)
+    assert checkpoint.load()["offset"] == 0
+    list(tailer.lines())
+    checkpoint.save(tailer)
+    assert checkpoint.load()["offset"] == 0
+    checkpoint.save(tailer, force=True)
+    assert checkpoint.load() == {"path": str(path), "inode": tailer.inode, "size": tailer.offset,
+                                 "offset": tailer.offset}
@@ -0,0 +1,74 @@
+import re
+from rules import Rule, RuleSet, RULES
+
+LOGIN = ("2026-03-14T19:43:16 394.479 INF PlayerSpawnedInWorld (reason: JoinMultiplayer, position: 342, 49, -541): "
+         "EntityID=171, PltfmId='Steam_76561198025499751', CrossId='EOS_0002', OwnerID='Steam_76561198025499751', "
+         "PlayerName='Lost', ClientNumber='1'")
+LOGOUT = "2026-03-14T20:05:00 1724.151 INF Player Lost disconnected after 21.7 minutes"
+DEATH = "2026-03-14T19:50:00 814.002 INF GMSG: Player 'Lost' died"
+REGISTERED = "2026-03-14T19:40:01 12.512 INF [EOS] Server registered, session: 4ad5ad6e5e1c4f9b8b0c2b7de1bd8f3a"
+
+class Watcher:
+    """Records what the handlers ask of the LogEventHandler."""
+    def __init__(self):
+        self.calls = []
+
+    def send_msg(self, msg):
+        self.calls.append(("send_msg", msg))
+
+    def send_sys_msg(self, msg):
+        self.calls.append(("send_sys_msg", msg))
+
+    def player_login(self, name, ts):
+        self.calls.append(("login", name, ts))
+        return True
+
+    def player_logout(self, name, ts):
+        self.calls.append(("logout", name, ts))
+
+    def randomDied(self, name):
+        return f"{name} died"
+
+def test_every_rule_fires_its_handler():
+    rules = RuleSet()
+    watcher = Watcher()
+    for line in (LOGIN, LOGOUT, DEATH, REGISTERED):
+        assert rules.dispatch(line, watcher) == 1
+    assert [call[:2] for call in watcher.calls] == [
+        ("login", "Lost"), ("send_msg", "Player Lost logged in"), ("logout", "Lost"),
+        ("send_msg", "Lost died"), ("send_sys_msg", "Server registered, it should be ready now")]
+    # Handlers get the time of the log line, not the time it was read
+    assert watcher.calls[2][2] - watcher.calls[0][2] == 21 * 60 + 44
+    assert rules.matches == {"login": 1, "logout": 1, "death": 1, "server_registered": 1}
+
+def test_lines_matching_nothing():
+    rules = RuleSet()
+    watcher = Watcher()
+    lines = [
+        "2026-03-14T19:43:17 395.001 INF Time: 6.52m FPS: 32.19 Heap: 1208.0MB Max: 1208.0MB Chunks: 441 CGO: 14",
+        # Prefilter found, regex not matching: a spawn that is not a login
+        "2026-03-14T19:43:16 394.479 INF PlayerSpawnedInWorld (reason: Teleport, position: 1, 2, 3): PlayerName='Lost'",
+        "",
+    ]
+    assert [rules.dispatch(line, watcher) for line in lines] == [0, 0, 0]
+    assert watcher.calls == []
+    assert set(rules.matches.values()) == {0}
+
+def test_counts_and_on_match():
+    seen = []
+    rules = RuleSet(on_match=lambda watcher, name, match: seen.append((name, match.group(1))))
+    watcher = Watcher()
+    for line in (DEATH, DEATH, LOGIN):
+        rules.dispatch(line, watcher)
+    assert seen == [("death", "Lost"), ("death", "Lost"), ("login", "Lost")]
+    assert rules.matches == {"login": 1, "logout": 0, "death": 2, "server_registered": 0}
+
+def test_rules_sharing_a_literal_all_run():
+    fired = []
+    extra = Rule("death_count", "GMSG: Player", re.compile(r"Player '(.+)' died"),
+                 lambda watcher, match: fired.append(match.group(1)))
+    rules = RuleSet(RULES + (extra,))
+    watcher = Watcher()
+    assert rules.dispatch(DEATH, watcher) == 2
+    assert fired == ["Lost"]
+    assert watcher.calls == [("send_msg", "Lost died")]
@@ -0,0 +1,149 @@
+import asyncio
+import gzip
+import io
+import os
+import sys
+from config import DEATH_MESSAGES
+from watch import ReplaySource, TelnetLogSource
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "7d2dTimeReset"))
+from fake_telnet import FakeConsole, serve
+
+def spawn(name, reason="JoinMultiplayer", ts="2026-03-14T19:43:16"):
+    return (f"{ts} 394.479 INF PlayerSpawnedInWorld (reason: {reason}, position: 342, 49, -541): EntityID=171, "
+            f"PltfmId='Steam_76561198025499751', CrossId='EOS_0002', OwnerID='Steam_76561198025499751', "
+            f"PlayerName='{name}', ClientNumber='1'")
+
+def died(name, ts="2026-03-14T19:50:00"):
+    return f"{ts} 814.002 INF GMSG: Player '{name}' died"
+
+def left(name, ts="2026-03-14T20:05:00"):
+    return f"{ts} 1724.151 INF Player {name} disconnected after 21.7 minutes"
+
+REGISTERED = "2026-03-14T19:40:01 12.512 INF [EOS] Server registered, session: 4ad5ad6e5e1c4f9b8b0c2b7de1bd8f3a"
+NOISE = "2026-03-14T19:43:17 395.001 INF Time: 6.52m FPS: 32.19 Heap: 1208.0MB Max: 1208.0MB Chunks: 441 CGO: 14"
+
+class RecordingSource(TelnetLogSource):
+    """Keeps the notifications instead of sending them to discord."""
+    def __init__(self, port, grace=60):
+        TelnetLogSource.__init__(self, "127.0.0.1", port, "secret", "test", timeout=5, max_backoff=1)
+        self.presence.grace = grace
+        self.sent = []
+
+    def send_msg(self, msg):
+        self.sent.append(("user", msg))
+
+    def send_sys_msg(self, msg):
+        self.sent.append(("system", msg))
+
+class RestartingConsole(FakeConsole):
+    """Streams one list of log lines per connection and drops all but the last, like a server restart."""
+    def __init__(self, sessions):
+        FakeConsole.__init__(self)
+        self.sessions = list(sessions)
+
+    async def handle(self, reader, writer):
+        self.log_lines = self.sessions.pop(0)
+        if not self.sessions:
+            return await FakeConsole.handle(self, reader, writer)
+        writer.write(b"Please enter password:\r\n")
+        await reader.readline()
+        writer.write(b"Logon successful.\r\n\r\n")
+        writer.write("".join(f"{line}\r\n" for line in self.log_lines).encode())
+        await writer.drain()
+        writer.close()
+
+def follow(console, count, grace=60):
+    """Runs a source against console until it sent count notifications, returns the source."""
+    async def run():
+        server = await serve(0, console)
+        source = RecordingSource(server.sockets[0].getsockname()[1], grace)
+        task = asyncio.create_task(source.follow())
+        while len(source.sent) < count and not task.done():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        server.close()
+        return source
+    return asyncio.run(asyncio.wait_for(run(), 10))
+
+def test_recorded_log_lines_notify():
+    lines = [REGISTERED, spawn("Lost"), NOISE, spawn("Lost", "EnterMultiplayer", "2026-03-14T19:45:00"),
+             died("Lost"), left("Lost")]
+    source = follow(FakeConsole(log_lines=lines), 5, grace=0)
+    assert source.sent[0] == ("system", f"Log watcher process started. Using telnet 127.0.0.1:{source.port}")
+    assert source.sent[1] == ("system", "Server registered, it should be ready now")
+    assert source.sent[2] == ("user", "Player Lost logged in")
+    assert source.sent[3][0] == "user"
+    assert source.sent[3][1] in [message.replace("{player}", "Lost") for message in DEATH_MESSAGES]
+    assert source.sent[4] == ("user", "Player Lost logged out")
+    assert len(source.sent) == 5
+    # Plus the help banner after "Logon successful."
+    assert source.lines == len(lines) + 3
+    # The second spawn while online was not announced
+    assert source.presence.suppressed["duplicate_login"] == 1
+
+def test_reconnect_within_grace_not_announced():
+    lines = [spawn("Lost"), left("Lost", "2026-03-14T20:05:00"), spawn("Lost", ts="2026-03-14T20:05:30"),
+             spawn("Ana", ts="2026-03-14T20:06:00")]
+    source = follow(FakeConsole(log_lines=lines), 3)
+    assert source.sent[1:] == [("user", "Player Lost logged in"), ("user", "Player Ana logged in")]
+    assert source.presence.suppressed["reconnect"] == 1
+    # Lost's logout would only be announced after the grace period, Lost came back within it
+    assert source.presence.due(float("inf")) == []
+
+def test_reconnect_resets_presence():
+    console = RestartingConsole([
+        [REGISTERED, spawn("Lost"), spawn("Lost", "EnterMultiplayer")],
+        # Server restarted: the log stream starts over, without the players logging out
+        [REGISTERED, spawn("Lost", ts="2026-03-14T21:00:00")],
+    ])
+    source = follow(console, 6)
+    assert source.sent == [
+        ("system", f"Log watcher process started. Using telnet 127.0.0.1:{source.port}"),
+        ("system", "Server registered, it should be ready now"),
+        ("user", "Player Lost logged in"),
+        ("system", "Telnet log stream reconnected, server restarted?"),
+        ("system", "Server registered, it should be ready now"),
+        # Announced again, the reconnect forgot who was online
+        ("user", "Player Lost logged in"),
+    ]
+    assert source.presence.suppressed["duplicate_login"] == 1
+
+def replayed(*paths):
+    sink = io.StringIO()
+    source = ReplaySource("run3", sink=sink)
+    for path in paths:
+        source.replay_file(path)
+    source.flush_logouts(float("inf"))
+    return source, sink.getvalue()
+
+def test_replay_is_deterministic(tmp_path):
+    lines = [REGISTERED, spawn("Lost"), NOISE, died("Lost"), died("Lost", "2026-03-14T19:55:00"),
+             spawn("Ana", ts="2026-03-14T19:56:00"), left("Lost"), "2026-03-14T20:06:00 1785.2 INF caf\u00e9 \u00e9t\u00e9"]
+    # Windows servers write CRLF, and the last line has no newline
+    data = "\r\n".join(lines).encode()
+    plain = tmp_path / "output_log__2026-03-14__19-00-00.txt"
+    plain.write_bytes(data)
+    compressed = tmp_path / "output_log__2026-03-14__19-00-00.txt.gz"
+    compressed.write_bytes(gzip.compress(data))
+
+    source, sink = replayed(str(plain))
+    records = [line.split("\t") for line in sink.splitlines()]
+    # Death messages are picked at random, checked below
+    deaths = [records[2].pop(), records[3].pop()]
+    assert records == [
+        ["2026-03-14T19:40:01", "run3", "system", "Server registered, it should be ready now"],
+        ["2026-03-14T19:43:16", "run3", "user", "Player Lost logged in"],
+        ["2026-03-14T19:50:00", "run3", "user"],
+        ["2026-03-14T19:55:00", "run3", "user"],
+        ["2026-03-14T19:56:00", "run3", "user", "Player Ana logged in"],
+        ["2026-03-14T20:06:00", "run3", "user", "Player Lost logged out"],
+    ]
+    assert all(death in [message.replace("{player}", "Lost") for message in DEATH_MESSAGES] for death in deaths)
+    assert source.notifications == 6
+    # Same logs, same sink, death messages included; .gz counts the bytes of the log it holds
+    for again in (plain, compressed):
+        other, other_sink = replayed(str(again))
+        assert other_sink == sink
+        assert (other.lines, other.bytes) == (len(lines), len(data))
@@ -1,24 +1,107 @@
+import argparse
 import signal
 import os
+import sys
 import glob
+import gzip
+import math
 import random
-import re
+import threading
+import time
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from notif import send_msg, send_sys_msg
-from config import LOG_DIR, LOG_MATCH, DEATH_MESSAGES
+from config import TARGETS, DEATH_MESSAGES, CHECKPOINT_FILE, DEBOUNCE_WINDOW, DEBOUNCE_MAX_LATENCY
+from config import LOG_SOURCE, TELNET_HOST, TELNET_PORTS, TELNET_PASSWORD, METRICS_PORT, METRICS_HOST, EVENT_STORE
+from config import PRESENCE_GRACE
+from checkpoint import Checkpoint
+from rules import RuleSet, line_time
 import fnmatch
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+import notif
+from tailer import LogTailer
+from debounce import Debouncer
+import metrics
+from eventstore import EventStore, LOGIN, LOGOUT, DEATH, RESTART_EVENT
+from presence import PlayerTracker
 
-class LogEventHandler(FileSystemEventHandler):
-    def __init__(self):
+LINES = metrics.REGISTRY.counter("logwatcher_lines_total", "Log lines processed")
+BYTES_READ = metrics.REGISTRY.counter("logwatcher_bytes_read_total", "Bytes read from the log files")
+LAG = metrics.REGISTRY.gauge("logwatcher_lag_bytes", "Bytes written to the current log file that were not read yet")
+SUPPRESSED = metrics.REGISTRY.counter("logwatcher_presence_suppressed_total", "Logins and logouts not announced: reconnects, duplicate spawns")
+# Pending logouts are announced this often, their grace period is PRESENCE_GRACE
+FLUSH_INTERVAL = 1
+# Rules whose events go to the event store, and as what
+STORED_EVENTS = {"login": LOGIN, "logout": LOGOUT, "death": DEATH, "server_registered": RESTART_EVENT}
+
+def store_events(store):
+    """RuleSet on_match that queues the events for store, timestamped with their log line."""
+    def on_match(watcher, name, match):
+        event_type = STORED_EVENTS.get(name)
+        if event_type is None:
+            return
+        # Every login and logout is stored, flapping or not, only the notifications are filtered
+        store.add(watcher.run, event_type, match.group(1) if match.re.groups else None, line_time(match))
+    return on_match
+
+class WorldEvents:
+    """What the rules need from a line source: notifications for one world, prefixed with its run label."""
+    def __init__(self, run, webhook=None, rules=None):
+        self.run = run
+        self.webhook = webhook
+        self.rules = rules or RuleSet()
+        self.presence = PlayerTracker(PRESENCE_GRACE)
+        for reason in self.presence.suppressed:
+            SUPPRESSED.track(lambda reason=reason: self.presence.suppressed[reason], run=run, reason=reason)
+
+    def player_login(self, name, ts):
+        """Whether the login is worth announcing, see PlayerTracker."""
+        self.flush_logouts(ts)
+        return self.presence.login(name, ts)
+
+    def player_logout(self, name, ts):
+        self.presence.logout(name, ts)
+        # Sent right away with PRESENCE_GRACE=0
+        self.flush_logouts(ts)
+
+    def flush_logouts(self, now=None):
+        """Announces the logouts whose grace period is over by now, every pending one with math.inf."""
+        for name in self.presence.due(time.time() if now is None else now):
+            self.send_msg(f"Player {name} logged out")
+
+    def send_msg(self, msg):
+        notif.send_msg(f"[{self.run}] {msg}", webhook=self.webhook)
+
+    def send_sys_msg(self, msg):
+        notif.send_sys_msg(f"[{self.run}] {msg}")
+
+    def randomDied(self, player_name):
+        message_template = random.choice(DEATH_MESSAGES)
+        return message_template.replace("{player}", player_name)
+
+    def parse_line(self, line):
+        """Parses a single line for events."""
+        self.rules.dispatch(line, self)
+
+class LogEventHandler(WorldEvents, FileSystemEventHandler):
+    """Follows the newest log file of one world, only gets events for its own directory."""
+    def __init__(self, log_dir, log_match, run, webhook=None, rules=None, debouncer=None):
+        WorldEvents.__init__(self, run, webhook, rules)
+        self.log_dir = log_dir
+        self.log_match = log_match
         self.current_file = None
-        self.file_handle = None
+        self.tailer = None
         self.seek_end = True
+        # Without a debouncer every modification event is read right away
+        self.debouncer = debouncer
+        # Reads happen on the debouncer thread, file switches on the observer thread
+        self.lock = threading.RLock()
+        self.checkpoint = Checkpoint(CHECKPOINT_FILE.format(run=run))
         self.update_current_file(init=True)
+        LAG.track(self.lag, run=run)
 
     def update_current_file(self, init=False):
         """Finds the latest log file and opens it."""
-        search_path = os.path.join(LOG_DIR, f"{LOG_MATCH}")
+        search_path = os.path.join(self.log_dir, self.log_match)
         files = glob.glob(search_path)
 
         if not files:
@@ -29,92 +112,287 @@ class LogEventHandler(FileSystemEventHandler):
 
         if latest_file != self.current_file:
             if not init:
-                send_sys_msg(f"New log file detected, server restarted? {latest_file}")
+                self.send_sys_msg(f"New log file detected, server restarted? {latest_file}")
+                self.presence.reset()
             else:
-                send_sys_msg(f"Log watcher process started. Using {latest_file}")
+                self.send_sys_msg(f"Log watcher process started. Using {latest_file}")
             # print(f"Switching to new log file: {latest_file}")
-            if self.file_handle:
-                self.file_handle.close()
+            if self.tailer:
+                self.tailer.close()
 
             self.current_file = latest_file
-            try:
-                self.file_handle = open(self.current_file, 'r', encoding='utf-8', errors='ignore')
-                if self.seek_end:
-                    self.file_handle.seek(0, os.SEEK_END)
-                    # Only seek to end on the very first load
-                    self.seek_end = False
-            except OSError as e:
-                print(f"Failed to open file {self.current_file}: {e}")
+            # Only start at the end (or the checkpoint) on the very first load
+            offset = self.resume_offset(latest_file) if self.seek_end else 0
+            self.tailer = LogTailer(self.current_file, offset=offset)
+            self.seek_end = False
+            self.checkpoint.save(self.tailer, force=True)
+
+    def resume_offset(self, latest_file):
+        """Where to start latest_file after a restart, None means at the end."""
+        saved = self.checkpoint.load()
+        if saved is None:
+            return None
+        try:
+            st = os.stat(saved["path"])
+        except OSError:
+            return None
+        if st.st_ino != saved["inode"] or st.st_size < saved["size"]:
+            print(f"Checkpoint for {saved['path']} is stale, starting at the end")
+            return None
+        if saved["path"] == latest_file:
+            print(f"Resuming {latest_file} at byte {saved['offset']}")
+            return saved["offset"]
+        # Server restarted while we were down: finish the old file, the new one is all unseen
+        print(f"Catching up on {saved['path']} from byte {saved['offset']}")
+        old = LogTailer(saved["path"], offset=saved["offset"])
+        for line in old.lines():
+            self.parse_line(line.strip())
+        old.close()
+        return 0
 
     def on_created(self, event):
         """Called when a file or directory is created."""
         if event.is_directory:
             return
         filename = os.fsdecode(os.path.basename(event.src_path))
-        if fnmatch.fnmatch(filename, LOG_MATCH):
-            self.update_current_file(init=False)
+        if fnmatch.fnmatch(filename, self.log_match):
+            with self.lock:
+                self.update_current_file(init=False)
 
     def on_modified(self, event):
         """Called when a file or directory is modified."""
         if not event.is_directory and event.src_path == self.current_file:
-            self.process_lines()
+            if self.debouncer:
+                self.debouncer.trigger(self)
+            else:
+                self.process_lines()
 
     def process_lines(self):
         """Reads new lines from the current file."""
-        if not self.file_handle:
-            return
+        with self.lock:
+            if not self.tailer:
+                return
+            self.tailer.check_rotation()
+            start = self.tailer.offset
+            count = 0
+            for line in self.tailer.lines():
+                count += 1
+                self.parse_line(line.strip())
+            LINES.inc(count, run=self.run)
+            BYTES_READ.inc(self.tailer.offset - start, run=self.run)
+            self.checkpoint.save(self.tailer)
+
+    def lag(self):
+        if not self.tailer:
+            return None
+        return os.path.getsize(self.current_file) - self.tailer.position
+
+class TelnetLogSource(WorldEvents):
+    """
+    Reads the log lines the server's telnet console streams live, no files or polling involved.
+
+    Authenticates once per connection and reconnects with backoff. Lines logged
+    while disconnected are not seen, unlike the file source there is no checkpoint.
+    """
+    def __init__(self, host, port, password, run, webhook=None, rules=None, timeout=10, max_backoff=60):
+        WorldEvents.__init__(self, run, webhook, rules)
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.lines = 0
+
+    async def login(self, reader, writer):
+        await reader.readuntil(b"Please enter password:")
+        writer.write(self.password + "\n")
+        while line := await reader.readline():
+            if "Logon successful" in line:
+                return
+            if "Password incorrect" in line:
+                raise PermissionError("Telnet authentication failed")
+        raise EOFError("Connection closed by server")
+
+    async def follow(self):
+        # Like asyncio, only loaded when reading from telnet, the file source starts faster without them
+        import asyncio
+        import telnetlib3 # type: ignore
+        backoff = 1
+        connected_before = False
         while True:
-            where = self.file_handle.tell()
-            line = self.file_handle.readline()
-            if not line:
-                break
+            try:
+                reader, writer = await asyncio.wait_for(telnetlib3.open_connection(self.host, self.port), self.timeout)
+                try:
+                    await asyncio.wait_for(self.login(reader, writer), self.timeout)
+                    if connected_before:
+                        self.send_sys_msg("Telnet log stream reconnected, server restarted?")
+                        self.presence.reset()
+                    else:
+                        self.send_sys_msg(f"Log watcher process started. Using telnet {self.host}:{self.port}")
+                    connected_before = True
+                    backoff = 1
+                    while line := await reader.readline():
+                        self.lines += 1
+                        LINES.inc(run=self.run)
+                        self.parse_line(line.strip())
+                    raise EOFError("Connection closed by server")
+                finally:
+                    writer.close()
+            except (OSError, EOFError, PermissionError, asyncio.TimeoutError) as e:
+                print(f"[{self.run}] Telnet {self.host}:{self.port}: {e!r}, retrying in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
 
-            # If line is incomplete (no newline), wait for more data
-            if not line.endswith('\n'):
-                self.file_handle.seek(where)
-                break
+async def flush_logouts(sources):
+    import asyncio
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        for source in sources:
+            source.flush_logouts()
 
-            self.parse_line(line.strip())
+async def follow_telnet(sources):
+    """Runs every telnet source until SIGTERM/SIGINT."""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, task.cancel)
+    try:
+        await asyncio.gather(flush_logouts(sources), *(source.follow() for source in sources))
+    except asyncio.CancelledError:
+        pass
+    for source in sources:
+        source.flush_logouts(math.inf)
+
+class ReplaySource(WorldEvents):
+    """
+    Runs old log files through the same rules as the live sources, as fast as they can be read.
+
+    Nothing is sent: notifications are counted, and written to sink (a text file) when
+    given, one per line as "<log timestamp>\t<run>\t<user|system>\t<message>".
+    Death messages are picked with a fixed seed, replaying the same logs twice gives
+    the same sink file, so it can be diffed after changing a rule.
+    """
+    def __init__(self, run, rules=None, sink=None):
+        WorldEvents.__init__(self, run, None, rules)
+        self.sink = sink
+        self.random = random.Random(0)
+        self.notifications = 0
+        self.lines = 0
+        self.bytes = 0
+        self.line = ""
+
+    def _record(self, kind, msg):
+        self.notifications += 1
+        if self.sink:
+            # "2026-03-14T19:43:16 394.479 INF ..."
+            self.sink.write(f"{self.line[:19]}\t{self.run}\t{kind}\t{msg}\n")
+
+    def send_msg(self, msg):
+        self._record("user", msg)
+
+    def send_sys_msg(self, msg):
+        self._record("system", msg)
 
     def randomDied(self, player_name):
-        message_template = random.choice(DEATH_MESSAGES)
-        return message_template.replace("{player}", player_name)
+        return self.random.choice(DEATH_MESSAGES).replace("{player}", player_name)
 
-    def parse_line(self, line):
-        """Parses a single line for events."""
-        # Login detection
-        if "PlayerSpawnedInWorld (reason: JoinMultiplayer" in line \
-        or "PlayerSpawnedInWorld (reason: EnterMultiplayer" in line:
-            match = re.search(r"PlayerName='(.*?)'", line)
-            if match:
-                name = match.group(1)
-                send_msg(f"Player {name} logged in")
-
-        # Logout detection
-        if "disconnected after" in line:
-            match = re.search(r"Player (.*?) disconnected after", line)
-            if match:
-                name = match.group(1)
-                send_msg(f"Player {name} logged out")
-
-        # You died
-        if 'GMSG: Player' in line \
-        and 'died' in line:
-            match = re.search(r"Player '(.+)' died", line)
-            if match:
-                name = match.group(1)
-                send_msg(self.randomDied(name))
-
-        # Server ready
-        if '[EOS] Server registered, session:' in line:
-            send_sys_msg("Server registered, it should be ready now")
+    def replay_file(self, path):
+        """Every line of path (plain or .gz), the last one even without a newline."""
+        opener = gzip.open if path.endswith(".gz") else open
+        dispatch = self.rules.dispatch
+        count = 0
+        # Every log file is one server run
+        self.presence.reset()
+        with opener(path, "rt", encoding="utf-8", errors="ignore") as file:
+            for line in file:
+                self.line = line
+                dispatch(line.strip(), self)
+                count += 1
+            # Read to the end: for a .gz that is the size of the log it holds, not the compressed file
+            self.bytes += file.buffer.tell()
+        self.lines += count
 
-if __name__ == "__main__":
-    event_handler = LogEventHandler()
+def replay(argv):
+    parser = argparse.ArgumentParser(prog="watch.py replay",
+                                     description="Runs old log files through the rules without notifying anyone.")
+    parser.add_argument("files", nargs="+", help="output_log__*.txt files, plain or .gz, replayed oldest first")
+    parser.add_argument("--run", default="replay", help="Run label for the sink file")
+    parser.add_argument("--sink", help="Write the notifications that would have been sent to this file, - for stdout")
+    parser.add_argument("--store", help="Add the events to this event store, use the live run label with --run to backfill it")
+    args = parser.parse_args(argv)
+
+    sink = sys.stdout if args.sink == "-" else open(args.sink, "w") if args.sink else None
+    # Keep the report apart from the notifications when both go to stdout
+    report = sys.stderr if args.sink == "-" else sys.stdout
+    # A backfill has no tail loop to keep up with, wait for the writer rather than lose events
+    store = EventStore(args.store, block=True) if args.store else None
+    source = ReplaySource(args.run, RuleSet(on_match=store_events(store) if store else None), sink)
+    start = time.perf_counter()
+    # Log names start with the date, so this is oldest first
+    for path in sorted(args.files):
+        source.replay_file(path)
+    source.flush_logouts(math.inf)
+    elapsed = time.perf_counter() - start
+    if sink and sink is not sys.stdout:
+        sink.close()
+
+    print(f"{len(args.files)} files, {source.lines:,} lines, {source.bytes / 1e6:.1f} MB in {elapsed:.2f}s "
+          f"({source.lines / elapsed:,.0f} lines/s, {source.bytes / 1e6 / elapsed * 60:,.0f} MB/min)", file=report)
+    print(f"{source.notifications} notifications: " +
+          ", ".join(f"{name} {count}" for name, count in source.rules.matches.items()), file=report)
+    print("Not announced: " + ", ".join(f"{reason} {count}" for reason, count in source.presence.suppressed.items()), file=report)
+    if store:
+        store.stop()
+        print(f"{store.written} events stored in {args.store}, {store.dropped} dropped", file=report)
+
+def serve_metrics(rules, debouncer=None, store=None):
+    """Exposes what is counted anyway on METRICS_HOST:METRICS_PORT/metrics."""
+    registry = metrics.REGISTRY
+    matches = registry.counter("logwatcher_rule_matches_total", "Lines that fired a rule")
+    for rule in rules.rules:
+        matches.track(lambda name=rule.name: rules.matches[name], rule=rule.name)
+    if debouncer:
+        # More events than reads is the debouncer merging bursts, not a backlog
+        registry.counter("logwatcher_modification_events_total", "watchdog modification events").track(lambda: debouncer.events)
+        registry.counter("logwatcher_reads_total", "Debounced reads of the log files").track(lambda: debouncer.runs)
+    dispatcher = notif.get_dispatcher()
+    dispatcher.latency = registry.histogram("logwatcher_webhook_latency_seconds", "Time to send one discord notification")
+    registry.gauge("logwatcher_notification_queue_depth", "Notifications waiting to be sent").track(dispatcher.queue_depth)
+    registry.counter("logwatcher_notifications_sent_total", "Notifications sent").track(lambda: dispatcher.sent)
+    registry.counter("logwatcher_notifications_failed_total", "Notifications that could not be sent").track(lambda: dispatcher.failed)
+    registry.counter("logwatcher_notifications_dropped_total", "Notifications dropped on a full queue").track(lambda: dispatcher.dropped)
+    registry.counter("logwatcher_notifications_rate_limited_total", "429 answers from discord, retried").track(lambda: dispatcher.rate_limited)
+    if store:
+        registry.counter("logwatcher_events_stored_total", "Events written to the event store").track(lambda: store.written)
+        registry.counter("logwatcher_events_dropped_total", "Events the event store had no room for").track(lambda: store.dropped)
+    return metrics.serve(METRICS_PORT, METRICS_HOST)
+
+def watch_telnet(rules, store=None):
+    import asyncio
+    if METRICS_PORT:
+        serve_metrics(rules, store=store)
+    sources = []
+    for log_dir, log_match, run, webhook in TARGETS:
+        sources.append(TelnetLogSource(TELNET_HOST, TELNET_PORTS[run], TELNET_PASSWORD, run, webhook, rules))
+        print(f"Reading the telnet log stream of {run} on {TELNET_HOST}:{TELNET_PORTS[run]}...")
+    asyncio.run(follow_telnet(sources))
+    print(f"{sum(source.lines for source in sources)} lines read")
+
+def watch_files(rules, store=None):
+    # One observer for every world, directories shared by several targets are watched once
+    # Log lines are flushed one by one, read once per burst instead of once per line
+    debouncer = Debouncer(LogEventHandler.process_lines, DEBOUNCE_WINDOW, DEBOUNCE_MAX_LATENCY)
+    if METRICS_PORT:
+        serve_metrics(rules, debouncer, store)
     observer = Observer()
-    observer.schedule(event_handler, path=LOG_DIR, recursive=False)
+    handlers = []
+    for log_dir, log_match, run, webhook in TARGETS:
+        event_handler = LogEventHandler(log_dir, log_match, run, webhook, rules, debouncer)
+        observer.schedule(event_handler, path=log_dir, recursive=False)
+        handlers.append(event_handler)
+        print(f"Monitoring {log_dir} for {log_match} as {run}...")
     observer.start()
-    print(f"Monitoring {LOG_DIR} for {LOG_MATCH}...")
 
     def teardown(signum, frame):
         observer.stop()
@@ -122,4 +400,29 @@ if __name__ == "__main__":
     signal.signal(signal.SIGTERM, teardown)
     signal.signal(signal.SIGINT, teardown)
 
-    observer.join()
+    # Pending logouts are announced from here, once their grace period is over
+    while observer.is_alive():
+        observer.join(FLUSH_INTERVAL)
+        for event_handler in handlers:
+            with event_handler.lock:
+                event_handler.flush_logouts()
+    debouncer.stop()
+    for event_handler in handlers:
+        event_handler.flush_logouts(math.inf)
+    print(f"{debouncer.events} modification events, {debouncer.runs} reads")
+    for event_handler in handlers:
+        event_handler.checkpoint.save(event_handler.tailer, force=True)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["replay"]:
+        replay(sys.argv[2:])
+    else:
+        store = EventStore(EVENT_STORE) if EVENT_STORE else None
+        rules = RuleSet(on_match=store_events(store) if store else None)
+        if LOG_SOURCE == "telnet":
+            watch_telnet(rules, store)
+        else:
+            watch_files(rules, store)
+        notif.get_dispatcher().stop()
+        if store:
+            store.stop()
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Throughput, peak memory and per-event latency of every log parser in the repo,
+on synthetic logs from common/loggen.py (same seed, same input every run).
+
+Nothing is sent anywhere: notifications and webhooks go to a list.
+lines/s is the best of --repeat runs, peak memory is measured in a separate run
+under tracemalloc, latency is how long one event line takes from being handed
+to the parser (or appended to the file for the tailers) until its notification.
+
+Startup is the import time of each entry point in a fresh interpreter
+(python -X importtime), best of --repeat, with its heaviest direct imports.
+
+Some parsers are also timed against the code they replaced (bench_parse.py and
+bench_stats.py keep it) on the same input in the same run. The run exits 1 when
+one of them lost more than --threshold of its expected speedup: the one saved in
+the baseline, or without one its SPEEDUPS entry. Fixed costs (process pools, file
+setup) weigh more on small inputs, so speedups are only checked from
+SPEEDUP_MIN_LINES lines and SPEEDUP_MIN_REPEAT repeats on, the defaults.
+
+The baseline is per machine and not committed: run --save once on a machine
+(bench/baseline.json by default), later runs there compare against it and exit 1
+when a benchmark lost more than --threshold of its lines/s, or an entry point got
+that much slower to import.
+
+Usage: python bench/suite.py [--lines N] [--repeat N] [--only NAME] [--save] [--threshold 0.2]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("common", "7d2d/log_watcher", "7d2d/7d2dTimeReset", "enshrouded", "valheim"):
+    sys.path.append(os.path.join(ROOT, directory))
+import loggen
+
+BASELINE_FILE = os.path.join(ROOT, "bench", "baseline.json")
+# setup(lines, tmp) -> Case; run() does the work once, single(line) handles one event line
+Benchmark = namedtuple("Benchmark", ["name", "setup"])
+Case = namedtuple("Case", ["run", "lines", "size", "single", "event_lines"])
+# Entry point imported as its service runs it: from its own directory
+Startup = namedtuple("Startup", ["name", "directory", "module"])
+# Old implementation of a benchmark, setup(lines, tmp) -> Case on the same input
+Reference = namedtuple("Reference", ["benchmark", "setup"])
+
+class Sink:
+    """Stands in for discord: counts what would have been sent."""
+    def __init__(self):
+        self.sent = 0
+
+    def __call__(self, *args, **kwargs):
+        self.sent += 1
+
+    # Apprise client interface
+    def notify(self, *args, **kwargs):
+        self.sent += 1
+
+def _events(lines, literals):
+    return [line for line in lines if any(literal in line for literal in literals)][:200]
+
+def seven_days_parse_line(count, tmp):
+    import notif
+    import watch
+    sink = Sink()
+    notif.send_msg = notif.send_sys_msg = sink
+    handler = watch.WorldEvents("run3")
+    lines = list(loggen.seven_days_lines(count))
+
+    def run():
+        parse_line = handler.parse_line
+        for line in lines:
+            parse_line(line)
+
+    return Case(run, count, sum(map(len, lines)), handler.parse_line,
+                _events(lines, ("PlayerSpawnedInWorld", "GMSG", "disconnected after")))
+
+def seven_days_process_lines(count, tmp):
+    import notif
+    import watch
+    from tailer import LogTailer
+    sink = Sink()
+    notif.send_msg = notif.send_sys_msg = sink
+    path = os.path.join(tmp, "output_log__2026-03-14__19-00-00__Rebirth_run_3.txt")
+    lines = list(loggen.seven_days_lines(count))
+    size = loggen.write_log(path, lines)
+    handler = watch.LogEventHandler(tmp, "output_log__20*_Rebirth_run_3.txt", "run3")
+
+    def run():
+        handler.tailer = LogTailer(path, offset=0)
+        handler.process_lines()
+
+    def single(line):
+        with open(path, "a") as f:
+            f.write(line + "\n")
+        handler.process_lines()
+
+    return Case(run, count, size, single, _events(lines, ("PlayerSpawnedInWorld", "GMSG", "disconnected after")))
+
+def seven_days_replay(count, tmp):
+    import watch
+    path = os.path.join(tmp, "output_log__2026-03-14__19-00-00__Rebirth_run_3.txt")
+    lines = list(loggen.seven_days_lines(count))
+    size = loggen.write_log(path, lines)
+    source = watch.ReplaySource("run3", sink=io.StringIO())
+
+    def single(line):
+        source.line = line
+        source.parse_line(line)
+
+    return Case(lambda: source.replay_file(path), count, size, single,
+                _events(lines, ("PlayerSpawnedInWorld", "GMSG", "disconnected after")))
+
+def telnet_parsers(count, tmp):
+    from console import count_players, get_datetime
+    outputs = [loggen.listplayers_output(i % 9, seed=i) for i in range(100)]
+    times = [loggen.gettime_output(i, i % 24, i % 60) for i in range(100)]
+    rounds = max(count // 200, 1)
+
+    def run():
+        for _ in range(rounds):
+            for output in outputs:
+                count_players(output)
+            for output in times:
+                get_datetime(output)
+
+    return Case(run, rounds * 200, rounds * sum(map(len, outputs + times)), count_players, outputs[1:])
+
+def enshrouded_read_new_lines(count, tmp):
+    from captainhook import LogFileHandler
+    path = os.path.join(tmp, "enshrouded_server.log")
+    lines = list(loggen.enshrouded_lines(count))
+    size = loggen.write_log(path, lines)
+    handler = LogFileHandler(path, re.compile("Player '(.+?)' joined", re.IGNORECASE), Sink())
+
+    def run():
+        handler.tailer.reopen(0)
+        handler._read_new_lines()
+
+    def single(line):
+        with open(path, "a") as f:
+            f.write(line + "\n")
+        handler._read_new_lines()
+
+    return Case(run, count, size, single, _events(lines, ("joined",)))
+
+def enshrouded_tail_journalctl(count, tmp):
+    import asyncio
+    import captainhook
+    import journal
+    lines = list(loggen.enshrouded_lines(count))
+    data = loggen.journal_export(lines)
+
+    async def entries(data):
+        for entry in journal.read_export(io.BytesIO(data)):
+            yield entry
+
+    captainhook.follow_journal = lambda service, cursor_file: entries(data)
+    captainhook.send_webhook = Sink()
+    pattern = re.compile("Player '(.+?)' joined", re.IGNORECASE)
+    logout_pattern = re.compile("Player '(.+?)' left", re.IGNORECASE)
+    loop = asyncio.new_event_loop()
+
+    def run():
+        loop.run_until_complete(captainhook.tail_journalctl("enshrouded.service", pattern, logout_pattern, "", None))
+
+    def single(line):
+        captainhook.follow_journal = lambda service, cursor_file: entries(loggen.journal_export([line]))
+        run()
+
+    events = _events(lines, ("joined", " left"))
+    return Case(run, count, len(data), single, events)
+
+def valheim_player_stats(count, tmp):
+    from player_stats import aggregate_logins, analyze_user_trends, count_zdoid_entries_by_player
+    path = os.path.join(tmp, "character_logins.txt")
+    size = loggen.write_log(path, loggen.valheim_lines(count, noise_ratio=0.1))
+
+    def run():
+        buckets = aggregate_logins(path)
+        count_zdoid_entries_by_player(buckets=buckets)
+        analyze_user_trends(buckets=buckets)
+
+    return Case(run, count, size, None, [])
+
+def seven_days_parse_line_legacy(count, tmp):
+    from bench_parse import Watcher, legacy_parse_line
+    sent = []
+    watcher = Watcher(sent)
+    lines = list(loggen.seven_days_lines(count))
+
+    def run():
+        for line in lines:
+            legacy_parse_line(watcher, line, sent.append, sent.append)
+        sent.clear()
+
+    return Case(run, count, sum(map(len, lines)), None, [])
+
+def valheim_player_stats_legacy(count, tmp):
+    from bench_stats import legacy
+    path = os.path.join(tmp, "character_logins.txt")
+    size = loggen.write_log(path, loggen.valheim_lines(count, noise_ratio=0.1))
+    return Case(lambda: legacy(path), count, size, None, [])
+
+BENCHMARKS = [
+    Benchmark("7d2d.parse_line", seven_days_parse_line),
+    Benchmark("7d2d.process_lines", seven_days_process_lines),
+    Benchmark("7d2d.replay", seven_days_replay),
+    Benchmark("7d2d.telnet_parsers", telnet_parsers),
+    Benchmark("enshrouded.read_new_lines", enshrouded_read_new_lines),
+    Benchmark("enshrouded.tail_journalctl", enshrouded_tail_journalctl),
+    Benchmark("valheim.player_stats", valheim_player_stats),
+]
+
+REFERENCES = [
+    Reference("7d2d.parse_line", seven_days_parse_line_legacy),
+    Reference("valheim.player_stats", valheim_player_stats_legacy),
+]
+# lines/s of the benchmark over lines/s of its reference, the low end of what was measured
+# on a 1 core VM at the default --lines and --repeat (parse_line 0.9-1.4x, player_stats 16.6-22x).
+# The rule table is about as fast as the if-chain, its entry only catches it getting much slower.
+# Used when the baseline has no speedups of its own
+SPEEDUPS = {
+    "7d2d.parse_line": 0.9,
+    "valheim.player_stats": 16,
+}
+# Below these, speedups are shown but not checked
+SPEEDUP_MIN_LINES = 200_000
+SPEEDUP_MIN_REPEAT = 3
+
+STARTUPS = [
+    Startup("startup.7d2d.timereset", "7d2d/7d2dTimeReset", "main"),
+    Startup("startup.7d2d.watch", "7d2d/log_watcher", "watch"),
+    Startup("startup.enshrouded.captainhook", "enshrouded", "captainhook"),
+]
+
+def parse_importtime(output, module):
+    """(cumulative ms of module, [(ms, name)] of its direct imports) from -X importtime output."""
+    children = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            # Header line
+            continue
+        # "| name" at the top, two more spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative) / 1000, name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                return int(cumulative) / 1000, sorted(children, reverse=True)
+            children = []
+    raise ValueError(f"{module} not in the importtime output")
+
+def measure_startup(startup, repeat):
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {startup.module}"],
+                                cwd=os.path.join(ROOT, startup.directory), capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"import {startup.module} failed: {result.stderr.strip().splitlines()[-1]}")
+        total, children = parse_importtime(result.stderr, startup.module)
+        if best is None or total < best[0]:
+            best = (total, children)
+    return {"import_ms": best[0], "heaviest": [f"{name} {ms:.0f}ms" for ms, name in best[1][:3]]}
+
+def measure(benchmark, count, repeat):
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        os.environ["CHECKPOINT_FILE"] = os.path.join(tmp, "checkpoint_{run}.json")
+        case = benchmark.setup(count, tmp)
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            case.run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        tracemalloc.start()
+        case.run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        latencies = []
+        for line in case.event_lines:
+            start = time.perf_counter_ns()
+            case.single(line)
+            latencies.append((time.perf_counter_ns() - start) / 1000)
+    result = {"lines_per_sec": case.lines / best, "mb_per_sec": case.size / best / 1e6, "peak_mb": peak / 1e6}
+    if len(latencies) > 1:
+        quantiles = statistics.quantiles(latencies, n=100)
+        result["p50_us"] = quantiles[49]
+        result["p99_us"] = quantiles[98]
+    return result
+
+def measure_speedup(benchmark, reference, count, repeat):
+    """lines/s of benchmark over lines/s of its reference, runs alternated so both see the same machine load."""
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        os.environ["CHECKPOINT_FILE"] = os.path.join(tmp, "checkpoint_{run}.json")
+        # Both write their input to tmp, under the same name
+        os.mkdir(os.path.join(tmp, "new"))
+        os.mkdir(os.path.join(tmp, "old"))
+        new = benchmark.setup(count, os.path.join(tmp, "new"))
+        old = reference.setup(count, os.path.join(tmp, "old"))
+        best = {}
+        for _ in range(repeat):
+            for name, case in (("new", new), ("old", old)):
+                start = time.perf_counter()
+                case.run()
+                elapsed = time.perf_counter() - start
+                best[name] = min(best.get(name, elapsed), elapsed)
+    return (new.lines / best["new"]) / (old.lines / best["old"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks every log parser on synthetic logs.")
+    parser.add_argument("--lines", type=int, default=SPEEDUP_MIN_LINES)
+    parser.add_argument("--repeat", type=int, default=SPEEDUP_MIN_REPEAT)
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="Save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed loss of lines/s against the baseline (made with --save on this machine) "
+                             "and of speedup against the baseline's, or SPEEDUPS without one")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    if any(not args.only or args.only in benchmark.name for benchmark in BENCHMARKS):
+        print(f"{'benchmark':<28} {'lines/s':>12} {'MB/s':>8} {'peak MB':>8} {'p50 us':>8} {'p99 us':>8}  vs baseline")
+    for benchmark in BENCHMARKS:
+        if args.only and args.only not in benchmark.name:
+            continue
+        result = results[benchmark.name] = measure(benchmark, args.lines, args.repeat)
+        versus = ""
+        if benchmark.name in baseline:
+            ratio = result["lines_per_sec"] / baseline[benchmark.name]["lines_per_sec"]
+            versus = f"{ratio - 1:+.0%}"
+            if ratio < 1 - args.threshold:
+                versus += " REGRESSION"
+                regressions.append(benchmark.name)
+        print(f"{benchmark.name:<28} {result['lines_per_sec']:>12,.0f} {result['mb_per_sec']:>8.1f} {result['peak_mb']:>8.1f} "
+              f"{result.get('p50_us', float('nan')):>8.1f} {result.get('p99_us', float('nan')):>8.1f}  {versus}")
+
+    references = [reference for reference in REFERENCES if reference.benchmark in results]
+    check_speedups = args.lines >= SPEEDUP_MIN_LINES and args.repeat >= SPEEDUP_MIN_REPEAT
+    if references:
+        print(f"\n{'vs old implementation':<28} {'speedup':>12} {'expected':>8}")
+        results["speedups"] = {}
+    for reference in references:
+        benchmark = next(benchmark for benchmark in BENCHMARKS if benchmark.name == reference.benchmark)
+        speedup = results["speedups"][reference.benchmark] = measure_speedup(benchmark, reference, args.lines, args.repeat)
+        expected = baseline.get("speedups", {}).get(reference.benchmark, SPEEDUPS[reference.benchmark])
+        versus = ""
+        if not check_speedups:
+            versus = " not checked"
+        elif speedup < expected * (1 - args.threshold):
+            versus = " REGRESSION"
+            regressions.append(f"{reference.benchmark} (vs old implementation)")
+        print(f"{reference.benchmark:<28} {speedup:>11.1f}x {expected:>7.1f}x{versus}")
+    if references and not check_speedups:
+        print(f"Speedups are only checked with --lines >= {SPEEDUP_MIN_LINES} and --repeat >= {SPEEDUP_MIN_REPEAT}")
+
+    startups = [startup for startup in STARTUPS if not args.only or args.only in startup.name]
+    if startups:
+        print(f"\n{'entry point':<32} {'import ms':>10}  {'vs baseline':<12} heaviest imports")
+    for startup in startups:
+        result = results[startup.name] = measure_startup(startup, args.repeat)
+        versus = ""
+        if startup.name in baseline:
+            ratio = result["import_ms"] / baseline[startup.name]["import_ms"]
+            versus = f"{ratio - 1:+.0%}"
+            if ratio > 1 + args.threshold:
+                versus += " REGRESSION"
+                regressions.append(startup.name)
+        print(f"{startup.name:<32} {result['import_ms']:>10.1f}  {versus:<12} {', '.join(result['heaviest'])}")
+
+    if args.save:
+        if not check_speedups:
+            # Too noisy to compare later runs against
+            results.pop("speedups", None)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if not baseline and not args.save:
+        checked = "only the speedups were checked" if check_speedups else "nothing was checked"
+        print(f"No baseline in {args.baseline}, {checked}: run with --save to make one")
+    if regressions:
+        print(f"Slower than {1 - args.threshold:.0%} of the baseline or expected speedup: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
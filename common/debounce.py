@@ -0,0 +1,70 @@
+import threading
+import time
+
+class Debouncer:
+    """
+    Merges bursts of events for the same key into one callback(key) call.
+
+    The call happens once no new event came in for `window` seconds, but never later
+    than `max_latency` seconds after the first event of the burst. Callbacks run on
+    the debouncer's own thread, one at a time.
+
+    events counts trigger() calls, runs counts callbacks, the difference is what was saved.
+    """
+    def __init__(self, callback, window=0.1, max_latency=0.5):
+        self.callback = callback
+        self.window = window
+        self.max_latency = max_latency
+        self.events = 0
+        self.runs = 0
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="debounce", daemon=True)
+        self._worker.start()
+
+    def trigger(self, key):
+        now = time.monotonic()
+        with self._cond:
+            self.events += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = [now + self.max_latency, now + self.window]
+                self._cond.notify()
+            else:
+                pending[1] = min(now + self.window, pending[0])
+
+    def stop(self, timeout=5):
+        """Runs what is still pending and stops the worker."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._worker.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        due = list(self._pending)
+                        self._pending.clear()
+                        break
+                    if not self._pending:
+                        self._cond.wait()
+                        continue
+                    now = time.monotonic()
+                    due = [key for key, (_, deadline) in self._pending.items() if deadline <= now]
+                    if due:
+                        for key in due:
+                            del self._pending[key]
+                        break
+                    self._cond.wait(min(deadline for _, deadline in self._pending.values()) - now)
+                stopped = self._stopped
+            for key in due:
+                self.runs += 1
+                try:
+                    self.callback(key)
+                except Exception as e:
+                    print(f"Debounced callback for {key} failed: {e}")
+            if stopped:
+                return
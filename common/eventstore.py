@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+SQLite (WAL) store of the events the watchers detect, for questions like "who died most this run".
+
+Writers never wait on the disk: EventStore.add puts the event on a bounded queue,
+a background thread inserts them in batches with executemany, one transaction
+per batch. When the queue is full events are dropped and counted.
+
+Usage:
+    python eventstore.py <db> deaths|logins|playtime [--server run3] [--since 2026-03-01] [--until 2026-04-01]
+    python eventstore.py <db> recent [--server run3] [-n 20]
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from sessions import JOIN, LEAVE, RESTART, pair_sessions
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    server TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    player TEXT
+);
+CREATE INDEX IF NOT EXISTS events_server_player_ts ON events (server, player, ts);
+CREATE INDEX IF NOT EXISTS events_type_ts ON events (event_type, ts);
+"""
+# Event types the watchers write, and what they mean for sessions
+LOGIN = "login"
+LOGOUT = "logout"
+DEATH = "death"
+RESTART_EVENT = "restart"
+SESSION_KINDS = {LOGIN: JOIN, LOGOUT: LEAVE, RESTART_EVENT: RESTART}
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL only syncs at checkpoints, a power cut can lose the last batches but not corrupt anything
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+class EventStore:
+    """
+    Batched background writer, add() never blocks unless asked to.
+
+    A batch is written when batch_size events are waiting or flush_interval
+    seconds after its first event, whichever comes first. With block=True
+    add() waits for room instead of dropping, for backfills.
+    """
+    def __init__(self, path, maxsize=10000, batch_size=500, flush_interval=1.0, block=False):
+        self.path = path
+        self.block = block
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        # Created here so a bad path fails at startup, not in the thread
+        connect(path).close()
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._worker = threading.Thread(target=self._run, name="eventstore", daemon=True)
+        self._worker.start()
+
+    def add(self, server, event_type, player=None, ts=None):
+        try:
+            self._queue.put((time.time() if ts is None else ts, server, event_type, player), self.block)
+        except queue.Full:
+            self.dropped += 1
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stop(self, timeout=10):
+        """Write what is queued and stop the worker."""
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    def _run(self):
+        conn = connect(self.path)
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            try:
+                with conn:
+                    conn.executemany("INSERT INTO events (ts, server, event_type, player) VALUES (?, ?, ?, ?)", batch)
+                self.written += len(batch)
+                self.batches += 1
+            except sqlite3.Error as e:
+                self.dropped += len(batch)
+                print(f"Failed to store {len(batch)} events: {e}")
+        conn.close()
+
+def _where(server=None, since=None, until=None, event_types=()):
+    clauses = []
+    params = []
+    if event_types:
+        clauses.append(f"event_type IN ({', '.join('?' * len(event_types))})")
+        params += event_types
+    if server:
+        clauses.append("server = ?")
+        params.append(server)
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def count_by_player(conn, event_type, server=None, since=None, until=None):
+    """[(player, count)], most first."""
+    where, params = _where(server, since, until, [event_type])
+    return conn.execute(f"SELECT player, COUNT(*) FROM events{where} GROUP BY player ORDER BY 2 DESC, 1",
+                        params).fetchall()
+
+def playtime(conn, server=None, since=None, until=None):
+    """
+    {player: seconds} from login/logout pairs, a restart ends every open session of its server.
+    Sessions still open are counted up to until, or the server's last event. Only the
+    time within [since, until) counts, a session that began before since too.
+    """
+    totals = {}
+    cutoff = min(until, time.time()) if until else None
+    servers = [server] if server else [row[0] for row in conn.execute("SELECT DISTINCT server FROM events")]
+    for name in servers:
+        # Sessions open at since started after the last restart before it, pairing starts there
+        start_at = since
+        if since is not None:
+            start_at = conn.execute("SELECT MAX(ts) FROM events WHERE server = ? AND event_type = ? AND ts <= ?",
+                                    (name, RESTART_EVENT, since)).fetchone()[0]
+        where, params = _where(name, start_at, until, list(SESSION_KINDS))
+        rows = conn.execute(f"SELECT ts, player, event_type FROM events{where} ORDER BY ts, id", params)
+        events = ((ts, player, SESSION_KINDS[event_type]) for ts, player, event_type in rows)
+        for player, start, end in pair_sessions(events, until=cutoff):
+            if since is not None:
+                if end <= since:
+                    continue
+                start = max(start, since)
+            totals[player] = totals.get(player, 0.0) + end - start
+    return totals
+
+def recent(conn, server=None, limit=20):
+    where, params = _where(server)
+    return conn.execute(f"SELECT ts, server, event_type, player FROM events{where} ORDER BY ts DESC LIMIT ?",
+                        params + [limit]).fetchall()
+
+def _epoch(day):
+    return datetime.fromisoformat(day).timestamp() if day else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Queries the watchers' event store.")
+    parser.add_argument("db")
+    parser.add_argument("query", choices=["deaths", "logins", "playtime", "recent"])
+    parser.add_argument("--server", help="Server label, e.g. run3 or enshrouded")
+    parser.add_argument("--since", help="YYYY-MM-DD[THH:MM], local time")
+    parser.add_argument("--until", help="YYYY-MM-DD[THH:MM], local time, exclusive")
+    parser.add_argument("-n", type=int, default=20, help="Events shown by recent")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"No event store at {args.db}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.db)
+    since, until = _epoch(args.since), _epoch(args.until)
+    if args.query in ("deaths", "logins"):
+        for player, count in count_by_player(conn, DEATH if args.query == "deaths" else LOGIN, args.server, since, until):
+            print(f"{player}: {count}")
+    elif args.query == "playtime":
+        for player, seconds in sorted(playtime(conn, args.server, since, until).items(), key=lambda item: item[1], reverse=True):
+            print(f"{player}: {seconds / 3600:.1f}h")
+    else:
+        for ts, server, event_type, player in recent(conn, args.server, args.n):
+            print(f"{datetime.fromtimestamp(ts):%Y-%m-%dT%H:%M:%S} {server} {event_type} {player or ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Seedable synthetic logs for every parser in this repo, for benchmarks and trying things out.
+
+The same seed always gives the same lines. `mix` weighs the kinds of events,
+`event_ratio` is the share of lines that are events at all, the rest is the
+kind of noise the real server writes. Players log in before they log out or
+die, so the streams also make sense to session tracking.
+"""
+import random
+import struct
+from datetime import datetime, timedelta
+
+PLAYERS = ["Lost", "Bob", "Alice", "Ragnar", "Freya", "Sven", "Ingrid", "Bjorn", "Astrid", "Kim Jong Kill"]
+
+SEVEN_DAYS_MIX = {"login": 4, "logout": 4, "death": 3, "registered": 0.1}
+SEVEN_DAYS_NOISE = [
+    "INF Spawned zombie '{zombie}' at ({x:.1f}, {y:.1f}, {z:.1f}) gamestage {n}",
+    "INF [Rebirth] Horde spawner tick, {n} entities alive",
+    "WRN Entity {zombie} (id {id}) stuck, teleporting",
+    "INF Executing command 'lp' by Telnet from 127.0.0.1:46610",
+    "INF Time: {t:.2f}m FPS: {fps:.2f} Heap: 2071.2MB Max: 2332.0MB Chunks: 530 CGO: 84 Ply: 3 Zom: {n}",
+    "INF Chunk {x:.0f}, {z:.0f} unloaded, {n} entities saved",
+]
+ZOMBIES = ["zombieArlene", "zombieBoe", "zombieJoe", "zombieMoe", "zombieSteve", "zombieDog"]
+
+ENSHROUDED_MIX = {"join": 1, "leave": 1}
+ENSHROUDED_NOISE = [
+    "[server] Saved 'savegame_{id}' ({n} bytes)",
+    "[Session] 'HostOnline' (up)!",
+    "[online] Server connected to Steam successfully",
+    "[server] Tick {n}: {fps:.1f} ms",
+    "[Session] Entity {id} moved to chunk {x:.0f},{z:.0f}",
+]
+
+def _pick(rnd, mix):
+    kinds = list(mix)
+    return rnd.choices(kinds, weights=[mix[kind] for kind in kinds])[0]
+
+def _noise(rnd, templates):
+    return rnd.choice(templates).format(
+        zombie=rnd.choice(ZOMBIES), x=rnd.uniform(-3000, 3000), y=rnd.uniform(30, 90), z=rnd.uniform(-3000, 3000),
+        n=rnd.randrange(1, 5000), id=rnd.randrange(1000, 99999), t=rnd.uniform(0, 600), fps=rnd.uniform(15, 60))
+
+class _Players:
+    """Who is online, so logouts and deaths only happen to players that logged in."""
+    def __init__(self, rnd, players):
+        self.rnd = rnd
+        self.offline = list(players)
+        self.online = []
+
+    def join(self):
+        if not self.offline:
+            return None
+        name = self.offline.pop(self.rnd.randrange(len(self.offline)))
+        self.online.append(name)
+        return name
+
+    def leave(self):
+        if not self.online:
+            return None
+        name = self.online.pop(self.rnd.randrange(len(self.online)))
+        self.offline.append(name)
+        return name
+
+    def any_online(self):
+        return self.rnd.choice(self.online) if self.online else None
+
+def seven_days_lines(count, event_ratio=0.01, mix=SEVEN_DAYS_MIX, seed=7, players=PLAYERS,
+                     start=datetime(2026, 3, 14, 19, 0), step=0.05):
+    """7d2d output_log lines ("2026-03-14T19:43:16 394.479 INF ..."), step seconds apart."""
+    rnd = random.Random(seed)
+    online = _Players(rnd, players)
+    for i in range(count):
+        uptime = i * step
+        prefix = f"{start + timedelta(seconds=uptime):%Y-%m-%dT%H:%M:%S} {uptime:.3f} "
+        line = None
+        if rnd.random() < event_ratio:
+            kind = _pick(rnd, mix)
+            if kind == "login" and (name := online.join()):
+                line = (f"INF PlayerSpawnedInWorld (reason: JoinMultiplayer, position: 342, 49, -541): EntityID={171 + i % 1000}, "
+                        f"PltfmId='Steam_7656119802549{i % 10000:04}', CrossId='EOS_000200a5', OwnerID='Steam_7656119802549', "
+                        f"PlayerName='{name}', ClientNumber='1'")
+            elif kind == "logout" and (name := online.leave()):
+                line = f"INF Player {name} disconnected after {rnd.uniform(1, 300):.1f} minutes"
+            elif kind == "death" and (name := online.any_online()):
+                line = f"INF GMSG: Player '{name}' died"
+            elif kind == "registered":
+                line = f"INF [EOS] Server registered, session: {rnd.getrandbits(64):016x}"
+        yield prefix + (line or _noise(rnd, SEVEN_DAYS_NOISE))
+
+def enshrouded_lines(count, event_ratio=0.01, mix=ENSHROUDED_MIX, seed=7, players=PLAYERS):
+    """Enshrouded server log lines, the events match the patterns of config.yaml.example."""
+    rnd = random.Random(seed)
+    online = _Players(rnd, players)
+    for i in range(count):
+        line = None
+        if rnd.random() < event_ratio:
+            kind = _pick(rnd, mix)
+            if kind == "join" and (name := online.join()):
+                line = f"[Session] Player '{name}' joined"
+            elif kind == "leave" and (name := online.leave()):
+                line = f"[Session] Player '{name}' left"
+        ms = i * 50
+        yield f"[I {ms // 3600000 % 24:02}:{ms // 60000 % 60:02}:{ms // 1000 % 60:02},{ms % 1000:03}] " + (line or _noise(rnd, ENSHROUDED_NOISE))
+
+def journal_export(messages, unit="enshrouded.service", start_usec=1773515000000000, binary_every=50):
+    """
+    `journalctl -o export` bytes for the messages, with the usual fields around MESSAGE.
+    Every binary_every-th MESSAGE is written in the binary (length prefixed) form.
+    """
+    out = bytearray()
+    for i, message in enumerate(messages):
+        usec = start_usec + i * 50000
+        out += (f"__CURSOR=s=4c1f3b6e;i={i + 1:x};b=9a0e;m={usec:x};t={usec:x};x={i:x}\n"
+                f"__REALTIME_TIMESTAMP={usec}\n__MONOTONIC_TIMESTAMP={i * 50000}\n"
+                f"_BOOT_ID=9a0e1c7d\nPRIORITY=6\n_SYSTEMD_UNIT={unit}\nSYSLOG_IDENTIFIER=enshrouded\n").encode()
+        data = message.encode()
+        if binary_every and i % binary_every == binary_every - 1:
+            out += b"MESSAGE\n" + struct.pack("<Q", len(data)) + data + b"\n\n"
+        else:
+            out += b"MESSAGE=" + data + b"\n\n"
+    return bytes(out)
+
+def valheim_lines(count, noise_ratio=0.0, seed=7, players=PLAYERS, start=datetime(2022, 1, 1), days=3 * 365):
+    """Valheim character_logins.txt lines ("12/05/2024 20:30:09: Got character ZDOID from Bob : 0:0") over `days` days."""
+    rnd = random.Random(seed)
+    step = timedelta(days=days) / max(count, 1)
+    for i in range(count):
+        ts = f"{start + step * i:%m/%d/%Y %H:%M:%S}"
+        if rnd.random() < noise_ratio:
+            yield f"{ts}: Connections {rnd.randrange(0, 10)} ZDOS:{rnd.randrange(10000, 99999)}  sent:0 recv:{rnd.randrange(0, 999)}"
+        else:
+            yield f"{ts}: Got character ZDOID from {rnd.choice(players)} : 0:0"
+
+def listplayers_output(online, seed=7):
+    """Telnet answer to `lp` with `online` players, same layout as telnet_outputs.txt."""
+    rnd = random.Random(seed)
+    lines = ["2026-03-14T19:43:54 432.501 INF Executing command 'lp' by Telnet from 127.0.0.1:46610"]
+    for i in range(online):
+        lines.append(f"{i}. id={171 + i}, {PLAYERS[i % len(PLAYERS)]}, pos=({rnd.uniform(-3000, 3000):.1f}, "
+                     f"{rnd.uniform(30, 90):.1f}, {rnd.uniform(-3000, 3000):.1f}), rot=(0.0, {rnd.uniform(0, 360):.1f}, 0.0), "
+                     f"remote=True, health={rnd.randrange(1, 200)}, deaths={rnd.randrange(0, 50)}, zombies={rnd.randrange(0, 2000)}, "
+                     f"players=0, score={rnd.randrange(0, 5000)}, level={rnd.randrange(1, 200)}, "
+                     f"pltfmid=Steam_7656119802549{i:04}, crossid=EOS_000200a5aac44b81aa8521f6cf48{i:04}, "
+                     f"ip=10.0.0.{i % 250}, ping={rnd.randrange(5, 300)}")
+    lines.append(f"Total of {online} in the game")
+    return "\r\n".join(lines) + "\r\n"
+
+def gettime_output(day=13, hour=6, minute=18):
+    return f"2026-03-14T19:44:36 474.341 INF Executing command 'gettime' by Telnet from 127.0.0.1:46610\r\nDay {day}, {hour:02}:{minute:02}\r\n"
+
+def write_log(path, lines):
+    """Writes generated lines to path, returns the number of bytes."""
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+        return f.tell()
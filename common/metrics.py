@@ -0,0 +1,186 @@
+"""
+Prometheus text-format metrics without the prometheus_client dependency.
+
+Counters and gauges are either updated in place (inc/set) or read from a
+function at scrape time (track), so counters the code already keeps (sent,
+dropped, queue depth, ...) cost nothing until someone scrapes /metrics.
+Labels are keyword arguments: LINES.inc(120, run="run3").
+"""
+import threading
+
+# Seconds, for webhook round trips
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_value(value):
+    # :g would turn big counters into 1.23457e+06
+    return str(int(value)) if isinstance(value, int) else repr(float(value))
+
+def _format_labels(key):
+    if not key:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in key)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + "}"
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._functions = {}
+        # Keys whose function raised at the last scrape, said once until it works again
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def track(self, func, **labels):
+        """Reads the value from func() at every scrape, func returning None leaves the sample out."""
+        self._functions[_key(labels)] = func
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, func in list(self._functions.items()):
+            try:
+                value = func()
+            except Exception as e:
+                if key not in self._failed:
+                    self._failed.add(key)
+                    print(f"Metric {self.name}{_format_labels(key)} left out, reading it failed: {e!r}")
+                continue
+            self._failed.discard(key)
+            if value is not None:
+                values[key] = value
+        return [(self.name, key, value) for key, value in values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_key(labels)] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket, then +Inf, then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+        samples = []
+        for key, counts in values.items():
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                samples.append((f"{self.name}_bucket", key + (("le", le),), count))
+            samples.append((f"{self.name}_sum", key, counts[-1]))
+            samples.append((f"{self.name}_count", key, counts[-2]))
+        return samples
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        """Adds a metric, or returns the one already registered under that name."""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help):
+        return self.register(Counter(name, help))
+
+    def gauge(self, name, help):
+        return self.register(Gauge(name, help))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, buckets))
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+REGISTRY = Registry()
+
+def serve(port, host="127.0.0.1", registry=REGISTRY):
+    """Serves GET /metrics from a daemon thread, returns the server (shutdown() stops it)."""
+    # Only imported when metrics are on, http.server is most of this module's import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+async def serve_async(port, host="127.0.0.1", registry=REGISTRY):
+    """Serves GET /metrics from the running event loop, no thread. Returns the asyncio server (close() stops it)."""
+    import asyncio
+
+    async def handle(reader, writer):
+        try:
+            async with asyncio.timeout(10):
+                request = await reader.readline()
+                # Headers are not needed, read up to the blank line that ends them
+                while (await reader.readline()).strip():
+                    pass
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+                status, body = b"200 OK", registry.render().encode()
+            else:
+                status, body = b"404 Not Found", b"Not found\n"
+            writer.write(b"HTTP/1.1 %s\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         b"Content-Length: %d\r\nConnection: close\r\n\r\n%s" % (status, len(body), body))
+            await writer.drain()
+        except (OSError, TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Serving metrics on http://{host}:{server.sockets[0].getsockname()[1]}/metrics")
+    return server
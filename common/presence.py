@@ -0,0 +1,83 @@
+"""
+Who is online, so a player on a flapping connection isn't announced on every reconnect.
+"""
+from collections import OrderedDict
+
+class PlayerTracker:
+    """
+    login() says whether a login is worth announcing: not while the player is still
+    online (duplicate spawn) or less than grace seconds after their logout (reconnect,
+    that logout is then never announced either). logout() only starts the grace period,
+    due() hands out the logouts to announce. Timestamps are epoch seconds, the log's
+    or the journal's when known, so catching up on old lines gives the same result.
+
+    Memory is bounded: at most max_players online and max_players waiting out their
+    grace period, the least recently seen are forgotten first. An online player not
+    seen for max_session seconds counts as gone, for logout lines that never came
+    (crash, watcher down).
+    """
+    def __init__(self, grace=60, max_players=1000, max_session=12 * 3600):
+        self.grace = grace
+        self.max_players = max_players
+        self.max_session = max_session
+        # name -> timestamp of the last login, least recent first
+        self._online = OrderedDict()
+        # name -> timestamp of the logout, oldest first
+        self._leaving = OrderedDict()
+        # Logouts that can't wait for due() to find them
+        self._ready = []
+        self.suppressed = {"duplicate_login": 0, "reconnect": 0, "duplicate_logout": 0}
+        self.forgotten = 0
+
+    def login(self, player, ts):
+        left = self._leaving.pop(player, None)
+        if left is not None:
+            if ts - left < self.grace:
+                self.suppressed["reconnect"] += 1
+                self._set_online(player, ts)
+                return False
+            # Came back after the grace period, that logout still gets announced
+            self._ready.append(player)
+        else:
+            last = self._online.get(player)
+            if last is not None and ts - last < self.max_session:
+                self.suppressed["duplicate_login"] += 1
+                self._set_online(player, ts)
+                return False
+        self._set_online(player, ts)
+        return True
+
+    def logout(self, player, ts):
+        if player in self._leaving:
+            self.suppressed["duplicate_logout"] += 1
+            return
+        self._online.pop(player, None)
+        self._leaving[player] = ts
+        if len(self._leaving) > self.max_players:
+            self._ready.append(self._leaving.popitem(last=False)[0])
+
+    def due(self, now):
+        """Players whose logout is to be announced by now, oldest first."""
+        ready, self._ready = self._ready, []
+        deadline = now - self.grace
+        while self._leaving:
+            player, ts = next(iter(self._leaving.items()))
+            if ts > deadline:
+                break
+            del self._leaving[player]
+            ready.append(player)
+        return ready
+
+    def reset(self):
+        """Server restarted: nobody is online anymore, logouts already waiting stay."""
+        self._online.clear()
+
+    def online(self):
+        return len(self._online)
+
+    def _set_online(self, player, ts):
+        self._online[player] = ts
+        self._online.move_to_end(player)
+        if len(self._online) > self.max_players:
+            self._online.popitem(last=False)
+            self.forgotten += 1
@@ -0,0 +1,113 @@
+import pickle
+from array import array
+from bisect import bisect_right
+from datetime import date
+
+JOIN = "join"
+LEAVE = "leave"
+# Server went down (new log file, service restart): everyone still online is gone
+RESTART = "restart"
+
+def pair_sessions(events, until=None):
+    """
+    Turns (timestamp, player, kind) events, oldest first, into (player, start, end) sessions.
+
+    A second join while a session is open is ignored, a leave without a join too.
+    RESTART closes every open session at its timestamp (player is ignored).
+    Sessions still open at the end are closed at `until`, or the last event's timestamp.
+    """
+    online = {}
+    ts = None
+    for ts, player, kind in events:
+        if kind == JOIN:
+            online.setdefault(player, ts)
+        elif kind == LEAVE:
+            start = online.pop(player, None)
+            if start is not None:
+                yield player, start, ts
+        elif kind == RESTART:
+            for name, start in online.items():
+                yield name, start, ts
+            online.clear()
+    end = until if until is not None else ts
+    for name, start in online.items():
+        yield name, start, end
+
+class SessionIndex:
+    """
+    Sessions as sorted interval arrays, built once so questions don't need a log rescan.
+
+    concurrency_at is two binary searches, peak_per_day one sweep that is cached,
+    total_playtime a dict lookup. Timestamps are epoch seconds.
+    """
+    def __init__(self, sessions=()):
+        sessions = sorted(sessions, key=lambda session: session[1])
+        self.names = []
+        ids = {}
+        self.players = array("I")
+        self.starts = array("d")
+        self.ends = array("d")
+        self.playtime = {}
+        for player, start, end in sessions:
+            if player not in ids:
+                ids[player] = len(self.names)
+                self.names.append(player)
+                self.playtime[player] = 0.0
+            self.players.append(ids[player])
+            self.starts.append(start)
+            self.ends.append(end)
+            self.playtime[player] += end - start
+        self._sorted_ends = array("d", sorted(self.ends))
+        self._peaks = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def concurrency_at(self, ts):
+        """Players online at ts (a session covers start <= ts < end)."""
+        return bisect_right(self.starts, ts) - bisect_right(self._sorted_ends, ts)
+
+    def total_playtime(self, player):
+        """Seconds played."""
+        return self.playtime.get(player, 0.0)
+
+    def peak_per_day(self):
+        """{date: most players online at the same time that day}, local time."""
+        if self._peaks is None:
+            # Leaves sort before joins at the same second, a quick rejoin is not a +1
+            changes = sorted([(end, -1) for end in self.ends] + [(start, 1) for start in self.starts])
+            peaks = {}
+            current = 0
+            day = None
+            for ts, delta in changes:
+                ts_day = date.fromtimestamp(ts)
+                if ts_day != day:
+                    # Sessions running past midnight count for the days they span
+                    if day is not None:
+                        for ordinal in range(day.toordinal() + 1, ts_day.toordinal()):
+                            peaks[date.fromordinal(ordinal)] = current
+                    day = ts_day
+                    peaks[day] = max(peaks.get(day, 0), current)
+                current += delta
+                peaks[day] = max(peaks[day], current)
+            self._peaks = peaks
+        return self._peaks
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump({"names": self.names, "players": self.players, "starts": self.starts,
+                         "ends": self.ends, "sorted_ends": self._sorted_ends, "playtime": self.playtime}, f)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a saved index back as is, nothing gets sorted again."""
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        index = cls()
+        index.names = data["names"]
+        index.players = data["players"]
+        index.starts = data["starts"]
+        index.ends = data["ends"]
+        index._sorted_ends = data["sorted_ends"]
+        index.playtime = data["playtime"]
+        return index
@@ -0,0 +1,108 @@
+import os
+
+class LogTailer:
+    """
+    Follows a growing log file in fixed-size byte chunks.
+
+    A partial last line stays in a carry-over buffer until its newline shows up,
+    so nothing is ever re-read. Only complete lines get decoded. Memory is bounded
+    by chunk_size + max_line, a line longer than max_line is dropped.
+
+    offset=None starts at the end of the file, like `tail -f -n 0`, or at 0 when
+    the file does not exist yet.
+    """
+    def __init__(self, path, offset=None, chunk_size=64 * 1024, max_line=64 * 1024,
+                 encoding="utf-8", errors="ignore"):
+        self.path = path
+        self.offset = offset
+        self.chunk_size = chunk_size
+        self.max_line = max_line
+        self.encoding = encoding
+        self.errors = errors
+        self.inode = None
+        self._fh = None
+        self._carry = b""
+        self._discarding = False
+        if not self._open() and self.offset is None:
+            # File shows up later, then everything in it is new
+            self.offset = 0
+
+    @property
+    def position(self):
+        """Byte offset of the first line not yielded yet."""
+        return self.offset - len(self._carry)
+
+    def _open(self):
+        try:
+            self._fh = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"Failed to open file {self.path}: {e}")
+            return False
+        st = os.fstat(self._fh.fileno())
+        self.inode = st.st_ino
+        if self.offset is None:
+            self.offset = st.st_size
+        self._fh.seek(self.offset)
+        return True
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+    def reopen(self, offset=0):
+        """Start over on a (new) file at offset, the file is opened on the next read."""
+        self.close()
+        self.offset = offset
+        self._carry = b""
+        self._discarding = False
+
+    def check_rotation(self):
+        """Starts over at 0 when the path now is another file or got truncated, returns True if so."""
+        if self._fh is None:
+            return False
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if st.st_ino != self.inode:
+            print(f"{self.path} was replaced by a new file, reading it from the start")
+        elif st.st_size < self.position:
+            print(f"{self.path} was truncated, reading it from the start")
+        else:
+            return False
+        self.reopen(0)
+        return True
+
+    def lines(self):
+        """Yields every complete line appended since the last call, without line ending."""
+        if self._fh is None and not self._open():
+            return
+        while True:
+            chunk = self._fh.read(self.chunk_size)
+            if not chunk:
+                return
+            self.offset += len(chunk)
+            if self._carry:
+                chunk = self._carry + chunk
+                self._carry = b""
+            parts = chunk.split(b"\n")
+            tail = parts.pop()
+            for raw in parts:
+                if self._discarding:
+                    self._discarding = False
+                    continue
+                if len(raw) > self.max_line:
+                    # Same as when it doesn't fit in one chunk, wherever the chunk boundaries fall
+                    print(f"Dropping line longer than {self.max_line} bytes in {self.path}")
+                    continue
+                yield raw.rstrip(b"\r").decode(self.encoding, self.errors)
+            if len(tail) > self.max_line:
+                print(f"Dropping line longer than {self.max_line} bytes in {self.path}")
+                tail = b""
+                self._discarding = True
+            elif self._discarding:
+                tail = b""
+            self._carry = tail
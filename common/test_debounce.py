@@ -0,0 +1,73 @@
+import threading
+import time
+from debounce import Debouncer
+
+class Calls:
+    """Callback recording (key, monotonic time) of every run."""
+    def __init__(self):
+        self.runs = []
+        self.ran = threading.Event()
+
+    def __call__(self, key):
+        self.runs.append((key, time.monotonic()))
+        self.ran.set()
+
+def test_burst_runs_once_after_the_window():
+    calls = Calls()
+    debouncer = Debouncer(calls, window=0.1, max_latency=5)
+    start = time.monotonic()
+    for _ in range(20):
+        debouncer.trigger("run3")
+        time.sleep(0.005)
+    last = time.monotonic()
+    assert calls.ran.wait(5)
+    time.sleep(0.3)
+    debouncer.stop()
+    assert [key for key, _ in calls.runs] == ["run3"]
+    # Not before the window after the last event, long before max_latency
+    assert calls.runs[0][1] - last >= 0.1 - 0.01
+    assert calls.runs[0][1] - start < 2
+    assert (debouncer.events, debouncer.runs) == (20, 1)
+
+def test_max_latency_under_a_continuous_stream():
+    calls = Calls()
+    debouncer = Debouncer(calls, window=0.2, max_latency=0.3)
+    start = time.monotonic()
+    # An event every 20ms never leaves the window quiet
+    while time.monotonic() - start < 1.2:
+        debouncer.trigger("run3")
+        time.sleep(0.02)
+    debouncer.stop()
+    assert calls.runs
+    # The first run waited for max_latency, not for the stream to end
+    assert calls.runs[0][1] - start < 0.8
+    assert len(calls.runs) >= 2
+    assert debouncer.runs == len(calls.runs) < debouncer.events
+
+def test_keys_run_separately_and_stop_runs_what_is_pending():
+    calls = Calls()
+    debouncer = Debouncer(calls, window=10, max_latency=30)
+    debouncer.trigger("run1")
+    debouncer.trigger("run3")
+    debouncer.trigger("run1")
+    start = time.monotonic()
+    debouncer.stop()
+    assert time.monotonic() - start < 5
+    assert sorted(key for key, _ in calls.runs) == ["run1", "run3"]
+    assert (debouncer.events, debouncer.runs) == (3, 2)
+
+def test_failing_callback_does_not_stop_the_worker(capsys):
+    runs = []
+
+    def callback(key):
+        runs.append(key)
+        if key == "bad":
+            raise ValueError("boom")
+
+    debouncer = Debouncer(callback, window=0.01, max_latency=0.05)
+    debouncer.trigger("bad")
+    time.sleep(0.2)
+    debouncer.trigger("good")
+    debouncer.stop()
+    assert runs == ["bad", "good"]
+    assert "Debounced callback for bad failed: boom" in capsys.readouterr().out
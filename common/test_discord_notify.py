@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from discord_notify import DiscordWebhook, client, webhook_url, USER_AGENT
+
+class StubDiscord:
+    """
+    A local webhook endpoint. Answers with the scripted (status, headers) responses in order,
+    then 204s, and records (monotonic time, user agent, JSON payload) of every POST.
+    """
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.requests.append((time.monotonic(), self.headers["User-Agent"], json.loads(body)))
+                status, headers = stub.responses.pop(0) if stub.responses else (204, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/webhooks/1/token"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+@pytest.fixture
+def stub():
+    stubs = []
+
+    def make(responses=()):
+        stubs.append(StubDiscord(responses))
+        return stubs[-1]
+
+    yield make
+    for s in stubs:
+        s.server.shutdown()
+        s.server.server_close()
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://discord.com/api/webhooks/123/abc", ("https://discord.com/api/webhooks/123/abc", None)),
+    ("https://discordapp.com/api/webhooks/123/abc", ("https://discordapp.com/api/webhooks/123/abc", None)),
+    ("discord://123/abc", ("https://discord.com/api/webhooks/123/abc", None)),
+    ("discord://123/abc/?avatar=no", ("https://discord.com/api/webhooks/123/abc", None)),
+    ("discords://Watcher@123/abc", ("https://discord.com/api/webhooks/123/abc", "Watcher")),
+    ("slack://T1/B1/C1", None),
+    ("https://example.com/api/webhooks/123/abc", None),
+])
+def test_webhook_url(url, expected):
+    assert webhook_url(url) == expected
+
+def test_client_for_discord_urls_skips_apprise():
+    notifier = client("discord://Watcher@123/abc")
+    assert isinstance(notifier, DiscordWebhook)
+    assert (notifier.url, notifier.username) == ("https://discord.com/api/webhooks/123/abc", "Watcher")
+
+def test_posts_content_and_username(stub):
+    discord = stub()
+    assert DiscordWebhook(discord.url, "Watcher").notify(body="Player Lost logged in")
+    assert DiscordWebhook(discord.url).notify(body="Server up", title="System")
+    assert [payload for _, _, payload in discord.requests] == [
+        {"content": "Player Lost logged in", "username": "Watcher"}, {"content": "**System**\nServer up"}]
+    # Discord's Cloudflare turns away the default urllib agent
+    assert {agent for _, agent, _ in discord.requests} == {USER_AGENT}
+
+def test_429_retried_after_retry_after(stub):
+    discord = stub([(429, {"Retry-After": "0.3"}), (429, {"Retry-After": "0.2"})])
+    webhook = DiscordWebhook(discord.url)
+    assert webhook.notify(body="Player Lost died")
+    assert webhook.rate_limited == 2
+    times = [ts for ts, _, _ in discord.requests]
+    assert len(times) == 3
+    assert times[1] - times[0] >= 0.3 - 0.01 and times[2] - times[1] >= 0.2 - 0.01
+
+def test_gives_up(stub):
+    discord = stub([(429, {"Retry-After": "0.05"})] * 3)
+    webhook = DiscordWebhook(discord.url)
+    assert not webhook.notify(body="lost")
+    assert (len(discord.requests), webhook.rate_limited) == (3, 3)
+    # Other errors are not retried
+    discord = stub([(400, {})])
+    webhook = DiscordWebhook(discord.url)
+    assert not webhook.notify(body="bad")
+    assert (len(discord.requests), webhook.rate_limited) == (1, 0)
+
+def test_unreachable():
+    # Nothing listens on port 9 of localhost
+    assert not DiscordWebhook("http://127.0.0.1:9/api/webhooks/1/token", timeout=1).notify(body="lost")
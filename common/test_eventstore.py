@@ -0,0 +1,127 @@
+import sqlite3
+import threading
+import time
+import pytest
+import eventstore
+from eventstore import EventStore, connect, count_by_player, playtime, recent, DEATH, LOGIN, LOGOUT, RESTART_EVENT
+
+def at(day):
+    """Epoch seconds of a local YYYY-MM-DDTHH:MM, like --since/--until take them."""
+    return eventstore._epoch(day)
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "events.db")
+    conn = connect(path)
+    with conn:
+        conn.executemany("INSERT INTO events (ts, server, event_type, player) VALUES (?, ?, ?, ?)", [
+            (at("2026-03-01T20:00"), "run3", LOGIN, "Lost"),
+            (at("2026-03-01T20:30"), "run3", LOGIN, "Ana"),
+            (at("2026-03-01T21:00"), "run3", DEATH, "Lost"),
+            (at("2026-03-01T21:10"), "run3", DEATH, "Lost"),
+            (at("2026-03-01T21:30"), "run3", LOGOUT, "Ana"),
+            # Lost's session crosses midnight and --since 2026-03-02
+            (at("2026-03-01T23:00"), "run3", LOGIN, "Bob"),
+            (at("2026-03-02T01:00"), "run3", LOGOUT, "Lost"),
+            (at("2026-03-02T02:00"), "run3", RESTART_EVENT, None),
+            (at("2026-03-02T10:00"), "run3", LOGIN, "Ana"),
+            (at("2026-03-02T11:00"), "run3", LOGOUT, "Ana"),
+            (at("2026-03-01T20:00"), "enshrouded", LOGIN, "Eve"),
+            (at("2026-03-01T22:00"), "enshrouded", LOGOUT, "Eve"),
+        ])
+    yield conn, path
+    conn.close()
+
+def hours(totals):
+    return {player: round(seconds / 3600, 2) for player, seconds in totals.items()}
+
+def test_playtime_whole_history(db):
+    conn, _ = db
+    assert hours(playtime(conn, "run3")) == {"Lost": 5, "Ana": 2, "Bob": 3}
+    assert hours(playtime(conn)) == {"Lost": 5, "Ana": 2, "Bob": 3, "Eve": 2}
+
+def test_playtime_counts_sessions_open_at_since(db):
+    conn, _ = db
+    # Lost and Bob logged in the day before, Lost left and the restart ended Bob's session inside the window
+    assert hours(playtime(conn, "run3", since=at("2026-03-02"))) == {"Lost": 1, "Bob": 2, "Ana": 1}
+    # Only the part within [since, until) counts
+    assert hours(playtime(conn, "run3", since=at("2026-03-01T21:00"), until=at("2026-03-02T00:00"))) == \
+        {"Lost": 3, "Ana": 0.5, "Bob": 1}
+    # Sessions over before since are left out, a restart before since starts the pairing
+    assert hours(playtime(conn, "run3", since=at("2026-03-02T05:00"))) == {"Ana": 1}
+
+def test_count_by_player_and_recent(db):
+    conn, _ = db
+    assert count_by_player(conn, DEATH) == [("Lost", 2)]
+    assert count_by_player(conn, LOGIN, "run3", since=at("2026-03-01T21:00")) == [("Ana", 1), ("Bob", 1)]
+    assert [row[2:] for row in recent(conn, "run3", 2)] == [(LOGOUT, "Ana"), (LOGIN, "Ana")]
+
+@pytest.mark.parametrize("argv, expected", [
+    (["deaths"], ["Lost: 2"]),
+    (["logins", "--server", "run3", "--since", "2026-03-02"], ["Ana: 1"]),
+    (["playtime", "--server", "run3", "--since", "2026-03-02"], ["Bob: 2.0h", "Lost: 1.0h", "Ana: 1.0h"]),
+    (["recent", "-n", "1"], ["2026-03-02T11:00:00 run3 logout Ana"]),
+])
+def test_query_cli(db, capsys, argv, expected):
+    _, path = db
+    eventstore.main([path] + argv)
+    assert capsys.readouterr().out.splitlines() == expected
+
+def test_query_cli_without_store(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        eventstore.main([str(tmp_path / "missing.db"), "deaths"])
+    assert "No event store" in capsys.readouterr().out
+
+def stored(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT ts, server, event_type, player FROM events ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+def test_batches_and_flush_on_stop(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path, batch_size=3, flush_interval=30)
+    for i in range(7):
+        store.add("run3", LOGIN, f"p{i}", ts=i)
+    start = time.monotonic()
+    store.stop()
+    # The last, short batch is written by stop() without waiting for flush_interval
+    assert time.monotonic() - start < 5
+    assert (store.written, store.batches, store.dropped) == (7, 3, 0)
+    assert stored(path) == [(i, "run3", LOGIN, f"p{i}") for i in range(7)]
+
+def test_flush_interval(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path, batch_size=100, flush_interval=0.1)
+    store.add("run3", DEATH, "Lost", ts=1.0)
+    deadline = time.monotonic() + 5
+    while not stored(path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert stored(path) == [(1.0, "run3", DEATH, "Lost")]
+    store.stop()
+
+def locked(path, seconds):
+    """Holds sqlite's write lock on path for seconds, the store's writer waits on it meanwhile."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("BEGIN IMMEDIATE")
+    timer = threading.Timer(seconds, conn.commit)
+    timer.start()
+    return timer
+
+@pytest.mark.parametrize("block", [False, True])
+def test_full_queue(tmp_path, block):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path, maxsize=2, batch_size=1, flush_interval=0, block=block)
+    timer = locked(path, 0.5)
+    for i in range(10):
+        store.add("run3", LOGIN, f"p{i}", ts=i)
+    timer.join()
+    store.stop()
+    assert store.written + store.dropped == 10
+    assert len(stored(path)) == store.written
+    if block:
+        # add() waited for room instead
+        assert store.dropped == 0
+    else:
+        # One in the writer, two queued, the rest had no room
+        assert store.dropped >= 6
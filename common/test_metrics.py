@@ -0,0 +1,62 @@
+from metrics import Registry
+
+def test_render():
+    registry = Registry()
+    lines = registry.counter("watcher_lines_total", "Log lines read")
+    lines.inc(1200000, run="run3")
+    lines.inc(5, run='C:\\7d2d "main"\nlog')
+    registry.gauge("watcher_queue_depth", "Lines waiting").set(0.5)
+    assert registry.render() == (
+        "# HELP watcher_lines_total Log lines read\n"
+        "# TYPE watcher_lines_total counter\n"
+        'watcher_lines_total{run="run3"} 1200000\n'
+        'watcher_lines_total{run="C:\\\\7d2d \\"main\\"\\nlog"} 5\n'
+        "# HELP watcher_queue_depth Lines waiting\n"
+        "# TYPE watcher_queue_depth gauge\n"
+        "watcher_queue_depth 0.5\n")
+
+def test_register_returns_the_existing_metric():
+    registry = Registry()
+    first = registry.counter("sent_total", "Sent")
+    assert registry.counter("sent_total", "Sent again") is first
+
+def test_histogram():
+    registry = Registry()
+    latency = registry.histogram("webhook_seconds", "Webhook round trips", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, target="discord")
+    assert registry.render().splitlines() == [
+        "# HELP webhook_seconds Webhook round trips",
+        "# TYPE webhook_seconds histogram",
+        'webhook_seconds_bucket{target="discord",le="0.1"} 2',
+        'webhook_seconds_bucket{target="discord",le="1"} 3',
+        'webhook_seconds_bucket{target="discord",le="+Inf"} 4',
+        'webhook_seconds_sum{target="discord"} 3.65',
+        'webhook_seconds_count{target="discord"} 4',
+    ]
+
+def test_track(capsys):
+    registry = Registry()
+    queue = registry.gauge("queue_depth", "Queued")
+    state = {"depth": 3, "fail": False}
+
+    def depth():
+        if state["fail"]:
+            raise OSError("gone")
+        return state["depth"]
+
+    queue.track(depth, queue="notify")
+    queue.track(lambda: None, queue="idle")
+    assert registry.render().splitlines()[2:] == ['queue_depth{queue="notify"} 3']
+    # A failing function leaves its sample out and is said once, not at every scrape
+    state["fail"] = True
+    for _ in range(3):
+        assert registry.render().splitlines()[2:] == []
+    assert capsys.readouterr().out.splitlines() == [
+        "Metric queue_depth{queue=\"notify\"} left out, reading it failed: OSError('gone')"]
+    # Said again if it fails again after working
+    state["fail"] = False
+    assert registry.render().splitlines()[2:] == ['queue_depth{queue="notify"} 3']
+    state["fail"] = True
+    registry.render()
+    assert capsys.readouterr().out.count("left out") == 1
@@ -0,0 +1,67 @@
+from presence import PlayerTracker
+
+def test_reconnect_within_grace_is_not_announced():
+    tracker = PlayerTracker(grace=60)
+    assert tracker.login("Lost", 1000)
+    tracker.logout("Lost", 1100)
+    assert not tracker.login("Lost", 1159)
+    # The logout it came back from is never announced
+    assert tracker.due(2000) == []
+    assert tracker.online() == 1
+    assert tracker.suppressed == {"duplicate_login": 0, "reconnect": 1, "duplicate_logout": 0}
+
+def test_back_after_grace_announces_both():
+    tracker = PlayerTracker(grace=60)
+    tracker.login("Lost", 1000)
+    tracker.logout("Lost", 1100)
+    # Nobody called due() in between, the logout still comes first
+    assert tracker.login("Lost", 1160)
+    assert tracker.due(1160) == ["Lost"]
+    assert tracker.suppressed["reconnect"] == 0
+
+def test_due_only_after_grace():
+    tracker = PlayerTracker(grace=60)
+    for player, ts in (("Lost", 1000), ("Ana", 1010)):
+        tracker.login(player, ts)
+    tracker.logout("Lost", 1100)
+    tracker.logout("Ana", 1120)
+    assert tracker.due(1159) == []
+    assert tracker.due(1160) == ["Lost"]
+    assert tracker.due(1179) == []
+    assert tracker.due(5000) == ["Ana"]
+    assert tracker.due(5000) == []
+
+def test_duplicates_counted():
+    tracker = PlayerTracker(grace=60, max_session=3600)
+    assert tracker.login("Lost", 1000)
+    assert not tracker.login("Lost", 1500)
+    # Not seen for max_session: the logout line never came
+    assert tracker.login("Lost", 1500 + 3600)
+    tracker.logout("Lost", 6000)
+    tracker.logout("Lost", 6001)
+    assert tracker.due(7000) == ["Lost"]
+    assert tracker.suppressed == {"duplicate_login": 1, "reconnect": 0, "duplicate_logout": 1}
+
+def test_max_players_bound():
+    tracker = PlayerTracker(grace=60, max_players=2)
+    for i, player in enumerate(("Lost", "Ana", "Bo")):
+        assert tracker.login(player, 1000 + i)
+    # Lost was seen least recently and is forgotten
+    assert (tracker.online(), tracker.forgotten) == (2, 1)
+    assert tracker.login("Lost", 1010)
+    for i, player in enumerate(("Ana", "Bo", "Lost")):
+        tracker.logout(player, 1100 + i)
+    # The oldest logout over the bound is announced without waiting out its grace
+    assert tracker.due(1102) == ["Ana"]
+    assert tracker.due(1162) == ["Bo", "Lost"]
+
+def test_reset_keeps_pending_logouts():
+    tracker = PlayerTracker(grace=60)
+    tracker.login("Lost", 1000)
+    tracker.login("Ana", 1000)
+    tracker.logout("Ana", 1050)
+    tracker.reset()
+    assert tracker.online() == 0
+    # Lost's login after the restart is announced, not a duplicate
+    assert tracker.login("Lost", 1060)
+    assert tracker.due(1110) == ["Ana"]
@@ -0,0 +1,65 @@
+from datetime import date, datetime
+from sessions import JOIN, LEAVE, RESTART, SessionIndex, pair_sessions
+
+def at(stamp):
+    """Local epoch seconds, peak_per_day works in local days."""
+    return datetime.fromisoformat(stamp).timestamp()
+
+def test_pair_sessions():
+    events = [
+        (1, "Lost", JOIN), (2, "Ana", JOIN),
+        # Second join while online and a leave without a join are ignored
+        (3, "Lost", JOIN), (4, "Bo", LEAVE),
+        (5, "Ana", LEAVE),
+        (6, "Ana", JOIN),
+        # Ends Lost's and Ana's sessions, whoever it names
+        (7, "Lost", RESTART),
+        (8, "Lost", LEAVE),
+        (9, "Bo", JOIN), (10, "Cy", JOIN), (11, "Cy", LEAVE),
+    ]
+    assert sorted(pair_sessions(events)) == [("Ana", 2, 5), ("Ana", 6, 7), ("Bo", 9, 11), ("Cy", 10, 11),
+                                             ("Lost", 1, 7)]
+    # Still open at the end: closed at until instead of the last event
+    assert ("Bo", 9, 20) in list(pair_sessions(events, until=20))
+    assert list(pair_sessions([])) == []
+
+def test_concurrency_at_edges():
+    index = SessionIndex([("Lost", 10, 20), ("Ana", 15, 30), ("Bo", 20, 25)])
+    assert [index.concurrency_at(ts) for ts in (9.9, 10, 15, 19.9, 20, 25, 29.9, 30)] == [0, 1, 2, 2, 2, 1, 1, 0]
+    assert len(index) == 3
+
+def test_total_playtime():
+    index = SessionIndex([("Lost", 10, 20), ("Ana", 15, 30), ("Lost", 40, 45)])
+    assert (index.total_playtime("Lost"), index.total_playtime("Ana"), index.total_playtime("Nobody")) == (15, 15, 0)
+    assert index.names == ["Lost", "Ana"]
+
+def test_peak_per_day_across_midnight():
+    index = SessionIndex([
+        # Over two midnights, alone the whole day in between
+        ("Lost", at("2026-03-13T22:00"), at("2026-03-15T01:00")),
+        ("Ana", at("2026-03-13T23:00"), at("2026-03-14T00:30")),
+        ("Bo", at("2026-03-15T00:30"), at("2026-03-15T02:00")),
+        # Quick rejoin: leave and join at the same second is not a third player
+        ("Ana", at("2026-03-15T00:00"), at("2026-03-15T00:40")),
+        ("Ana", at("2026-03-15T00:40"), at("2026-03-15T01:30")),
+        ("Cy", at("2026-03-17T12:00"), at("2026-03-17T13:00")),
+    ])
+    assert index.peak_per_day() == {
+        date(2026, 3, 13): 2,
+        date(2026, 3, 14): 2,
+        date(2026, 3, 15): 3,
+        # Nobody online on the 16th: the peak carries the 0 after Bo left
+        date(2026, 3, 16): 0,
+        date(2026, 3, 17): 1,
+    }
+
+def test_save_load(tmp_path):
+    index = SessionIndex([("Lost", 10, 20), ("Ana", 15, 30), ("Bo", 20, 25)])
+    path = str(tmp_path / "sessions.idx")
+    index.save(path)
+    loaded = SessionIndex.load(path)
+    assert (loaded.names, loaded.players, loaded.starts, loaded.ends) == \
+        (index.names, index.players, index.starts, index.ends)
+    assert [loaded.concurrency_at(ts) for ts in range(5, 35)] == [index.concurrency_at(ts) for ts in range(5, 35)]
+    assert loaded.total_playtime("Ana") == 15
+    assert loaded.peak_per_day() == index.peak_per_day()
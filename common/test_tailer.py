@@ -0,0 +1,78 @@
+import os
+from tailer import LogTailer
+
+def append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+def test_starts_at_the_end_or_at_0(tmp_path):
+    path = tmp_path / "server.log"
+    missing = LogTailer(str(path))
+    append(path, b"old\n")
+    existing = LogTailer(str(path))
+    append(path, b"new\n")
+    # The file didn't exist yet, everything in it is new
+    assert list(missing.lines()) == ["old", "new"]
+    assert list(existing.lines()) == ["new"]
+
+def test_partial_line_carried_across_chunks(tmp_path):
+    path = tmp_path / "server.log"
+    append(path, b"")
+    tailer = LogTailer(str(path), chunk_size=4)
+    append(path, b"first line\r\nsecond")
+    assert list(tailer.lines()) == ["first line"]
+    # The offset is past the partial line, position is where it starts
+    assert tailer.offset == 18
+    assert tailer.position == 12
+    append(path, b" line\nthird\n")
+    assert list(tailer.lines()) == ["second line", "third"]
+    assert tailer.position == tailer.offset == os.path.getsize(path)
+    assert list(tailer.lines()) == []
+
+def test_long_lines_dropped(tmp_path):
+    path = tmp_path / "server.log"
+    append(path, b"")
+    tailer = LogTailer(str(path), chunk_size=8, max_line=16)
+    append(path, b"short\n" + b"x" * 40)
+    assert list(tailer.lines()) == ["short"]
+    # Nothing of the long line is kept around, up to and including its newline
+    assert tailer.position == tailer.offset
+    append(path, b"x" * 40 + b"\nafter\n")
+    assert list(tailer.lines()) == ["after"]
+    # A long line that fits in one chunk is dropped too
+    append(path, b"y" * 20 + b"\n" + b"z" * 16 + b"\n")
+    tailer.chunk_size = 64
+    assert list(tailer.lines()) == ["z" * 16]
+
+def test_resume_at_offset(tmp_path):
+    path = tmp_path / "server.log"
+    append(path, b"one\ntwo\nthr")
+    first = LogTailer(str(path), offset=0)
+    assert list(first.lines()) == ["one", "two"]
+    # A checkpoint keeps position, not offset, so the partial line is read again
+    resumed = LogTailer(str(path), offset=first.position)
+    append(path, b"ee\n")
+    assert list(resumed.lines()) == ["three"]
+
+def test_rotation(tmp_path):
+    path = tmp_path / "server.log"
+    append(path, b"before\n")
+    tailer = LogTailer(str(path))
+    assert not tailer.check_rotation()
+    os.rename(path, tmp_path / "server.log.1")
+    # Gone for now: nothing to do until the new file shows up
+    assert not tailer.check_rotation()
+    append(path, b"new file\n")
+    assert tailer.check_rotation()
+    assert list(tailer.lines()) == ["new file"]
+    assert not tailer.check_rotation()
+
+def test_truncation(tmp_path):
+    path = tmp_path / "server.log"
+    append(path, b"a long first line\n")
+    tailer = LogTailer(str(path), offset=0)
+    assert list(tailer.lines()) == ["a long first line"]
+    with open(path, "wb") as f:
+        f.write(b"short\n")
+    assert tailer.check_rotation()
+    assert list(tailer.lines()) == ["short"]
@@ -1,140 +1,147 @@
 #!/usr/bin/env python3
-import threading
-import json
+"""
+Discord notifications for an Enshrouded server, and restarts on game updates.
+
+Everything runs as tasks of one asyncio loop: the log file or journal tail, the update
+polling, the webhook sender and the metrics server. SIGTERM/SIGINT cancel them and
+what is queued is still sent.
+"""
+import asyncio
+import math
+import signal
 import yaml
 import re
 import time
 import os
-from apprise import Apprise
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-import subprocess
-import requests
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from tailer import LogTailer
+from journal import CursorFile, follow_journal
+from webhook import WebhookSender
+from updates import UpdateWatcher
+import metrics
+import discord_notify
+from eventstore import EventStore, LOGIN, LOGOUT, RESTART_EVENT
+from presence import PlayerTracker
 
 UPDATE_INTERVAL=300 # seconds
+# MESSAGE_IDs systemd logs for the unit itself: stopped, failed, started. Everyone online is gone after any of them
+SYSTEMD_RESTART_IDS = {"9d1aaa27d60140bd96365438aad20286", "d9b373ed55a64feb8242e02dbe79a49c", "39f53479d3a045ac8e11786248231fbf"}
+
+LINES = metrics.REGISTRY.counter("captainhook_lines_total", "Log lines processed")
+BYTES_READ = metrics.REGISTRY.counter("captainhook_bytes_read_total", "Bytes read from the log file")
+LAG = metrics.REGISTRY.gauge("captainhook_lag_bytes", "Bytes written to the log file that were not read yet")
+MATCHES = metrics.REGISTRY.counter("captainhook_matches_total", "Lines that matched the login or logout pattern")
+SUPPRESSED = metrics.REGISTRY.counter("captainhook_presence_suppressed_total", "Logins and logouts not announced: reconnects, duplicate spawns")
+# The UpdateWatcher of check_for_updates, for its last_poll
+_update_watcher = None
 
-def check_for_updates(app_id : str, state_file :str, restart_callback, webhook_url: str):
+async def check_for_updates(app_ids, state_file :str, restart_callback, webhook_url: str):
     """
-    app_id:       Steam App ID (string or int)
-    state_file:   Where we store last known change_number (e.g. '/tmp/app_state.json')
-    restart_callback: Function to call when update is needed
+    app_ids:      Steam App IDs (strings or ints), polled concurrently
+    state_file:   Where we store last known change_numbers (e.g. '/tmp/app_state.json')
+    restart_callback: Coroutine function to await when update is needed
     """
+    async def on_update(app_id, last_change_number, change_number):
+        print("Update detected! Triggering restart...")
+        print(f"Detected new change_number = {change_number} for {app_id} different from {last_change_number}")
+        send_webhook(webhook_url=webhook_url,player_name="SYSTEM",msg_kind="updating & restarting, kindly update your clients")
+        await restart_callback(webhook_url)
 
-    # Load previous change_number (if exists)
-    last_change_number = None
-    if os.path.exists(state_file):
-        try:
-            with open(state_file, "r") as f:
-                data = json.load(f)
-                last_change_number = data.get("change_number")
-        except:
-            pass
-    while True:
-        try:
-            response = requests.get(f"https://api.steamcmd.net/v1/info/{app_id}",timeout=10)
-            response.raise_for_status()
-            api_data = response.json()
-            change_number = (
-                api_data.get("data", {})
-                .get(str(app_id), {})
-                .get("_change_number")
-            )
-            if change_number is None:
-                print("Warning: '_change_number' missing from API response")
-            else:
-                print(f"Current change_number = {change_number}")
-
-                # Compare
-                if last_change_number is not None and change_number != last_change_number:
-                    print("Update detected! Triggering restart...")
-                    print(f"Detected new change_number = {change_number} different from {last_change_number}")
-                    send_webhook(webhook_url=webhook_url,player_name="SYSTEM",msg_kind="updating & restarting, kindly update your clients")
-                    restart_callback(webhook_url)
-
-                # Store this value for next loop
-                last_change_number = change_number
-                with open(state_file, "w") as f:
-                    json.dump({"change_number": change_number}, f)
-
-        except Exception as e:
-            print(f"Error checking for updates: {e}")
-        time.sleep(UPDATE_INTERVAL)
-def restart_program(webhook: str):
+    global _update_watcher
+    watcher = _update_watcher = UpdateWatcher(app_ids, state_file, on_update, interval=UPDATE_INTERVAL)
+    await watcher.run()
+
+async def restart_program(webhook: str):
     print("Restarting pod...")
     try:
         os.remove("/var/lib/containers/storage/volumes/systemd-enshrouded-base/_data/steamapps/appmanifest_2278520.acf")
         os.remove("/var/lib/containers/storage/volumes/systemd-enshrouded-base/_data/steamapps/appmanifest_228980.acf")
-    except:
+    except OSError:
         print("Unable to remove file")
         pass
     try:
-        subprocess.run(["systemctl","restart","enshrouded"])
+        process = await asyncio.create_subprocess_exec("systemctl","restart","enshrouded")
+        await process.wait()
         # FIXME
         #output = subprocess.run(["systemctl","status" "enshrouded"], capture_output=True)
         #status = output.stdout.decode().strip()
         #print(status)
-    except:
+    except Exception:
         print("well thats not good")
         send_webhook(webhook_url=webhook,player_name="SYSTEM",msg_kind="Well there goes that SLA. Someone might want to ping an admin. Server might be in trouble")
         pass
 
-class LogFileHandler(FileSystemEventHandler):
-    def __init__(self, log_file, pattern, apprise_client):
-        super().__init__()
+class LogFileHandler:
+    """
+    Follows the log file from a task, checking it every poll_interval seconds.
+
+    A stat and a read that finds nothing is all an idle poll costs. A file that got
+    replaced (rotated, recreated by a server restart) or truncated is read from the start.
+    Reads run in a worker thread, logins are queued on the WebhookSender like the journal's.
+    """
+    def __init__(self, log_file, pattern, webhook_url, store=None, server="enshrouded", poll_interval=0.5):
         self.log_file = os.path.abspath(log_file)
         self.pattern = pattern
-        self.apprise_client = apprise_client
-        self._file_position = 0
-        self._ensure_start_position()
-
-    def _ensure_start_position(self):
-        """Ensure starting position at end of file, or 0 if file is empty."""
-        if os.path.exists(self.log_file):
-            self._file_position = os.path.getsize(self.log_file)
-        else:
-            self._file_position = 0
-
-    def _read_new_lines(self):
-        """Read newly appended lines and process matches."""
-        if not os.path.exists(self.log_file):
-            return
+        self.webhook_url = webhook_url
+        # Optional EventStore the logins are added to, under the server label
+        self.store = store
+        self.server = server
+        self.poll_interval = poll_interval
+        # Checks of the file, and the ones that found new lines. Lines written between two
+        # checks are read at once, like the debounced bursts of the watchdog version were
+        self.polls = 0
+        self.reads = 0
+        # Start at the end of the file, or 0 if it does not exist yet
+        self.tailer = LogTailer(self.log_file)
+        LAG.track(self.lag)
 
-        with open(self.log_file, "r") as f:
-            f.seek(self._file_position)
-            new_data = f.read()
-            self._file_position = f.tell()
+    def _poll(self):
+        """Blocking: checks for rotation and reads to the end of the file, returns who logged in."""
+        if self.tailer.check_rotation() and self.store:
+            self.store.add(self.server, RESTART_EVENT)
+        return self._read_new_lines()
 
+    def _read_new_lines(self):
+        """Read newly appended lines and process matches, returns the players that logged in."""
         #for line in new_data.splitlines():
         #    if self.pattern.search(line):
         #        message = f"**Log Alert:**\n```\n{line.strip()}\n```"
         #        self.apprise_client.notify(title="Log Watcher Alert", body=message)
         #        print(f"Matched pattern and sent notification: {line.strip()}")
-        for line in new_data.splitlines():
+        players = []
+        start = self.tailer.offset
+        count = 0
+        for line in self.tailer.lines():
+            count += 1
             res = self.pattern.search(line)
             if res:
+                MATCHES.inc(event="login")
+                if self.store:
+                    self.store.add(self.server, LOGIN, res.group(1))
                 #message = f"**Log Alert:**\n```\n{line.strip()}\n```"
-                message = f"Player {res.group(1)} is online!"
                 #self.apprise_client.notify(title="Log Watcher Alert", body=message)
-                self.apprise_client.notify(body=message)
+                players.append(res.group(1))
                 print(f"Matched pattern and sent notification: {line.strip()}")
+        if self.tailer.offset != start:
+            self.reads += 1
+        LINES.inc(count, source="file")
+        BYTES_READ.inc(self.tailer.offset - start)
+        return players
 
-    def on_modified(self, event):
-        """Triggered when log file is modified (new lines appended)."""
-        if event.src_path == self.log_file:
-            self._read_new_lines()
-
-    def on_created(self, event):
-        """Triggered when a new file is created (log rotated and recreated)."""
-        if event.src_path == self.log_file:
-            print(f"Log file {self.log_file} was recreated. Resetting position.")
-            self._file_position = 0
-            self._read_new_lines()
+    def lag(self):
+        return os.path.getsize(self.log_file) - self.tailer.position
 
-    def on_moved(self, event):
-        """Triggered when the log file is rotated (moved to a new name)."""
-        if event.src_path == self.log_file:
-            print(f"Log file {self.log_file} was moved to {event.dest_path}. Waiting for recreation.")
-            self._file_position = 0
+    async def follow(self):
+        try:
+            while True:
+                self.polls += 1
+                # Catching up after a rotation can mean megabytes, the other tasks keep running meanwhile
+                for player_name in await asyncio.to_thread(self._poll):
+                    send_webhook(self.webhook_url, f"Player: {player_name}", "online!")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            print(f"{self.polls} polls, {self.reads} reads")
 
 
 def load_config(config_path="config.yaml"):
@@ -142,88 +149,177 @@ def load_config(config_path="config.yaml"):
     with open(config_path, "r") as f:
         return yaml.safe_load(f)
 
-def local_file(log_file:str,pattern:str, discord_url:str):
+async def local_file(log_file:str,pattern:str, discord_url:str, poll_interval:float=0.5, store=None, server="enshrouded"):
     if not os.path.exists(os.path.dirname(log_file)):
         raise FileNotFoundError(f"Directory does not exist: {os.path.dirname(log_file)}")
 
-    apobj = Apprise()
-    apobj.add(discord_url)
+    # Apprise's discord://id/token works too, the sender posts to the https URL it stands for
+    discord = discord_notify.webhook_url(discord_url)
+    if discord is None:
+        raise ValueError(f"discord_webhook is not a Discord webhook URL: {discord_url}")
 
     print(f"Monitoring {log_file} for pattern: {pattern.pattern}")
+    handler = LogFileHandler(log_file, pattern, discord[0], store, server, poll_interval)
+    metrics.REGISTRY.counter("captainhook_file_polls_total", "Checks of the log file").track(lambda: handler.polls)
+    metrics.REGISTRY.counter("captainhook_file_reads_total", "Checks of the log file that found new lines").track(lambda: handler.reads)
+    await handler.follow()
 
-    # Watch the directory instead of just the file
-    directory_to_watch = os.path.dirname(log_file) or "."
-    event_handler = LogFileHandler(log_file, pattern, apobj)
-
-    observer = Observer()
-    observer.schedule(event_handler, path=directory_to_watch, recursive=False)
-    observer.start()
+_sender = None
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        observer.stop()
+def get_sender():
+    global _sender
+    if _sender is None:
+        _sender = WebhookSender()
+    return _sender
 
-    observer.join()
 def send_webhook(webhook_url: str, player_name: str, msg_kind: str):
     """Send a webhook with player info. Not sure how Bob pub/sub thing did this otherwise I would reuse it"""
-    data = {"content":f"{player_name} is {msg_kind}"}
-    try:
-        response = requests.post(webhook_url, json=data, timeout=5)
-        response.raise_for_status()
-        print(f"[+] Webhook sent for {player_name}")
-    except requests.RequestException as e:
-        print(f"[!] Failed to send webhook: {e}")
+    # Queued, the sender thread posts it (merged with others of the same kind)
+    get_sender().send(webhook_url, player_name, msg_kind)
+
+def _journal_time(entry):
+    """Epoch seconds the journal recorded the entry at, None if it has no timestamp."""
+    usec = entry.get("__REALTIME_TIMESTAMP")
+    return usec / 1e6 if usec else None
+
+def send_logouts(presence, discord_url, now):
+    for player_name in presence.due(now):
+        send_webhook(discord_url, f"Player: {player_name}", "logged off!")
 
-def tail_journalctl(service:str, pattern:str, logout_pattern:str, discord_url:str):
+async def announce_logouts(presence, discord_url, interval=1):
+    """Sends the logouts whose grace period is over, the journal may stay quiet for hours."""
+    while True:
+        await asyncio.sleep(interval)
+        send_logouts(presence, discord_url, time.time())
+
+async def tail_journalctl(service:str, pattern:str, logout_pattern:str, discord_url:str, cursor_file=None,
+                    store=None, server="enshrouded", logout_grace=60):
     """And in the first circle of hell you must read logs from journalctl FOREVER!!!!"""
-    cmd = ["journalctl","-u",service,"-f","-n","0"]
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     print(f"Monitoring {service} for pattern: {pattern.pattern}")
-    for line in iter(process.stdout.readline,""):
-        line = line.strip()
-        match = pattern.search(line)
-        logout = logout_pattern.search(line)
-        if match:
-            player_name = match.group(1)
-            print(f"[+] Detected login: {player_name}")
-            send_webhook(discord_url, f"Player: {player_name}", "online!")
-        if logout:
-            player_name = logout.group(1)
-            print(f"[+] Detected logout :{player_name}")
-            send_webhook(discord_url, f"Player: {player_name}", "logged off!")
+    # A logout is only sent after logout_grace seconds without the player coming back
+    presence = PlayerTracker(logout_grace)
+    for reason in presence.suppressed:
+        SUPPRESSED.track(lambda reason=reason: presence.suppressed[reason], reason=reason)
+    announcer = asyncio.create_task(announce_logouts(presence, discord_url), name="logouts")
+    try:
+        async for entry in follow_journal(service, CursorFile(cursor_file)):
+            line = entry.get("MESSAGE", "").strip()
+            LINES.inc(source="journal")
+            ts = _journal_time(entry)
+            if entry.get("MESSAGE_ID") in SYSTEMD_RESTART_IDS:
+                presence.reset()
+                if store:
+                    store.add(server, RESTART_EVENT, None, ts)
+            match = pattern.search(line)
+            logout = logout_pattern.search(line)
+            if match:
+                MATCHES.inc(event="login")
+                player_name = match.group(1)
+                print(f"[+] Detected login: {player_name}")
+                now = ts or time.time()
+                send_logouts(presence, discord_url, now)
+                if presence.login(player_name, now):
+                    send_webhook(discord_url, f"Player: {player_name}", "online!")
+                else:
+                    print(f"[=] {player_name} was online already or reconnected, not sent")
+                if store:
+                    store.add(server, LOGIN, player_name, ts)
+            if logout:
+                MATCHES.inc(event="logout")
+                player_name = logout.group(1)
+                print(f"[+] Detected logout :{player_name}")
+                presence.logout(player_name, ts or time.time())
+                if store:
+                    store.add(server, LOGOUT, player_name, ts)
+    finally:
+        announcer.cancel()
+        # Whoever is still waiting out the grace period is gone as far as we know
+        send_logouts(presence, discord_url, math.inf)
 
 
-def main():
-    config = load_config()
+def _poll_age(app_id):
+    if _update_watcher is None or app_id not in _update_watcher.last_poll:
+        return None
+    # last_poll times come from the event loop's clock, which is time.monotonic
+    return time.monotonic() - _update_watcher.last_poll[app_id][0]
+
+def _poll_result(app_id, kind):
+    if _update_watcher is None or app_id not in _update_watcher.last_poll:
+        return None
+    # "ok", "unchanged" or "error: <what went wrong>"
+    return int(_update_watcher.last_poll[app_id][1].split(":")[0] == kind)
+
+async def serve_metrics(port, app_ids, host="127.0.0.1", store=None):
+    """Exposes lines, matches, webhook and update check counters on host:port/metrics."""
+    registry = metrics.REGISTRY
+    sender = get_sender()
+    sender.latency = registry.histogram("captainhook_webhook_latency_seconds", "Time for one discord webhook POST")
+    registry.gauge("captainhook_webhook_queue_depth", "Webhooks waiting to be sent").track(sender.queue_depth)
+    registry.counter("captainhook_webhooks_sent_total", "Webhooks sent").track(lambda: sender.sent)
+    registry.counter("captainhook_webhooks_failed_total", "Webhooks given up on").track(lambda: sender.failed)
+    registry.counter("captainhook_webhooks_rate_limited_total", "429 answers from discord").track(lambda: sender.rate_limited)
+    registry.counter("captainhook_webhooks_dropped_total", "Webhooks dropped on a full queue").track(lambda: sender.dropped)
+    age = registry.gauge("captainhook_update_poll_age_seconds", "Seconds since the last update check")
+    result = registry.gauge("captainhook_update_poll_result", "1 for the result of the last update check")
+    for app_id in map(str, app_ids):
+        age.track(lambda app_id=app_id: _poll_age(app_id), app_id=app_id)
+        for kind in ("ok", "unchanged", "error"):
+            result.track(lambda app_id=app_id, kind=kind: _poll_result(app_id, kind), app_id=app_id, result=kind)
+    if store:
+        registry.counter("captainhook_events_stored_total", "Events written to the event store").track(lambda: store.written)
+        registry.counter("captainhook_events_dropped_total", "Events the event store had no room for").track(lambda: store.dropped)
+    return await metrics.serve_async(port, host)
+
+async def run(config):
+    """Runs until the tail ends or SIGTERM/SIGINT cancels it, then sends what is queued."""
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, task.cancel)
 
     pattern = re.compile(config["pattern"], re.IGNORECASE)
     logout_pattern = re.compile(config["logout_pattern"], re.IGNORECASE)
     discord_url = config["discord_webhook"]
+    sender = get_sender()
+    sender.start()
 
     # Start background update check
-    update_thread = threading.Thread(
-        target=check_for_updates,
-        args=(
-            config["app_id"],
-            config["appinfo_file_new"],
-            restart_program,
-            config["discord_webhook_url"]
-        ),
-        daemon=True
-    )
-    update_thread.start()
-
-
-    if "log_file" in config:
-        log_file = config["log_file"]
-        local_file(log_file, pattern, discord_url)
-    elif "journalctl" in config:
-        service = config["journalctl"]
-        tail_journalctl(service,pattern,logout_pattern,config["discord_webhook_url"])
-    else:
-        print("log_file or journalctl required")
+    updates = asyncio.create_task(check_for_updates(
+        config.get("app_ids") or [config["app_id"]],
+        config["appinfo_file_new"],
+        restart_program,
+        config["discord_webhook_url"]
+    ), name="updates")
+    store = EventStore(config["event_store"]) if config.get("event_store") else None
+    server = config.get("event_server", "enshrouded")
+    metrics_server = None
+    try:
+        if config.get("metrics_port"):
+            metrics_server = await serve_metrics(config["metrics_port"], config.get("app_ids") or [config["app_id"]],
+                                                 config.get("metrics_host", "127.0.0.1"), store)
+
+        if "log_file" in config:
+            log_file = config["log_file"]
+            await local_file(log_file, pattern, discord_url, config.get("poll_interval", 0.5), store, server)
+        elif "journalctl" in config:
+            service = config["journalctl"]
+            await tail_journalctl(service,pattern,logout_pattern,config["discord_webhook_url"],config.get("journal_cursor_file"),
+                                  store, server, config.get("logout_grace", 60))
+        else:
+            print("log_file or journalctl required")
+    except asyncio.CancelledError:
+        print("Stopping...")
+    finally:
+        updates.cancel()
+        await asyncio.gather(updates, return_exceptions=True)
+        if metrics_server:
+            metrics_server.close()
+        await sender.stop()
+        if store:
+            store.stop()
+
+def main():
+    asyncio.run(run(load_config()))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
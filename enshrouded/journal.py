@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Reader for `journalctl -o export` output.
+
+Only MESSAGE, MESSAGE_ID, __REALTIME_TIMESTAMP and __CURSOR are kept, every other field is skipped
+without decoding. Works on any binary stream, so a recorded export
+(`journalctl -u enshrouded -o export > sample.export`) can be replayed with
+`python journal.py sample.export`. journal_sample.export is such a recording,
+test_journal.py runs it through the parser.
+"""
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+
+# MESSAGE_ID tells systemd's own "Stopped/Started <unit>" entries apart
+WANTED_FIELDS = (b"MESSAGE", b"MESSAGE_ID", b"__REALTIME_TIMESTAMP", b"__CURSOR")
+
+class ExportParser:
+    """
+    Turns chunks of export output, cut anywhere, into entries: dicts with the keys MESSAGE (str),
+    MESSAGE_ID (str), __REALTIME_TIMESTAMP (int, microseconds) and __CURSOR (str), when present.
+    """
+    def __init__(self):
+        self.buf = bytearray()
+        self.entry = {}
+
+    def feed(self, chunk):
+        """Yields the entries chunk completes, the rest waits for the next chunk."""
+        buf = self.buf
+        entry = self.entry
+        buf += chunk
+        pos = 0
+        while True:
+            nl = buf.find(b"\n", pos)
+            if nl == -1:
+                break
+            if nl == pos:
+                # Blank line ends the entry
+                if entry:
+                    yield _finish(entry)
+                    entry = self.entry = {}
+                pos = nl + 1
+                continue
+            eq = buf.find(b"=", pos, nl)
+            if eq != -1:
+                key = bytes(buf[pos:eq])
+                if key in WANTED_FIELDS:
+                    entry[key] = bytes(buf[eq + 1:nl])
+                pos = nl + 1
+                continue
+            # Binary field: name, newline, little endian uint64 size, data, newline
+            if len(buf) < nl + 9:
+                break
+            size, = struct.unpack_from("<Q", buf, nl + 1)
+            end = nl + 9 + size
+            if len(buf) < end + 1:
+                break
+            key = bytes(buf[pos:nl])
+            if key in WANTED_FIELDS:
+                entry[key] = bytes(buf[nl + 9:end])
+            pos = end + 1
+        del buf[:pos]
+
+def read_export(stream, chunk_size=256 * 1024):
+    """Yields the entries (see ExportParser) of a binary stream until it ends."""
+    read = getattr(stream, "read1", stream.read)
+    parser = ExportParser()
+    while chunk := read(chunk_size):
+        yield from parser.feed(chunk)
+
+def _finish(entry):
+    result = {}
+    for key, value in entry.items():
+        if key == b"__REALTIME_TIMESTAMP":
+            result["__REALTIME_TIMESTAMP"] = int(value)
+        else:
+            result[key.decode()] = value.decode("utf-8", "replace")
+    return result
+
+class CursorFile:
+    """Keeps the last handled journal cursor, written atomically at most every interval seconds."""
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self.cursor = None
+        self._saved = None
+        # Not 0, monotonic() can be smaller than interval on a freshly booted host
+        self._last_write = float("-inf")
+
+    def load(self):
+        if not self.path:
+            return None
+        try:
+            with open(self.path, "r") as f:
+                self.cursor = json.load(f).get("cursor")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Ignoring unreadable cursor file {self.path}: {e}")
+        self._saved = self.cursor
+        return self.cursor
+
+    def update(self, cursor, force=False):
+        self.cursor = cursor
+        now = time.monotonic()
+        if not self.path or self.cursor == self._saved:
+            return
+        if not force and now - self._last_write < self.interval:
+            return
+        self._last_write = now
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"cursor": self.cursor}, f)
+            os.replace(tmp, self.path)
+            self._saved = self.cursor
+        except OSError as e:
+            print(f"Failed to write cursor file {self.path}: {e}")
+
+async def follow_journal(service, cursor_file=None, chunk_size=256 * 1024):
+    """
+    Yields entries of a systemd unit as they are written, from a journalctl child process.
+    With a saved cursor it continues right after it, otherwise only new entries are shown.
+    Cancelling the consumer stops journalctl.
+    """
+    cursor = cursor_file.load() if cursor_file else None
+    cmd = ["journalctl", "-u", service, "-f", "-o", "export"]
+    if cursor:
+        cmd.append(f"--after-cursor={cursor}")
+    else:
+        cmd += ["-n", "0"]
+    # stderr is inherited, journalctl's complaints end up in our own log
+    process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE)
+    parser = ExportParser()
+    try:
+        while chunk := await process.stdout.read(chunk_size):
+            for entry in parser.feed(chunk):
+                yield entry
+                if cursor_file and "__CURSOR" in entry:
+                    cursor_file.update(entry["__CURSOR"])
+    finally:
+        if cursor_file and cursor_file.cursor:
+            cursor_file.update(cursor_file.cursor, force=True)
+        if process.returncode is None:
+            process.terminate()
+            await process.wait()
+
+if __name__ == "__main__":
+    with open(sys.argv[1], "rb") as f:
+        for entry in read_export(f):
+            print(entry.get("__REALTIME_TIMESTAMP"), entry.get("MESSAGE"))
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import re
+import captainhook
+from captainhook import LogFileHandler
+
+PATTERN = re.compile("Player '(.+?)' joined", re.IGNORECASE)
+
+class RecordingSender:
+    """Stands in for the WebhookSender, keeps what send_webhook queues."""
+    def __init__(self):
+        self.sent = []
+
+    def send(self, webhook_url, subject, msg_kind):
+        self.sent.append((webhook_url, subject, msg_kind))
+
+def follow(log_file, writes, monkeypatch):
+    """Runs LogFileHandler.follow while writes() appends to log_file, returns the handler and what it sent."""
+    sender = RecordingSender()
+    monkeypatch.setattr(captainhook, "_sender", sender)
+
+    async def run():
+        handler = LogFileHandler(str(log_file), PATTERN, "https://discord.example/hook", poll_interval=0.02)
+        task = asyncio.create_task(handler.follow())
+        await asyncio.sleep(0.1)
+        await writes()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return handler
+    return asyncio.run(asyncio.wait_for(run(), 10)), sender.sent
+
+def append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+def test_logins_go_through_the_sender(tmp_path, monkeypatch):
+    log_file = tmp_path / "enshrouded_server.log"
+    append(log_file, "[Session] Player 'Old' joined\n")
+
+    async def writes():
+        append(log_file, "[Session] Player 'Ana' joined\n[Server] noise\n")
+        await asyncio.sleep(0.1)
+        append(log_file, "[Session] Player 'Bob' jo")
+        await asyncio.sleep(0.1)
+        append(log_file, "ined\n")
+        await asyncio.sleep(0.1)
+
+    handler, sent = follow(log_file, writes, monkeypatch)
+    # What was in the file before the start is not announced, the partial line once it is complete
+    assert sent == [("https://discord.example/hook", "Player: Ana", "online!"),
+                    ("https://discord.example/hook", "Player: Bob", "online!")]
+    assert handler.reads == 3
+    assert handler.polls > handler.reads
+
+def test_recreated_file_read_from_the_start(tmp_path, monkeypatch):
+    log_file = tmp_path / "enshrouded_server.log"
+    append(log_file, "[Server] started\n" * 100)
+
+    async def writes():
+        os.rename(log_file, tmp_path / "enshrouded_server.log.1")
+        append(log_file, "[Session] Player 'Ana' joined\n")
+        await asyncio.sleep(0.2)
+
+    handler, sent = follow(log_file, writes, monkeypatch)
+    assert [subject for _, subject, _ in sent] == ["Player: Ana"]
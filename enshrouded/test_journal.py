@@ -0,0 +1,118 @@
+import asyncio
+import io
+import json
+import os
+import stat
+import pytest
+from journal import ExportParser, CursorFile, read_export, follow_journal
+
+# Recorded with `journalctl -u enshrouded -o export`: a plain entry, a length-prefixed MESSAGE
+# with an embedded newline, systemd's "Stopped" entry and a MESSAGE that is not valid UTF-8
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "journal_sample.export")
+EXPECTED = [
+    {"__CURSOR": "s=1a;i=101", "__REALTIME_TIMESTAMP": 1773515000000000, "MESSAGE": "[Session] Player 'Alice' joined"},
+    {"__CURSOR": "s=1a;i=102", "__REALTIME_TIMESTAMP": 1773515005000000, "MESSAGE": "[Session] Player 'Bob' joined\n(second line)"},
+    {"__CURSOR": "s=1a;i=103", "__REALTIME_TIMESTAMP": 1773515009000000, "MESSAGE_ID": "9d1aaa27d60140bd96365438aad20286",
+     "MESSAGE": "Stopped enshrouded.service."},
+    {"__CURSOR": "s=1a;i=104", "__REALTIME_TIMESTAMP": 1773515012000000, "MESSAGE": "[Session] Player 'Chloë' left �"},
+]
+
+def sample():
+    with open(SAMPLE, "rb") as f:
+        return f.read()
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 8, 9, 64, 1 << 20])
+def test_parser_any_chunk_size(chunk_size):
+    data = sample()
+    parser = ExportParser()
+    entries = []
+    for start in range(0, len(data), chunk_size):
+        entries += parser.feed(data[start:start + chunk_size])
+    assert entries == EXPECTED
+    assert not parser.buf
+
+def test_read_export():
+    assert list(read_export(io.BytesIO(sample()), chunk_size=5)) == EXPECTED
+
+def test_entry_without_blank_line_waits():
+    # The last entry is only complete once journalctl writes its blank line
+    data = sample()[:-1]
+    parser = ExportParser()
+    assert list(parser.feed(data)) == EXPECTED[:3]
+    assert list(parser.feed(b"\n")) == EXPECTED[3:]
+
+def test_cursor_file_round_trip(tmp_path):
+    path = tmp_path / "cursor.json"
+    cursor = CursorFile(str(path), interval=3600)
+    assert cursor.load() is None
+    cursor.update("s=1a;i=101")
+    assert json.loads(path.read_text()) == {"cursor": "s=1a;i=101"}
+    # Within the interval only the in-memory cursor moves, until forced
+    cursor.update("s=1a;i=102")
+    assert json.loads(path.read_text()) == {"cursor": "s=1a;i=101"}
+    cursor.update("s=1a;i=102", force=True)
+    assert CursorFile(str(path)).load() == "s=1a;i=102"
+    assert not os.path.exists(f"{path}.tmp")
+
+def test_cursor_file_unreadable(tmp_path, capsys):
+    path = tmp_path / "cursor.json"
+    path.write_text("not json")
+    assert CursorFile(str(path)).load() is None
+    assert "Ignoring unreadable cursor file" in capsys.readouterr().out
+
+def fake_journalctl(tmp_path, monkeypatch):
+    """
+    A journalctl on PATH that logs its arguments, prints what is in journal.export after
+    --after-cursor and then waits for more like -f does.
+    """
+    script = tmp_path / "journalctl"
+    script.write_text(f"""#!/usr/bin/env python3
+import sys, time
+with open({str(tmp_path / "args.txt")!r}, "a") as f:
+    f.write(" ".join(sys.argv[1:]) + "\\n")
+after = next((a.split("=", 1)[1] for a in sys.argv if a.startswith("--after-cursor=")), None)
+data = open({str(tmp_path / "journal.export")!r}, "rb").read()
+if after:
+    data = data[data.index(b"__CURSOR=" + after.encode()):]
+    data = data[data.index(b"\\n\\n") + 2:]
+sys.stdout.buffer.write(data)
+sys.stdout.flush()
+time.sleep(60)
+""")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    return tmp_path / "args.txt"
+
+def follow(path, count):
+    """The MESSAGEs of the first count entries, then stops following like SIGTERM does to captainhook."""
+    async def consume(messages):
+        async for entry in follow_journal("enshrouded", CursorFile(path)):
+            messages.append(entry["MESSAGE"])
+
+    async def run():
+        messages = []
+        task = asyncio.create_task(consume(messages))
+        while len(messages) < count:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return messages
+
+    return asyncio.run(asyncio.wait_for(run(), 10))
+
+def test_follow_journal_resumes_after_saved_cursor(tmp_path, monkeypatch):
+    args = fake_journalctl(tmp_path, monkeypatch)
+    journal = tmp_path / "journal.export"
+    path = str(tmp_path / "cursor.json")
+    data = sample()
+    # Two entries written so far
+    journal.write_bytes(data[:data.index(b"__CURSOR=s=1a;i=103")])
+    assert follow(path, 2) == [EXPECTED[0]["MESSAGE"], EXPECTED[1]["MESSAGE"]]
+    # Stopping saves the cursor of the last entry handled, the next run starts right after it
+    assert CursorFile(path).load() == "s=1a;i=102"
+    journal.write_bytes(data)
+    assert follow(path, 2) == [EXPECTED[2]["MESSAGE"], EXPECTED[3]["MESSAGE"]]
+    assert CursorFile(path).load() == "s=1a;i=104"
+    first, second = args.read_text().splitlines()
+    assert first.endswith("-n 0")
+    assert second.endswith("--after-cursor=s=1a;i=102")
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import updates
+from updates import UpdateWatcher
+
+class FakeSteamCmd:
+    """
+    Serves /v1/info/<app_id> like api.steamcmd.net: the change number from change_numbers,
+    an ETag that changes with it and 304 for a matching If-None-Match. Statuses queued in
+    errors are answered first. Every request's (app_id, If-None-Match) is recorded.
+    """
+    def __init__(self, change_numbers):
+        self.change_numbers = change_numbers
+        self.errors = []
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                app_id = self.path.rsplit("/", 1)[1]
+                fake.requests.append((app_id, self.headers.get("If-None-Match")))
+                if fake.errors:
+                    self.send_response(fake.errors.pop(0))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                number = fake.change_numbers[app_id]
+                etag = f'"{app_id}-{number}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = json.dumps({"data": {app_id: {"_change_number": number, "common": {}}},
+                                   "status": "success"}).encode()
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/v1/info/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+@pytest.fixture
+def steamcmd():
+    fake = FakeSteamCmd({"2278520": 100, "228980": 7})
+    yield fake
+    fake.server.shutdown()
+    fake.server.server_close()
+
+def watcher(steamcmd, state_file, on_update=None, **kwargs):
+    updates_seen = []
+
+    async def record(app_id, old, new):
+        updates_seen.append((app_id, old, new))
+
+    return UpdateWatcher(["2278520", "228980"], str(state_file), on_update or record,
+                         base_url=steamcmd.base_url, **kwargs), updates_seen
+
+def test_200_then_304(steamcmd, tmp_path):
+    w, seen = watcher(steamcmd, tmp_path / "state.json")
+    asyncio.run(w.check("2278520"))
+    asyncio.run(w.check("2278520"))
+    assert steamcmd.requests == [("2278520", None), ("2278520", '"2278520-100"')]
+    assert w.last_poll["2278520"][1] == "unchanged"
+    assert json.loads((tmp_path / "state.json").read_text()) == {"2278520": 100}
+    # The first number seen is only recorded, there was nothing to update from
+    assert seen == []
+
+def test_update_detected(steamcmd, tmp_path):
+    w, seen = watcher(steamcmd, tmp_path / "state.json")
+    asyncio.run(w.check("2278520"))
+    steamcmd.change_numbers["2278520"] = 101
+    asyncio.run(w.check("2278520"))
+    assert seen == [("2278520", 100, 101)]
+    assert w.last_poll["2278520"][1] == "ok"
+    assert json.loads((tmp_path / "state.json").read_text()) == {"2278520": 101}
+
+def test_unchanged_number_does_not_rewrite_state(steamcmd, tmp_path):
+    state = tmp_path / "state.json"
+    w, seen = watcher(steamcmd, state)
+    asyncio.run(w.check("2278520"))
+    os.remove(state)
+    # A 200 (new ETag, e.g. another field changed) with the same change number
+    w._validators.clear()
+    asyncio.run(w.check("2278520"))
+    assert steamcmd.requests[-1] == ("2278520", None)
+    assert not state.exists()
+    assert seen == []
+
+def test_old_single_app_state_layout(steamcmd, tmp_path):
+    state = tmp_path / "state.json"
+    state.write_text(json.dumps({"change_number": 99}))
+    called = []
+    # A plain function runs in a worker thread
+    w, _ = watcher(steamcmd, state, on_update=lambda *args: called.append((threading.current_thread(), args)))
+    assert w.change_numbers == {"2278520": 99}
+    asyncio.run(w.check("2278520"))
+    asyncio.run(w.check("228980"))
+    assert [args for _, args in called] == [("2278520", 99, 100)]
+    assert called[0][0] is not threading.main_thread()
+    assert json.loads(state.read_text()) == {"2278520": 100, "228980": 7}
+
+@pytest.mark.parametrize("content", ["{", "42", "[1, 2]", "null", '"100"'])
+def test_unreadable_state_starts_empty(steamcmd, tmp_path, capsys, content):
+    state = tmp_path / "state.json"
+    state.write_text(content)
+    w, _ = watcher(steamcmd, state)
+    assert w.change_numbers == {}
+    assert "Ignoring unreadable state file" in capsys.readouterr().out
+
+def test_errors_back_off(steamcmd, tmp_path, monkeypatch):
+    w, _ = watcher(steamcmd, tmp_path / "state.json", interval=10, max_interval=50)
+    steamcmd.errors = [500, 500, 500]
+    delays = []
+    sleep = asyncio.sleep
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+        if len(delays) == 5:
+            raise asyncio.CancelledError
+        await sleep(0)
+
+    monkeypatch.setattr(updates.random, "uniform", lambda a, b: 1)
+    monkeypatch.setattr(updates.asyncio, "sleep", fake_sleep)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(w.watch("2278520"))
+    # Doubled per error up to max_interval, back to interval after a good poll
+    assert delays == [20, 40, 50, 10, 10]
+    assert [if_none_match for _, if_none_match in steamcmd.requests] == [None, None, None, None, '"2278520-100"']
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from webhook import WebhookSender, merge_subjects
+
+class StubDiscord:
+    """
+    A local webhook endpoint. Answers with the scripted (status, headers, body) responses in
+    order, then 204s, and records (monotonic time, path, content) of every POST.
+    """
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.requests.append((time.monotonic(), self.path, json.loads(body)["content"]))
+                status, headers, data = stub.responses.pop(0) if stub.responses else (204, {}, b"")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/webhooks/1/token"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def contents(self):
+        return [content for _, _, content in self.requests]
+
+    def gaps(self):
+        times = [ts for ts, _, _ in self.requests]
+        return [b - a for a, b in zip(times, times[1:])]
+
+@pytest.fixture
+def stub():
+    stubs = []
+
+    def make(responses=()):
+        stubs.append(StubDiscord(responses))
+        return stubs[-1]
+
+    yield make
+    for s in stubs:
+        s.server.shutdown()
+        s.server.server_close()
+
+def deliver(sender, messages):
+    """Runs the sender on a fresh loop, queues messages ((url, subject, kind)) and waits for them to be sent."""
+    async def run():
+        sender.start()
+        for message in messages:
+            sender.send(*message)
+        await sender.stop(timeout=30)
+    asyncio.run(run())
+
+def test_merge_subjects():
+    assert merge_subjects(["Player: A"], "online!") == "Player: A is online!"
+    assert merge_subjects(["Player: A", "Player: B"], "online!") == "Players: A, B are online!"
+    assert merge_subjects(["SYSTEM", "Player: A"], "online!") == "SYSTEM, Player: A are online!"
+
+def test_coalesces_within_window(stub):
+    discord = stub()
+    sender = WebhookSender(coalesce_window=0.3)
+    deliver(sender, [(discord.url, "Player: A", "online!"), (discord.url, "Player: B", "online!"),
+                     (discord.url, "Player: A", "online!"), (discord.url, "Player: C", "logged off!")])
+    assert sorted(discord.contents()) == ["Player: C is logged off!", "Players: A, B are online!"]
+    assert (sender.sent, sender.failed, sender.rate_limited) == (2, 0, 0)
+
+def test_429_retried_after_retry_after(stub):
+    discord = stub([(429, {"Retry-After": "0.4"}, b'{"retry_after": 0.4}')])
+    sender = WebhookSender(coalesce_window=0)
+    deliver(sender, [(discord.url, "Player: A", "online!")])
+    assert discord.contents() == ["Player: A is online!"] * 2
+    assert discord.gaps()[0] >= 0.4
+    assert (sender.sent, sender.failed, sender.rate_limited) == (1, 0, 1)
+
+def test_429_retry_after_from_body(stub):
+    # Discord's JSON body carries retry_after too, used when the header is missing
+    discord = stub([(429, {"Content-Type": "application/json"}, b'{"retry_after": 0.3}')])
+    sender = WebhookSender(coalesce_window=0)
+    deliver(sender, [(discord.url, "Player: A", "online!")])
+    assert discord.gaps()[0] >= 0.3
+    assert (sender.sent, sender.rate_limited) == (1, 1)
+
+def test_remaining_zero_waits_for_reset_after(stub):
+    discord = stub([(204, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.4"}, b"")])
+    sender = WebhookSender(coalesce_window=0)
+    deliver(sender, [(discord.url, "Player: A", "online!"), (discord.url, "Player: B", "logged off!")])
+    assert discord.contents() == ["Player: A is online!", "Player: B is logged off!"]
+    # No 429 needed, the second POST waited for the bucket to reset
+    assert discord.gaps()[0] >= 0.4
+    assert (sender.sent, sender.rate_limited) == (2, 0)
+
+def test_gives_up_after_max_retries(stub):
+    discord = stub([(429, {"Retry-After": "0"}, b"")] * 3)
+    sender = WebhookSender(coalesce_window=0, max_retries=3)
+    deliver(sender, [(discord.url, "Player: A", "online!")])
+    assert len(discord.requests) == 3
+    assert (sender.sent, sender.failed, sender.rate_limited) == (0, 1, 3)
+
+def test_error_status_counts_as_failed(stub):
+    discord = stub([(400, {}, b"bad")])
+    sender = WebhookSender(coalesce_window=0)
+    deliver(sender, [(discord.url, "Player: A", "online!"), (discord.url, "Player: B", "logged off!")])
+    assert (sender.sent, sender.failed) == (1, 1)
+
+def test_full_queue_drops():
+    sender = WebhookSender(maxsize=2)
+    for name in "ABC":
+        sender.send("http://127.0.0.1:9/", f"Player: {name}", "online!")
+    assert (sender.queue_depth(), sender.dropped) == (2, 1)
+
+def test_throughput_with_rate_limits(stub):
+    # Every 20th POST is a 429 and every 10th empties the bucket, like discord under load
+    responses = []
+    for i in range(200):
+        if i % 20 == 19:
+            responses.append((429, {"Retry-After": "0.05"}, b""))
+        elif i % 10 == 9:
+            responses.append((204, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.05"}, b""))
+        else:
+            responses.append((204, {}, b""))
+    discord = stub(responses)
+    sender = WebhookSender(coalesce_window=0)
+    start = time.perf_counter()
+    # Distinct kinds, nothing is merged: 200 messages, 200 POSTs plus the retries
+    deliver(sender, [(discord.url, f"Player: {i}", f"kind {i}") for i in range(200)])
+    elapsed = time.perf_counter() - start
+    print(f"{sender.sent / elapsed:.0f} webhooks/s")
+    assert (sender.sent, sender.failed) == (200, 0)
+    assert sender.rate_limited == len(discord.requests) - 200 > 0
+    assert sender.sent / elapsed > 20
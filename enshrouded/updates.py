@@ -0,0 +1,123 @@
+import asyncio
+import inspect
+import json
+import os
+import random
+import re
+import threading
+
+STEAMCMD_API = "https://api.steamcmd.net/v1/info/"
+# Only the app's own change number is needed, no point in decoding the whole document
+CHANGE_NUMBER_RE = re.compile(rb'"_change_number"\s*:\s*(\d+)')
+
+class UpdateWatcher:
+    """
+    Polls the steamcmd API for several app IDs concurrently from one asyncio loop.
+
+    All polls share one keep-alive requests.Session (run in worker threads, the first
+    one imports requests, so importing or creating this costs the loop nothing) and send
+    If-None-Match / If-Modified-Since when the API handed out an ETag / Last-Modified.
+    Polls are jittered, errors back off exponentially up to max_interval.
+    The state file ({app_id: change_number}) is only rewritten, atomically, when a value changes.
+
+    on_update(app_id, old_change_number, new_change_number) is awaited when it is a
+    coroutine function, otherwise it runs in a worker thread.
+    """
+    def __init__(self, app_ids, state_file, on_update, interval=300, max_interval=3600,
+                 jitter=0.1, base_url=STEAMCMD_API):
+        self.app_ids = [str(app_id) for app_id in app_ids]
+        self.state_file = state_file
+        self.on_update = on_update
+        self.interval = interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.base_url = base_url
+        # Created by the first fetch_change_number
+        self.session = None
+        self._session_lock = threading.Lock()
+        self.change_numbers = self._load_state()
+        self.last_poll = {}
+        self._validators = {}
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable state file {self.state_file}: {e}")
+            return {}
+        if not isinstance(data, dict):
+            print(f"Ignoring unreadable state file {self.state_file}: not a JSON object")
+            return {}
+        if "change_number" in data:
+            # Old single app layout
+            return {self.app_ids[0]: data["change_number"]}
+        return {str(app_id): number for app_id, number in data.items()}
+
+    def _save_state(self):
+        tmp = f"{self.state_file}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.change_numbers, f)
+        os.replace(tmp, self.state_file)
+
+    def fetch_change_number(self, app_id):
+        """Blocking, returns the current change number or None when unchanged (304)."""
+        with self._session_lock:
+            if self.session is None:
+                # requests takes ~0.1s to import, here it's in a worker thread instead of on the loop
+                import requests
+                self.session = requests.Session()
+        headers = {}
+        etag, last_modified = self._validators.get(app_id, (None, None))
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        response = self.session.get(f"{self.base_url}{app_id}", headers=headers, timeout=10)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        self._validators[app_id] = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        match = CHANGE_NUMBER_RE.search(response.content)
+        if match:
+            return int(match.group(1))
+        change_number = response.json().get("data", {}).get(app_id, {}).get("_change_number")
+        if change_number is None:
+            raise ValueError("'_change_number' missing from API response")
+        return change_number
+
+    async def check(self, app_id):
+        change_number = await asyncio.to_thread(self.fetch_change_number, app_id)
+        self.last_poll[app_id] = (asyncio.get_running_loop().time(), "unchanged" if change_number is None else "ok")
+        if change_number is None:
+            return
+        last_change_number = self.change_numbers.get(app_id)
+        if change_number == last_change_number:
+            return
+        print(f"[{app_id}] change_number {last_change_number} -> {change_number}")
+        self.change_numbers[app_id] = change_number
+        self._save_state()
+        if last_change_number is None:
+            return
+        if inspect.iscoroutinefunction(self.on_update):
+            await self.on_update(app_id, last_change_number, change_number)
+        else:
+            await asyncio.to_thread(self.on_update, app_id, last_change_number, change_number)
+
+    async def watch(self, app_id):
+        errors = 0
+        while True:
+            try:
+                await self.check(app_id)
+                errors = 0
+            except Exception as e:
+                errors += 1
+                self.last_poll[app_id] = (asyncio.get_running_loop().time(), f"error: {e}")
+                print(f"[{app_id}] Error checking for updates: {e}")
+            delay = min(self.interval * 2 ** errors, self.max_interval)
+            await asyncio.sleep(delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    async def run(self):
+        await asyncio.gather(*(self.watch(app_id) for app_id in self.app_ids))
@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+class WebhookSender:
+    """
+    Posts discord webhooks from a task on the event loop over one pooled requests.Session.
+
+    Messages with the same webhook and kind arriving within coalesce_window are merged,
+    e.g. "Players: A, B, C are online!". Discord rate limits are respected: a 429 is
+    retried after Retry-After, and when X-RateLimit-Remaining hits 0 we wait for
+    X-RateLimit-Reset-After before posting to that webhook again.
+    requests has no async API: each POST runs in the loop's default executor (the first
+    one also imports requests), waiting for rate limits and coalescing happens on the loop.
+    send() must be called from the loop's thread, start() runs the task.
+    latency, when set, gets observe(seconds) for every POST (a metrics.Histogram).
+    """
+    def __init__(self, coalesce_window=2.0, maxsize=1000, max_retries=5, timeout=5, latency=None):
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.latency = latency
+        # Created by the first POST, see _request
+        self.session = None
+        self.sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.dropped = 0
+        self._blocked_until = {}
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._task = None
+
+    def start(self):
+        """Starts the sender task on the running loop, messages sent before wait for it."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="webhook")
+        return self._task
+
+    def send(self, webhook_url, subject, msg_kind):
+        """Queue "<subject> is <msg_kind>", never blocks."""
+        try:
+            self._queue.put_nowait((webhook_url, subject, msg_kind))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"[!] Webhook queue full, dropping: {subject} is {msg_kind}")
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    async def stop(self, timeout=10):
+        """Send what is queued and stop the task, what is left after timeout seconds is dropped."""
+        if self._task is None:
+            return
+        try:
+            async with asyncio.timeout(timeout):
+                await self._queue.put(None)
+                await asyncio.shield(self._task)
+        except TimeoutError:
+            print(f"[!] Gave up on {self._queue.qsize()} queued webhooks")
+            self._task.cancel()
+
+    async def _run(self):
+        running = True
+        while running:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.coalesce_window
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            grouped = {}
+            for webhook_url, subject, msg_kind in batch:
+                subjects = grouped.setdefault((webhook_url, msg_kind), [])
+                if subject not in subjects:
+                    subjects.append(subject)
+            for (webhook_url, msg_kind), subjects in grouped.items():
+                await self._post(webhook_url, merge_subjects(subjects, msg_kind))
+
+    def _request(self, webhook_url, content):
+        """Blocking POST, runs in a worker thread."""
+        # requests takes ~0.1s to import, here it's off the loop
+        import requests
+        if self.session is None:
+            self.session = requests.Session()
+        return self.session.post(webhook_url, json={"content": content}, timeout=self.timeout)
+
+    async def _post(self, webhook_url, content):
+        # requests.RequestException is an OSError, caught without importing requests on the loop
+        for _ in range(self.max_retries):
+            wait = self._blocked_until.get(webhook_url, 0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            start = time.monotonic()
+            try:
+                response = await asyncio.to_thread(self._request, webhook_url, content)
+            except OSError as e:
+                self.failed += 1
+                print(f"[!] Failed to send webhook: {e}")
+                return False
+            finally:
+                if self.latency is not None:
+                    self.latency.observe(time.monotonic() - start)
+            self._track_rate_limit(webhook_url, response)
+            if response.status_code == 429:
+                self.rate_limited += 1
+                retry_after = _retry_after(response)
+                print(f"[!] Rate limited, retrying in {retry_after:.1f}s")
+                self._blocked_until[webhook_url] = time.monotonic() + retry_after
+                continue
+            try:
+                response.raise_for_status()
+            except OSError as e:
+                self.failed += 1
+                print(f"[!] Failed to send webhook: {e}")
+                return False
+            self.sent += 1
+            print(f"[+] Webhook sent: {content}")
+            return True
+        self.failed += 1
+        print(f"[!] Giving up on webhook after {self.max_retries} attempts: {content}")
+        return False
+
+    def _track_rate_limit(self, webhook_url, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset_after = response.headers.get("X-RateLimit-Reset-After")
+        if remaining is None or reset_after is None:
+            return
+        try:
+            if int(remaining) == 0:
+                self._blocked_until[webhook_url] = time.monotonic() + float(reset_after)
+        except ValueError:
+            pass
+
+def _retry_after(response):
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        pass
+    try:
+        return float(response.json()["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return 1.0
+
+def merge_subjects(subjects, msg_kind):
+    """["Player: A", "Player: B"] -> "Players: A, B are online!" """
+    if len(subjects) == 1:
+        return f"{subjects[0]} is {msg_kind}"
+    if all(subject.startswith("Player: ") for subject in subjects):
+        names = ", ".join(subject[len("Player: "):] for subject in subjects)
+        return f"Players: {names} are {msg_kind}"
+    return f"{', '.join(subjects)} are {msg_kind}"
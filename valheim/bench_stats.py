@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Times the single-pass aggregator against the old three-pass player_stats code
+on a synthetic character_logins.txt.
+bench/suite.py at the root of the repo covers every parser.
+
+Usage: python bench_stats.py [number_of_lines]
+"""
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from player_stats import aggregate_logins, analyze_user_trends, count_zdoid_entries_by_player
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from loggen import valheim_lines, write_log
+
+PLAYERS = ["Bob", "Alice", "Ragnar", "Freya", "Sven", "Ingrid", "Bjorn", "Astrid"]
+
+def write_synthetic_log(path, lines, seed=7):
+    write_log(path, valheim_lines(lines, seed=seed, players=PLAYERS))
+
+def legacy(log_file_path, date_format="%m/%d/%Y %H:%M:%S"):
+    """The three passes the old code made, with strptime and re.search per line."""
+    pattern = r'^\d\d\/\d\d\/\d\d\d\d \d\d:\d\d:\d\d: Got character ZDOID from (.*?) : 0:0$'
+    most_recent_date = None
+    with open(log_file_path, 'r') as file:
+        for line in file:
+            try:
+                current_date = datetime.strptime(line.split(": ")[0], date_format)
+                if most_recent_date is None or current_date > most_recent_date:
+                    most_recent_date = current_date
+            except (ValueError, IndexError):
+                continue
+    seven_days_ago = most_recent_date - timedelta(days=7)
+    user_activity = defaultdict(lambda: {"last_7_days": 0, "previous": 0})
+    with open(log_file_path, 'r') as file:
+        for line in file:
+            if re.search(pattern, line):
+                parts = line.split(": ")
+                username = ": ".join(parts[1:]).split("from ")[1].split(":")[0].strip()
+                if datetime.strptime(parts[0], date_format) >= seven_days_ago:
+                    user_activity[username]["last_7_days"] += 1
+                else:
+                    user_activity[username]["previous"] += 1
+    player_counts = defaultdict(int)
+    with open(log_file_path, 'r') as file:
+        for line in file:
+            match = re.search(pattern, line)
+            if match:
+                player_counts[match.group(1)] += 1
+    return user_activity, player_counts
+
+def timed(name, func, lines):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} {elapsed:8.2f}s {lines / elapsed:>12,.0f} lines/sec")
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "character_logins.txt")
+        write_synthetic_log(path, lines)
+        print(f"{lines:,} lines, {os.path.getsize(path) / 1e6:.0f} MB")
+
+        def single_pass():
+            buckets = aggregate_logins(path)
+            count_zdoid_entries_by_player(buckets=buckets)
+            analyze_user_trends(buckets=buckets)
+
+        timed("legacy", lambda: legacy(path), lines)
+        timed("buckets", single_pass, lines)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Columnar store of every ZDOID login, for questions the daily buckets can't answer.
+
+<base>.epochs   uint32 seconds since 1970, the log's local time taken as-is (no timezone)
+<base>.players  uint16 index into the name table
+<base>.meta     json: name table, number of rows, and how far into the log we got
+
+6 bytes per login. Queries memory-map the columns with NumPy, so any window,
+trend or histogram is a vectorized operation instead of another text parse.
+Building only needs the standard library, NumPy is imported when querying.
+
+Usage:
+    python login_store.py update <character_logins.txt> <base>
+    python login_store.py trend <base> [recent_days] [baseline_days]
+    python login_store.py hours <base> [player]
+    python login_store.py weekdays <base> [player]
+"""
+import json
+import mmap
+import os
+import sys
+from array import array
+from datetime import date
+from player_stats import ZDOID_PATTERN
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def _load_meta(base):
+    try:
+        with open(f"{base}.meta", "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"names": [], "count": 0, "inode": None, "offset": 0}
+
+def _save_meta(base, meta):
+    tmp = f"{base}.meta.tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, f"{base}.meta")
+
+def update_store(log_file_path, base):
+    """
+    Appends the logins written since the last update, rebuilds when the log was rotated or truncated.
+
+    Returns:
+    int: Number of logins added
+    """
+    meta = _load_meta(base)
+    st = os.stat(log_file_path)
+    if meta["inode"] != st.st_ino or st.st_size < meta["offset"]:
+        meta = {"names": [], "count": 0, "inode": st.st_ino, "offset": 0}
+    ids = {name: i for i, name in enumerate(meta["names"])}
+
+    epochs = array("I")
+    players = array("H")
+    day_epochs = {}
+    match = ZDOID_PATTERN.match
+    with open(log_file_path, "r", encoding="utf-8", errors="surrogateescape", newline="\n") as file:
+        file.seek(meta["offset"])
+        partial = ""
+        for line in file:
+            if line[-1:] != "\n":
+                partial = line
+                break
+            found = match(line)
+            if not found:
+                continue
+            # "12/05/2024 20:30:09: ..."
+            day_str = line[:10]
+            day_epoch = day_epochs.get(day_str)
+            if day_epoch is None:
+                try:
+                    ordinal = date(int(day_str[6:10]), int(day_str[0:2]), int(day_str[3:5])).toordinal()
+                except ValueError:
+                    continue
+                day_epoch = day_epochs[day_str] = (ordinal - EPOCH_ORDINAL) * 86400
+            name = found.group(1)
+            player = ids.get(name)
+            if player is None:
+                if len(meta["names"]) > 0xFFFF:
+                    raise ValueError("More players than fit in the uint16 player column")
+                player = ids[name] = len(meta["names"])
+                meta["names"].append(name)
+            epochs.append(day_epoch + int(line[11:13]) * 3600 + int(line[14:16]) * 60 + int(line[17:19]))
+            players.append(player)
+        end = file.seek(0, os.SEEK_END)
+
+    # A crash between writes can leave rows the meta doesn't know about, drop them
+    for suffix, column in ((".epochs", epochs), (".players", players)):
+        with open(f"{base}{suffix}", "ab") as f:
+            f.truncate(meta["count"] * column.itemsize)
+            column.tofile(f)
+    meta["count"] += len(epochs)
+    meta["offset"] = end - len(partial.encode("utf-8", "surrogateescape"))
+    _save_meta(base, meta)
+    return len(epochs)
+
+class LoginStore:
+    """Read-only, memory-mapped view of a store built by update_store."""
+    def __init__(self, base):
+        import numpy as np
+        self.np = np
+        meta = _load_meta(base)
+        self.names = meta["names"]
+        self.epochs = self._map(f"{base}.epochs", np.uint32, meta["count"])
+        self.players = self._map(f"{base}.players", np.uint16, meta["count"])
+
+    def _map(self, path, dtype, count):
+        if count == 0:
+            return self.np.zeros(0, dtype=dtype)
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.np.frombuffer(buf, dtype=dtype, count=count)
+
+    def _select(self, start=None, end=None, player=None):
+        mask = self.np.ones(len(self.epochs), dtype=bool)
+        if start is not None:
+            mask &= self.epochs >= start
+        if end is not None:
+            mask &= self.epochs < end
+        if player is not None:
+            if player not in self.names:
+                # Never logged in, nothing to count
+                mask[:] = False
+            else:
+                mask &= self.players == self.names.index(player)
+        return mask
+
+    def counts(self, start=None, end=None):
+        """Logins per player between two epochs (end exclusive)."""
+        mask = self._select(start, end)
+        totals = self.np.bincount(self.players[mask], minlength=len(self.names))
+        return {name: int(total) for name, total in zip(self.names, totals)}
+
+    def trend(self, recent_days=7, baseline_days=30):
+        """Same shape as player_stats.analyze_user_trends, with any window lengths."""
+        if len(self.epochs) == 0:
+            return {}
+        # Whole days like analyze_user_trends: the windows end with the day of the last login
+        latest = (int(self.epochs.max()) // 86400 + 1) * 86400
+        cutoff = latest - recent_days * 86400
+        recent = self.counts(cutoff, latest)
+        previous = self.counts(latest - baseline_days * 86400, cutoff)
+        days_in_previous = max(baseline_days - recent_days, 1)
+        trend_analysis = {}
+        for name in self.names:
+            daily_avg_recent = recent[name] / recent_days
+            daily_avg_previous = previous[name] / days_in_previous
+            trend_analysis[name] = {
+                "last_7_days_total": recent[name],
+                "previous_total": previous[name],
+                "daily_avg_last_7_days": daily_avg_recent,
+                "daily_avg_previous": daily_avg_previous,
+                "trend_percentage": ((daily_avg_recent - daily_avg_previous) / daily_avg_previous * 100
+                                     if daily_avg_previous > 0 else float('inf')),
+            }
+        return trend_analysis
+
+    def hour_histogram(self, player=None, start=None, end=None):
+        """Logins per hour of the day, index 0 is 00:00-00:59."""
+        epochs = self.epochs[self._select(start, end, player)]
+        return self.np.bincount((epochs % 86400) // 3600, minlength=24)
+
+    def weekday_histogram(self, player=None, start=None, end=None):
+        """Logins per weekday, index 0 is Monday."""
+        epochs = self.epochs[self._select(start, end, player)]
+        # 1970-01-01 was a Thursday
+        return self.np.bincount((epochs // 86400 + 3) % 7, minlength=7)
+
+if __name__ == "__main__":
+    command = sys.argv[1]
+    if command == "update":
+        print(f"Added {update_store(sys.argv[2], sys.argv[3])} logins")
+    elif command == "trend":
+        from player_stats import print_trending_users
+        store = LoginStore(sys.argv[2])
+        recent_days = int(sys.argv[3]) if len(sys.argv) > 3 else 7
+        baseline_days = int(sys.argv[4]) if len(sys.argv) > 4 else 30
+        print(print_trending_users(store.trend(recent_days, baseline_days)))
+    elif command in ("hours", "weekdays"):
+        store = LoginStore(sys.argv[2])
+        player = sys.argv[3] if len(sys.argv) > 3 else None
+        if player is not None and player not in store.names:
+            print(f"No logins of {player} in {sys.argv[2]}")
+            sys.exit(1)
+        if command == "hours":
+            for hour, count in enumerate(store.hour_histogram(player)):
+                print(f"{hour:02}:00 {count}")
+        else:
+            for day, count in zip(WEEKDAYS, store.weekday_histogram(player)):
+                print(f"{day} {count}")
+    else:
+        print(__doc__)
@@ -1,90 +1,225 @@
+import argparse
 import os
+import sys
 
-from datetime import datetime, timedelta
+from datetime import date
+import gzip
+import io
+import json
 import re
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import requests
 from dotenv import load_dotenv
 
-def analyze_user_trends(log_file_path, date_format="%m/%d/%Y %H:%M:%S"):
+# "12/05/2024 20:30:09: Got character ZDOID from Bob : 0:0"
+# Lines only end at "\n" (files are opened with newline="\n"), the "\r" of a CRLF line is ignored here
+ZDOID_PATTERN = re.compile(r'^\d\d\/\d\d\/\d\d\d\d \d\d:\d\d:\d\d: Got character ZDOID from (.*?) : 0:0\r?$')
+
+def new_buckets():
+    return defaultdict(lambda: defaultdict(int))
+
+def count_lines(lines, buckets):
     """
-    Analyzes a log file to identify users with increasing activity in the last 7 days.
+    Adds the ZDOID entries among lines to buckets.
+
+    Returns:
+    str: The last line when it has no newline yet (still being written), it is not counted
+    """
+    # Every line of a day has the same "MM/DD/YYYY" prefix, only convert it once
+    day_ordinals = {}
+    match = ZDOID_PATTERN.match
+    for line in lines:
+        if line[-1:] != "\n":
+            return line
+        found = match(line)
+        if not found:
+            continue
+        day_str = line[:10]
+        day = day_ordinals.get(day_str)
+        if day is None:
+            try:
+                day = date(int(day_str[6:10]), int(day_str[0:2]), int(day_str[3:5])).toordinal()
+            except ValueError:
+                continue
+            day_ordinals[day_str] = day
+        buckets[found.group(1)][day] += 1
+    return ""
+
+def read_logins(log_file_path, buckets, offset=0):
+    """
+    Counts the ZDOID entries from byte offset to the end of the file into buckets.
+
+    Returns:
+    int: Offset to continue from next time
+    """
+    # surrogateescape round-trips any byte, so the partial line length in bytes is exact
+    with open(log_file_path, 'r', encoding='utf-8', errors='surrogateescape', newline='\n') as file:
+        file.seek(offset)
+        partial = count_lines(file, buckets)
+        end = file.seek(0, os.SEEK_END)
+    return end - len(partial.encode('utf-8', 'surrogateescape'))
+
+def aggregate_logins(log_file_path):
+    """
+    Reads the log once and counts ZDOID entries per player per day.
 
     Args:
     log_file_path (str): Path to the log file
-    date_format (str): Format of the datetime in the log file
+
+    Returns:
+    dict: {player: {day: count}}, day is a date ordinal, players in order of first appearance
+    """
+    buckets = new_buckets()
+    read_logins(log_file_path, buckets)
+    return buckets
+
+def _count_range(task):
+    """Worker: counts one newline-aligned byte range of a plain file, or a whole .gz file."""
+    path, start, end = task
+    buckets = new_buckets()
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8', errors='surrogateescape', newline='\n') as file:
+            count_lines(file, buckets)
+    else:
+        with open(path, 'rb') as file:
+            # A range owns every line that starts inside it
+            if start > 0:
+                file.seek(start - 1)
+                file.readline()
+                start = file.tell()
+            if end < os.path.getsize(path):
+                file.seek(end - 1)
+                file.readline()
+                end = file.tell()
+            if end > start:
+                file.seek(start)
+                data = file.read(end - start).decode('utf-8', 'surrogateescape')
+                # Not str.splitlines, it also splits on "\r", "\x0c", "\x1c"... which read_logins doesn't
+                count_lines(io.StringIO(data, newline='\n'), buckets)
+    # defaultdicts with a lambda don't pickle
+    return {player: dict(days) for player, days in buckets.items()}
+
+def aggregate_files(paths, workers=None, chunk_size=64 * 1024 * 1024):
+    """
+    aggregate_logins over several files, plain or .gz, in a process pool.
+
+    Plain files are split into chunk_size byte ranges, .gz files are one task each.
+    Pass the files oldest first so players keep their order of first appearance.
+
+    Args:
+    paths (list): Log files
+    workers (int): Processes to use, None for one per core, 1 parses in this process
+
+    Returns:
+    dict: {player: {day: count}}, same as aggregate_logins on the concatenated files
+    """
+    tasks = []
+    for path in paths:
+        size = 0 if path.endswith('.gz') else os.path.getsize(path)
+        tasks += [(path, start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)] or [(path, 0, 0)]
+
+    if workers == 1:
+        results = list(map(_count_range, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_count_range, tasks))
+
+    buckets = new_buckets()
+    for partial in results:
+        for player, days in partial.items():
+            player_days = buckets[player]
+            for day, count in days.items():
+                player_days[day] += count
+    return buckets
+
+def load_state(state_file):
+    """Returns the saved {inode, size, offset, buckets} or None."""
+    try:
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+        buckets = new_buckets()
+        for player, days in state["buckets"].items():
+            for day, count in days.items():
+                buckets[player][int(day)] = count
+        state["buckets"] = buckets
+        return state
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, AttributeError) as e:
+        print(f"Ignoring unreadable state file {state_file}: {e}")
+        return None
+
+def save_state(state_file, state):
+    tmp = f"{state_file}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp, state_file)
+
+def update_buckets(log_file_path, state_file):
+    """
+    Like aggregate_logins, but only parses what was appended since the last run.
+
+    The offset, file identity and buckets are kept in state_file. When the log was
+    truncated or replaced (other inode, or smaller than our offset) everything is rebuilt.
+
+    Returns:
+    dict: {player: {day: count}} for the whole file
+    """
+    st = os.stat(log_file_path)
+    state = load_state(state_file)
+    if state and state.get("inode") == st.st_ino and st.st_size >= state.get("offset", 0):
+        buckets = state["buckets"]
+        offset = state["offset"]
+    else:
+        if state:
+            print(f"{log_file_path} was truncated or rotated, rebuilding stats")
+        buckets = new_buckets()
+        offset = 0
+    offset = read_logins(log_file_path, buckets, offset)
+    save_state(state_file, {"inode": st.st_ino, "size": st.st_size, "offset": offset, "buckets": buckets})
+    return buckets
+
+def analyze_user_trends(log_file_path=None, buckets=None):
+    """
+    Analyzes a log file to identify users with increasing activity in the last 7 days.
+
+    Args:
+    log_file_path (str): Path to the log file, only read when buckets is not given
+    buckets (dict): Output from aggregate_logins
 
     Returns:
     dict: Dictionary containing trend analysis for each user
     """
-    # Store user activity counts
-    user_activity = defaultdict(lambda: {"last_7_days": 0, "previous": 0})
+    if buckets is None:
+        buckets = aggregate_logins(log_file_path)
 
     # Get the date of the most recent log entry
-    most_recent_date = None
-    with open(log_file_path, 'r') as file:
-        for line in file:
-            try:
-                # Parse date from format: "12/05/2024 20:30:09: Got character..."
-                date_str = line.split(": ")[0]
-                current_date = datetime.strptime(date_str, date_format)
-                if most_recent_date is None or current_date > most_recent_date:
-                    most_recent_date = current_date
-            except (ValueError, IndexError):
-                continue
-
-    if most_recent_date is None:
+    most_recent_day = max((max(days) for days in buckets.values() if days), default=None)
+    if most_recent_day is None:
         return {}
 
-    # Calculate the cutoff date for the last 7 days
-    seven_days_ago = most_recent_date - timedelta(days=7)
-    pattern = r'^\d\d\/\d\d\/\d\d\d\d \d\d:\d\d:\d\d: Got character ZDOID from (.*?) : 0:0$'
-    with open(log_file_path, 'r') as file:
-        for line in file:
-            match = re.search(pattern, line)
-            if match:
-                try:
-                    # Parse the line
-                    # Split by ": " to handle the timestamp
-                    parts = line.split(": ")
-                    if len(parts) < 2:
-                        continue
-
-                    date_str = parts[0]
-                    content = ": ".join(parts[1:])  # Rejoin the rest in case there are more colons
-
-                    username = content.split("from ")[1].split(":")[0].strip()
-
-                    # Convert date string to datetime
-                    log_date = datetime.strptime(date_str, date_format)
-
-                    # Count activity
-                    if log_date >= seven_days_ago:
-                        user_activity[username]["last_7_days"] += 1
-                    else:
-                        user_activity[username]["previous"] += 1
-
-                except (ValueError, IndexError):
-                    continue
+    # The last 7 days are the most recent day and the 6 before it
+    seven_days_ago = most_recent_day - 7
+    days_in_previous = 30 - 7
 
     # Calculate trends
     trend_analysis = {}
-    for username, counts in user_activity.items():
-        # Calculate daily averages
-        days_in_previous = (seven_days_ago - (most_recent_date - timedelta(days=30))).days
-        if days_in_previous <= 0:
-            days_in_previous = 1
+    for username, days in buckets.items():
+        last_7_days = sum(count for day, count in days.items() if day > seven_days_ago)
+        previous = sum(days.values()) - last_7_days
 
-        daily_avg_previous = counts["previous"] / days_in_previous
-        daily_avg_recent = counts["last_7_days"] / 7
+        # Calculate daily averages
+        daily_avg_previous = previous / days_in_previous
+        daily_avg_recent = last_7_days / 7
 
         # Calculate trend percentage
         trend_percentage = ((daily_avg_recent - daily_avg_previous) / daily_avg_previous * 100
                             if daily_avg_previous > 0 else float('inf'))
 
         trend_analysis[username] = {
-            "last_7_days_total": counts["last_7_days"],
-            "previous_total": counts["previous"],
+            "last_7_days_total": last_7_days,
+            "previous_total": previous,
             "daily_avg_last_7_days": daily_avg_recent,
             "daily_avg_previous": daily_avg_previous,
             "trend_percentage": trend_percentage
@@ -146,24 +281,16 @@ def send_to_discord(webhook_url, message):
     response = requests.post(webhook_url, json=payload)
     return response.status_code == 204
 
-def count_zdoid_entries_by_player(log_file_path):
+def count_zdoid_entries_by_player(log_file_path=None, buckets=None):
     """
     Group players found and count entries
     """
-
-    pattern = r'^\d\d\/\d\d\/\d\d\d\d \d\d:\d\d:\d\d: Got character ZDOID from (.*?) : 0:0$'
-    player_counts = defaultdict(int)
-
-    with open(log_file_path, 'r') as file:
-        for line in file:
-            match = re.search(pattern, line)
-            if match:
-                player = match.group(1)
-                player_counts[player] += 1
+    if buckets is None:
+        buckets = aggregate_logins(log_file_path)
 
     message = "Player ZDOID Stats:\n"
-    for player, count in dict(player_counts).items():
-        message += f"{player}: {count} entries\n"
+    for player, days in buckets.items():
+        message += f"{player}: {sum(days.values())} entries\n"
 
     return message
 
@@ -175,13 +302,25 @@ def patrick():
     """
     webhook_url = load_secrets("/home/valheim/.secrets")
     file_path = '/home/valheim/valheim-plus-server/data/character_logins.txt'
-    player_stats = count_zdoid_entries_by_player(file_path)
+    # Only the lines added since the previous run get parsed
+    buckets = update_buckets(file_path, '/home/valheim/.player_stats_state.json')
+    player_stats = count_zdoid_entries_by_player(buckets=buckets)
     print(player_stats)
-    analysis = analyze_user_trends(file_path)
+    analysis = analyze_user_trends(buckets=buckets)
     trending_stats = print_trending_users(analysis, min_trend_percentage=10)
     print(trending_stats)
     send_to_discord(webhook_url, player_stats)
     send_to_discord(webhook_url, trending_stats)
 
 if __name__ == "__main__":
-    patrick()
+    if len(sys.argv) > 1:
+        # Rebuild all-time stats from old, rotated and .gz copies: player_stats.py [-j workers] files...
+        parser = argparse.ArgumentParser(description="Player stats over several (.gz) login logs")
+        parser.add_argument("-j", "--workers", type=int, default=None, help="processes, default one per core")
+        parser.add_argument("files", nargs="+", help="logs, oldest first")
+        args = parser.parse_args()
+        buckets = aggregate_files(args.files, args.workers)
+        print(count_zdoid_entries_by_player(buckets=buckets))
+        print(print_trending_users(analyze_user_trends(buckets=buckets)))
+    else:
+        patrick()
@@ -0,0 +1,169 @@
+import gzip
+import os
+import subprocess
+import sys
+from datetime import date
+import pytest
+from player_stats import (aggregate_logins, aggregate_files, analyze_user_trends, read_logins, new_buckets,
+                          update_buckets, load_state)
+from login_store import EPOCH_ORDINAL, LoginStore, update_store
+
+PLAYERS = ["Alice", "Bob", "Chloë", "Dan"]
+
+def write_log(path, lines=2000, newline="\n", noise="", terminated=True):
+    """A character_logins.txt with a login every 5th line spread over 10 days, the rest is noise."""
+    out = []
+    for i in range(lines):
+        stamp = f"12/{1 + i * 10 // lines:02}/2024 20:{i // 60 % 60:02}:{i % 60:02}"
+        if i % 5 == 0:
+            out.append(f"{stamp}: Got character ZDOID from {PLAYERS[i // 5 % len(PLAYERS)]} : 0:0")
+        else:
+            out.append(f"{stamp}: Debug {noise if i == 501 else ''}loading zone {i}")
+    data = newline.join(out) + (newline if terminated else "")
+    path.write_bytes(data.encode("utf-8"))
+    return path
+
+def plain(buckets):
+    return {player: dict(days) for player, days in buckets.items()}
+
+def totals(buckets):
+    return {player: sum(days.values()) for player, days in buckets.items()}
+
+@pytest.mark.parametrize("newline,noise,terminated", [
+    ("\n", "", True),
+    ("\r\n", "", True),
+    # Characters str.splitlines() treats as line breaks, read_logins doesn't
+    ("\n", "\x0c", True),
+    ("\n", "\r", True),
+    ("\n", "\x1c\x85\u2028", True),
+    ("\r\n", "\x0c", False),
+    ("\n", "", False),
+])
+def test_parallel_matches_serial(tmp_path, newline, noise, terminated):
+    path = str(write_log(tmp_path / "character_logins.txt", newline=newline, noise=noise, terminated=terminated))
+    serial = plain(aggregate_logins(path))
+    assert totals(serial) == {name: 100 for name in PLAYERS}
+    # Small chunks so ranges start and end in the middle of lines, one of them at the stray character
+    for chunk_size in (4096, 1000, 77):
+        assert plain(aggregate_files([path], workers=1, chunk_size=chunk_size)) == serial
+    assert plain(aggregate_files([path], workers=2, chunk_size=4096)) == serial
+    assert update_store(path, str(tmp_path / "store")) == 400
+
+def test_unterminated_last_line_not_counted(tmp_path):
+    path = tmp_path / "character_logins.txt"
+    path.write_bytes(b"12/05/2024 20:30:09: Got character ZDOID from Alice : 0:0\n"
+                     b"12/05/2024 20:31:09: Got character ZDOID from Bob : 0:0")
+    buckets = new_buckets()
+    offset = read_logins(str(path), buckets)
+    assert totals(buckets) == {"Alice": 1}
+    assert offset == path.read_bytes().index(b"12/05/2024 20:31")
+    assert totals(aggregate_files([str(path)], workers=1, chunk_size=16)) == {"Alice": 1}
+    # Finished later, counted from the returned offset
+    with open(path, "ab") as f:
+        f.write(b"\r\n")
+    read_logins(str(path), buckets, offset)
+    assert totals(buckets) == {"Alice": 1, "Bob": 1}
+
+@pytest.mark.parametrize("newline,noise", [("\n", ""), ("\r\n", "\x0c")])
+def test_gz_matches_plain(tmp_path, newline, noise):
+    path = write_log(tmp_path / "character_logins.txt", newline=newline, noise=noise)
+    gz = tmp_path / "character_logins.txt.1.gz"
+    with gzip.open(gz, "wb") as f:
+        f.write(path.read_bytes())
+    serial = plain(aggregate_logins(str(path)))
+    assert plain(aggregate_files([str(gz)], workers=1)) == serial
+    # Rotated .gz copy first, then the current file
+    both = plain(aggregate_files([str(gz), str(path)], workers=2, chunk_size=4096))
+    assert totals(both) == {name: 200 for name in PLAYERS}
+
+def login(day, name):
+    return f"12/{day:02}/2024 21:00:00: Got character ZDOID from {name} : 0:0\n".encode()
+
+def test_update_buckets_reads_only_what_was_appended(tmp_path):
+    path = write_log(tmp_path / "character_logins.txt")
+    state = str(tmp_path / "state.json")
+    assert plain(update_buckets(str(path), state)) == plain(aggregate_logins(str(path)))
+    # Rewritten in place with the same size: not read again, so Alice keeps her logins
+    path.write_bytes(path.read_bytes().replace(b"from Alice", b"from Alicx"))
+    with open(path, "ab") as f:
+        f.write(login(11, "Eve") + login(11, "Alice"))
+    buckets = update_buckets(str(path), state)
+    assert totals(buckets) == {"Alice": 101, "Bob": 100, "Chloë": 100, "Dan": 100, "Eve": 1}
+    assert load_state(state)["offset"] == path.stat().st_size
+
+def test_update_buckets_waits_for_the_partial_last_line(tmp_path):
+    path = write_log(tmp_path / "character_logins.txt")
+    state = str(tmp_path / "state.json")
+    update_buckets(str(path), state)
+    size = path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(login(11, "Eve")[:-10])
+    assert "Eve" not in update_buckets(str(path), state)
+    assert load_state(state)["offset"] == size
+    with open(path, "ab") as f:
+        f.write(login(11, "Eve")[-10:])
+    assert totals(update_buckets(str(path), state))["Eve"] == 1
+    # Counted once, not again on the next run
+    assert totals(update_buckets(str(path), state))["Eve"] == 1
+
+@pytest.mark.parametrize("replace", ["truncate", "rotate"])
+def test_update_buckets_rescans_a_truncated_or_rotated_log(tmp_path, replace):
+    path = write_log(tmp_path / "character_logins.txt")
+    state = str(tmp_path / "state.json")
+    update_buckets(str(path), state)
+    if replace == "rotate":
+        path.rename(tmp_path / "character_logins.txt.1")
+        # Bigger than the saved offset, only the inode tells it's another file
+        path.write_bytes(login(11, "Eve") * 3 + login(12, "Alice") * 2000)
+        assert path.stat().st_size > load_state(state)["offset"]
+    else:
+        # Same file, shorter than the saved offset
+        with open(path, "r+b") as f:
+            f.truncate(0)
+            f.write(login(11, "Eve") * 3)
+    expected = plain(aggregate_logins(str(path)))
+    assert plain(update_buckets(str(path), state)) == expected
+    assert totals(expected)["Eve"] == 3 and "Bob" not in expected
+
+@pytest.fixture
+def store(tmp_path):
+    path = write_log(tmp_path / "character_logins.txt")
+    with open(path, "ab") as f:
+        # Another hour and weekday than the rest, 2024-12-14 is a Saturday
+        f.write(b"12/14/2024 07:15:00: Got character ZDOID from Eve : 0:0\n" * 3)
+    base = str(tmp_path / "store")
+    update_store(str(path), base)
+    return LoginStore(base), aggregate_logins(str(path))
+
+def test_store_counts_match_buckets(store):
+    store, buckets = store
+    assert store.counts() == totals(buckets)
+    # One day's window is that day's bucket
+    for day in (date(2024, 12, 1).toordinal(), date(2024, 12, 14).toordinal()):
+        start = (day - EPOCH_ORDINAL) * 86400
+        assert store.counts(start, start + 86400) == {player: days.get(day, 0) for player, days in buckets.items()}
+
+def test_store_trend_matches_analyze_user_trends(store):
+    store, buckets = store
+    assert store.trend() == analyze_user_trends(buckets=buckets)
+
+def test_store_histograms_match_buckets(store):
+    store, buckets = store
+    for player in PLAYERS + ["Eve"]:
+        weekdays = [0] * 7
+        for day, count in buckets[player].items():
+            weekdays[date.fromordinal(day).weekday()] += count
+        assert list(store.weekday_histogram(player)) == weekdays
+        hours = [0] * 24
+        hours[7 if player == "Eve" else 20] = sum(buckets[player].values())
+        assert list(store.hour_histogram(player)) == hours
+    assert store.hour_histogram().sum() == sum(totals(buckets).values())
+
+def test_store_unknown_player(store, tmp_path):
+    store, _ = store
+    assert list(store.hour_histogram("Nobody")) == [0] * 24
+    assert list(store.weekday_histogram("Nobody")) == [0] * 7
+    result = subprocess.run([sys.executable, "login_store.py", "hours", str(tmp_path / "store"), "Nobody"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    assert result.returncode == 1
+    assert result.stdout.startswith("No logins of Nobody in ")